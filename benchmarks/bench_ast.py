@@ -0,0 +1,82 @@
+"""Memory of the slotted AST nodes against the former dict backed nodes.
+
+Usage:
+    python3 benchmarks/bench_ast.py [elements ...]
+"""
+# Standard library imports.
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import HTMLElement, Attribute, AddText
+
+
+class DictHTMLElement:
+    """The HTMLElement before it got slots, attributes and child elements in one list."""
+
+    def __init__(self, indent: str, tag: str):
+        self._indent = indent
+        self._tag = tag
+        self._childs: list = []
+
+    def append(self, child):
+        self._childs.append(child)
+
+
+class DictAttribute:
+    def __init__(self, name: str, value: str):
+        self._value: str = value
+        self._name: str = name
+
+
+class DictAddText:
+    def __init__(self, value: str):
+        self._value: str = value
+
+
+def build(count: int, element_class, attribute_class, text_class) -> tuple:
+    """Builds a tree of count elements with a class attribute each and a text in every leaf.
+    The strings are sliced like the tokenizer does, so every node gets its own string objects.
+    Returns the root and the number of nodes."""
+    source: str = '        div:class="item"<< "text"'
+    root = element_class(source[:0], source[8:11])
+    nodes: int = 1
+    parents: list = [root]
+    for i in range(count - 1):
+        depth: int = i % 4 + 1
+        element = element_class(source[:4 * depth], source[8:11])
+        element.append(attribute_class(source[12:17], source[19:23]))
+        nodes += 2
+        if depth == 4:
+            element.append(text_class(source[29:33]))
+            nodes += 1
+        parents[depth - 1].append(element)
+        del parents[depth:]
+        parents.append(element)
+    return root, nodes
+
+
+def tree_memory(count: int, classes: tuple) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    root, nodes = build(count, *classes)
+    size: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return nodes, size
+
+
+def main():
+    counts: list = [int(arg) for arg in sys.argv[1:]] or [100000]
+    print(f"{'elements':>9} {'nodes':>8} {'dict B/node':>12} {'slots B/node':>13} {'saved':>7}")
+    for count in counts:
+        nodes, before = tree_memory(count, (DictHTMLElement, DictAttribute, DictAddText))
+        _, after = tree_memory(count, (HTMLElement, Attribute, AddText))
+        print(f"{count:>9} {nodes:>8} {before / nodes:>12.1f} {after / nodes:>13.1f} {1 - after / before:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
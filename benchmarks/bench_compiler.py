@@ -0,0 +1,87 @@
+"""Render time of the Compiler against a recursive getattr dispatched compiler on wide and deep trees.
+
+Usage:
+    python3 benchmarks/bench_compiler.py [elements ...]
+"""
+# Standard library imports.
+import gc
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import Compiler, HTMLElement, Attribute, AddText
+
+
+class RecursiveCompiler(Compiler):
+    """The Compiler before the dispatch table, it recurses once per nesting level."""
+
+    def visit(self, element):
+        element_name = element.__class__.__name__
+        fnc = getattr(self, f"visit_{element_name}")
+        fnc(element)
+
+    def visit_HTMLElement(self, element):
+        tag_name: str = element._tag
+        indent: str = element._indent
+        attributes_str: str = ""
+        if element._attributes:
+            attributes_str = " " + " ".join(map(str, element._attributes))
+        self.write(f"{indent}<{tag_name}{attributes_str}>")
+        for child_element in element._childs:
+            self.visit(child_element)
+        self.write(f"{indent}</{tag_name}>")
+
+
+def element(indent: str) -> HTMLElement:
+    node = HTMLElement(indent, "div")
+    node.append(Attribute("class", "item"))
+    node.append(AddText("text"))
+    return node
+
+
+def wide_tree(count: int) -> HTMLElement:
+    root = HTMLElement("", "html")
+    for _ in range(count):
+        root.append(element("    "))
+    return root
+
+
+def deep_tree(count: int) -> HTMLElement:
+    root = parent = HTMLElement("", "html")
+    for _ in range(count):
+        child = element("    ")
+        parent.append(child)
+        parent = child
+    return root
+
+
+def render_time(compiler_class, root: HTMLElement, repeat: int = 5) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start: float = time.perf_counter()
+        try:
+            compiler_class(root)
+        except RecursionError:
+            return float("nan")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    counts: list = [int(arg) for arg in sys.argv[1:]] or [300, 10000, 100000]
+    print(f"{'tree':>6} {'elements':>9} {'recursive s':>12} {'table s':>9} {'speedup':>8}")
+    for count in counts:
+        for name, generator in (("wide", wide_tree), ("deep", deep_tree)):
+            root: HTMLElement = generator(count)
+            before: float = render_time(RecursiveCompiler, root)
+            after: float = render_time(Compiler, root)
+            assert before != before or RecursiveCompiler(root).src == Compiler(root).src
+            print(f"{name:>6} {count:>9} {before:>12.4f} {after:>9.4f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Time to render one section of a page with compile_fragment against compiling the whole page,
+from the source, from an ElementIndex of the parsed page and from its .pyhtmlc file.
+
+Usage:
+    python3 benchmarks/bench_fragment.py [sections ...]
+"""
+# Standard library imports.
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import compile_fragment, compile_fragment_file, compile_pyhtml, index_pyhtml, parse_pyhtml, write_pyhtmlc
+
+
+def page_source(sections: int) -> str:
+    """A page of sections, each with an id."""
+    lines: list = ["html:", "    body:"]
+    for i in range(sections):
+        lines += [f'        ul id="s{i}":', '            li class="item":', '            li class="item":']
+    return "\n".join(lines) + "\n"
+
+
+def element_path(index, element) -> str:
+    """The path of the element for find_element."""
+    steps: list = []
+    parent = index.parent(element)
+    while parent is not None:
+        same: list = [child for child in parent._childs if getattr(child, "_tag", None) == element._tag]
+        steps.append(f"{element._tag}[{same.index(element) + 1}]")
+        element, parent = parent, index.parent(parent)
+    return "/".join([element._tag] + steps[::-1])
+
+
+def best_time(fnc, repeat: int = 5) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        fnc()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    counts: list = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000]
+    print(f"{'sections':>9} {'page ms':>8} {'source ms':>10} {'index ms':>9} {'pyhtmlc ms':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        for sections in counts:
+            src: str = page_source(sections)
+            pyhtmlc: str = os.path.join(directory, f"page{sections}.pyhtmlc")
+            with open(pyhtmlc, "wb") as fh:
+                write_pyhtmlc(parse_pyhtml(src, "iterative"), fh)
+            index = index_pyhtml(src, "iterative")
+            path: str = element_path(index, index.ids[f"s{sections // 2 - 1}"][0])
+            assert compile_fragment(index, f"s{sections // 2 - 1}") == compile_fragment_file(pyhtmlc, path=path)
+            page: float = best_time(lambda: compile_pyhtml(src, "iterative"))
+            source: float = best_time(lambda: compile_fragment(src, f"s{sections // 2 - 1}", engine="iterative"))
+            indexed: float = best_time(lambda: compile_fragment(index, f"s{sections // 2 - 1}"))
+            loaded: float = best_time(lambda: compile_fragment_file(pyhtmlc, path=path))
+            print(f"{sections:>9} {page * 1000:>8.3f} {source * 1000:>10.3f} {indexed * 1000:>9.3f} {loaded * 1000:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
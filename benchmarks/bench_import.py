@@ -0,0 +1,81 @@
+"""Time to import pyhtml in a new interpreter and the overhead of compile_pyhtml on a tiny document,
+with limits to run it in CI.
+
+Usage:
+    python3 benchmarks/bench_import.py [-r 10] [--max-import-ms 150] [--max-call-us 500]
+
+The import time is the best of repeat runs of python -c "import pyhtml" minus the best run of
+python -c "pass", so it does not include the start of the interpreter. Exits with 1 if a limit
+is exceeded or the import loads modules only the CLI or the async API need.
+"""
+# Standard library imports.
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+# Modules that importing pyhtml must not import.
+HEAVY_MODULES: tuple = ("argparse", "asyncio", "concurrent.futures", "inspect", "tempfile")
+
+
+def best_run(code: str, repeat: int) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=ROOT)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def loaded_modules() -> list:
+    code: str = f"import sys, pyhtml; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    return subprocess.run([sys.executable, "-c", code], check=True, cwd=ROOT, capture_output=True,
+                          text=True).stdout.split()
+
+
+def call_overhead(repeat: int, calls: int = 1000) -> float:
+    """The best time of a compile_pyhtml call on a one line document, in seconds."""
+    from pyhtml import compile_pyhtml
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        for _ in range(calls):
+            compile_pyhtml("p:\n")
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="import time and call overhead of pyhtml")
+    parser.add_argument("-r", "--repeat", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float, default=None, help="fail if the import takes longer")
+    parser.add_argument("--max-call-us", type=float, default=None, help="fail if a call takes longer")
+    args = parser.parse_args()
+
+    # The first run writes the bytecode of pyhtml, if it can.
+    best_run("import pyhtml", 1)
+    import_ms: float = (best_run("import pyhtml", args.repeat) - best_run("pass", args.repeat)) * 1000
+    call_us: float = call_overhead(args.repeat) * 1e6
+    modules: list = loaded_modules()
+    print(f"{'import ms':>10} {'call us':>8}  heavy modules")
+    print(f"{import_ms:>10.1f} {call_us:>8.1f}  {', '.join(modules) or '-'}")
+
+    failed: list = []
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failed.append(f"import takes {import_ms:.1f}ms, more than {args.max_import_ms}ms")
+    if args.max_call_us is not None and call_us > args.max_call_us:
+        failed.append(f"a call takes {call_us:.1f}us, more than {args.max_call_us}us")
+    if modules:
+        failed.append(f"import pyhtml loads {', '.join(modules)}")
+    for message in failed:
+        print(message, "(╥﹏╥)", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Time to compile a site whose pages share a header, a nav and a footer, with the shared parts
+copied into every page against included from partials, and the time of a cached rebuild after
+one partial changed, which only compiles the pages that include it.
+
+Usage:
+    python3 benchmarks/bench_include.py [pages ...]
+"""
+# Standard library imports.
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import CompileCache, compile_many
+
+
+def partial_source(name: str, links: int) -> str:
+    """A partial with an element and a list of links."""
+    lines: list = [f'{name} class="site-{name}":', "    ul:"]
+    for i in range(links):
+        lines += ["        li:", f'            a href="/{name}/{i}":', f'                << "{name} link {i}"']
+    return "\n".join(lines) + "\n"
+
+
+PARTIALS: dict = {
+    "_header.pyhtml": partial_source("header", 10),
+    "_nav.pyhtml": partial_source("nav", 40),
+    "_aside.pyhtml": partial_source("aside", 20),
+    "_footer.pyhtml": partial_source("footer", 20),
+}
+
+
+def page_source(page: int, inline: bool) -> str:
+    """A page with its own content between the partials, every second page has the aside."""
+    names: list = ["_header.pyhtml", "_nav.pyhtml"] + (["_aside.pyhtml"] if page % 2 else [])
+    lines: list = ["html:", "    body:"]
+    for name in names:
+        lines += ["        " + line for line in PARTIALS[name].splitlines()] if inline else [f'        include "{name}"']
+    lines += ["        div:", "            p:", f'                << "content of page {page}"']
+    lines += ["        " + line for line in PARTIALS["_footer.pyhtml"].splitlines()] if inline else ['        include "_footer.pyhtml"']
+    return "\n".join(lines) + "\n"
+
+
+def write_site(directory: Path, pages: int, inline: bool):
+    directory.mkdir()
+    if not inline:
+        for name, src in PARTIALS.items():
+            (directory / name).write_text(src)
+    for page in range(pages):
+        (directory / f"page{page}.pyhtml").write_text(page_source(page, inline))
+
+
+def timed(fnc) -> tuple:
+    start: float = time.perf_counter()
+    result = fnc()
+    return time.perf_counter() - start, result
+
+
+def main():
+    counts: list = [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000]
+    print(f"{'pages':>6} {'inline ms':>10} {'include ms':>11} {'speedup':>8} {'rebuild ms':>11} {'recompiled':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        for pages in counts:
+            inline: Path = Path(directory) / f"inline{pages}"
+            included: Path = Path(directory) / f"include{pages}"
+            write_site(inline, pages, True)
+            write_site(included, pages, False)
+            inline_seconds, _ = timed(lambda: compile_many([inline]))
+            include_seconds, results = timed(lambda: compile_many([included]))
+            assert all(result.error is None for result in results)
+            cache = CompileCache(Path(directory) / f"cache{pages}")
+            compile_many([included], cache=cache)
+            aside: Path = included / "_aside.pyhtml"
+            aside.write_text(aside.read_text().replace("aside link", "sidebar link"))
+            rebuild_seconds, results = timed(lambda: compile_many([included], cache=cache))
+            recompiled: int = sum(result.cached is False for result in results)
+            print(f"{pages:>6} {inline_seconds * 1000:>10.1f} {include_seconds * 1000:>11.1f}"
+                  f" {inline_seconds / include_seconds:>7.1f}x {rebuild_seconds * 1000:>11.1f} {recompiled:>11}")
+
+
+if __name__ == "__main__":
+    main()
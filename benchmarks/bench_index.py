@@ -0,0 +1,58 @@
+"""Time of ElementIndex.select against walking the whole tree for the same elements, and the time
+to build the index.
+
+Usage:
+    python3 benchmarks/bench_index.py [sections ...]
+"""
+# Standard library imports.
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import ElementIndex, HTMLElement, parse_pyhtml
+from generators import mixed
+
+
+def best_time(fnc, repeat: int = 5) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        fnc()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def walk_select(root: HTMLElement, id_value: str) -> list:
+    """The a elements below the element with the id, found by walking the tree."""
+    found: list = []
+    stack: list = [(root, False)]
+    while stack:
+        element, inside = stack.pop()
+        if element._tag == "a" and inside:
+            found.append(element)
+        inside = inside or any(attribute._name == "id" and attribute._value == id_value
+                               for attribute in element._attributes)
+        stack.extend((child, inside) for child in reversed(element._childs) if isinstance(child, HTMLElement))
+    return found
+
+
+def main():
+    counts: list = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000]
+    print(f"{'sections':>9} {'index ms':>9} {'walk ms':>8} {'select ms':>10} {'speedup':>8}")
+    for sections in counts:
+        # A mixed section is about 200 bytes.
+        root: HTMLElement = parse_pyhtml(mixed(sections * 200), "iterative")
+        index = ElementIndex(root)
+        id_value: str = f"s{sections // 2}"
+        assert index.select(f"#{id_value} a") == walk_select(root, id_value)
+        indexed: float = best_time(lambda: ElementIndex(root))
+        walked: float = best_time(lambda: walk_select(root, id_value))
+        selected: float = best_time(lambda: index.select(f"#{id_value} a"))
+        print(f"{sections:>9} {indexed * 1000:>9.3f} {walked * 1000:>8.3f} {selected * 1000:>10.3f} {walked / selected:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
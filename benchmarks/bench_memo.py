@@ -0,0 +1,89 @@
+"""Parse time per token with and without the packrat memo table.
+
+Usage:
+    python3 benchmarks/bench_memo.py [lines ...]
+"""
+# Standard library imports.
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import Tokenizer, Parser, TokenType
+from bench_parser import generate
+
+
+class CountingParser(Parser):
+    evaluations: int = 0
+
+    def _match_rule(self, fnc_name: str, pos: int) -> tuple | None:
+        self.evaluations += 1
+        return Parser._match_rule(self, fnc_name, pos)
+
+
+class ListParser(Parser):
+    """The parser before the match tree: every rule concatenates the matches of its sub rules
+    and counts their tokens again, which is quadratic in the nesting depth."""
+
+    def match(self, fnc_name: str, pos: int = 0) -> list | None:
+        tokens = self._tokens
+        for rule_fnc, rule_tokens in self._grammar.get(fnc_name, ()):
+            matched_tokens = []
+            return_tokens: list = [(rule_fnc, matched_tokens)]
+            current_pos: int = pos
+            for i, rule_token in enumerate(rule_tokens):
+                if current_pos + i + 1 > len(tokens):
+                    break
+                token = tokens[current_pos + i]
+                token.pos = current_pos + i
+                if rule_token.__class__ is TokenType:
+                    if token.token_type is rule_token:
+                        matched_tokens.append(token)
+                        self._last_correct_token = token
+                        continue
+                    break
+                else:
+                    matches = self.match(rule_token, current_pos + i)
+                    if matches is not None:
+                        current_pos += self.count_tokens(matches) - 1
+                        return_tokens += matches
+                    else:
+                        break
+            else:
+                return return_tokens
+        return None
+
+
+def bench(tokens: list, repeat: int = 3, **kwargs) -> tuple:
+    best: float = float("inf")
+    for _ in range(repeat):
+        parser = CountingParser(tokens, **kwargs)
+        start: float = time.perf_counter()
+        parser.parse()
+        best = min(best, time.perf_counter() - start)
+    return best, parser.evaluations
+
+
+def main():
+    sys.setrecursionlimit(100000)
+    sizes: list = [int(arg) for arg in sys.argv[1:]] or [250, 1000, 2000, 4000]
+    print(f"{'lines':>8} {'tokens':>8} {'list':>12} {'no memo':>12} {'memo':>12} {'memo 1000':>12} {'evaluations':>12}")
+    for lines in sizes:
+        tokenizer = Tokenizer(generate(lines))
+        tokenizer.parse()
+        tokens: list = tokenizer.tokens
+        per_token = lambda seconds: f"{seconds / len(tokens) * 1e6:>8.2f}us/t"
+        start: float = time.perf_counter()
+        ListParser(tokens).parse()
+        list_time = time.perf_counter() - start
+        plain_time, plain_evaluations = bench(tokens, memoize=False)
+        memo_time, memo_evaluations = bench(tokens)
+        bounded_time, _ = bench(tokens, memo_size=1000)
+        print(f"{lines:>8} {len(tokens):>8} {per_token(list_time)} {per_token(plain_time)} {per_token(memo_time)} "
+              f"{per_token(bounded_time)} {plain_evaluations:>5}/{memo_evaluations:<6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Size and time of the html of the Compiler and the MinifiedCompiler, uncompressed and gzip
+compressed at several levels, on the documents of generators.py.
+
+Usage:
+    python3 benchmarks/bench_minify.py [size] [levels]
+    python3 benchmarks/bench_minify.py 1M 1,6,9
+"""
+# Standard library imports.
+import gzip
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import Compiler, MinifiedCompiler, parse_pyhtml
+from generators import GENERATORS
+from bench_suite import parse_size
+
+
+def best_time(fnc, repeat: int = 3):
+    """Returns the best time of the function and its result."""
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        result = fnc()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    size: int = parse_size(sys.argv[1]) if len(sys.argv) > 1 else 1 << 20
+    levels: list = [int(level) for level in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1, 6, 9]
+    print(f"{'generator':>10} {'mode':>7} {'html KB':>8} {'saved':>6} {'compile ms':>11}"
+          + "".join(f" {f'gzip{level} KB':>10} {f'gzip{level} ms':>10}" for level in levels))
+    for name, generator in GENERATORS.items():
+        element = parse_pyhtml(generator(size), "iterative")
+        full: int = 0
+        for mode, compiler_class in (("indent", Compiler), ("minify", MinifiedCompiler)):
+            seconds, html = best_time(lambda: compiler_class(element).src)
+            data: bytes = html.encode()
+            full = full or len(data)
+            row: str = (f"{name:>10} {mode:>7} {len(data) / 1024:>8.1f} {1 - len(data) / full:>6.1%}"
+                        f" {seconds * 1000:>11.2f}")
+            for level in levels:
+                gzip_seconds, compressed = best_time(lambda: gzip.compress(data, level, mtime=0))
+                row += f" {len(compressed) / 1024:>10.1f} {gzip_seconds * 1000:>10.2f}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
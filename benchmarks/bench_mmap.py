@@ -0,0 +1,70 @@
+"""Peak memory and time of tokenizing a file that is read into a str against tokenizing its
+memory mapped bytes. Both keep the tokens in a compact array, the mapped pages of the file
+are not allocated by Python and so not counted.
+
+Usage:
+    python3 benchmarks/bench_mmap.py [lines ...]
+"""
+# Standard library imports.
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import Tokenizer, BytesTokenizer, map_file
+from bench_parser import generate
+
+
+def read_tokens(path: str) -> int:
+    with open(path, "r") as fh:
+        src: str = fh.read()
+    tokenizer: Tokenizer = Tokenizer(src, True)
+    tokenizer.parse()
+    return len(tokenizer.tokens)
+
+
+def map_tokens(path: str) -> int:
+    with map_file(path) as src:
+        tokenizer: BytesTokenizer = BytesTokenizer(src)
+        tokenizer.parse()
+        return len(tokenizer.tokens)
+
+
+def measure(fnc, path: str) -> tuple:
+    """Returns the peak of the allocated bytes and the time of the fastest of three runs."""
+    gc.collect()
+    tracemalloc.start()
+    fnc(path)
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    best: float = float("inf")
+    for _ in range(3):
+        gc.collect()
+        start: float = time.perf_counter()
+        fnc(path)
+        best = min(best, time.perf_counter() - start)
+    return peak, best
+
+
+def main():
+    sizes: list = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    print(f"{'lines':>8} {'file MB':>8} {'str peak MB':>12} {'mmap peak MB':>13} {'str s':>7} {'mmap s':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for lines in sizes:
+            path: str = os.path.join(directory, f"{lines}.pyhtml")
+            with open(path, "w") as fh:
+                fh.write(generate(lines).replace("text", "tëxt €"))
+            assert read_tokens(path) == map_tokens(path)
+            read_peak, read_time = measure(read_tokens, path)
+            map_peak, map_time = measure(map_tokens, path)
+            print(f"{lines:>8} {os.path.getsize(path) / 1e6:>8.1f} {read_peak / 1e6:>12.1f} {map_peak / 1e6:>13.1f}"
+                  f" {read_time:>7.3f} {map_time:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
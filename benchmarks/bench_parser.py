@@ -0,0 +1,89 @@
+"""Parse time of the compiled grammar table against per-call docstring scanning.
+
+Usage:
+    python3 benchmarks/bench_parser.py [lines ...]
+"""
+# Standard library imports.
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import Tokenizer, Parser, TokenType
+
+
+class DocstringParser(Parser):
+    """The parser as it was before the grammar table: every match call collects the rule
+    functions with getattr, sorts them and splits their docstrings again.
+    The debug logging is left out, it is not formatted by Parser.match either when debug is off."""
+
+    def match(self, fnc_name: str, pos: int = 0) -> list | None:
+        rule_fncs: list = self._rule_fncs(fnc_name)
+        tokens = self._tokens
+        for rule_fnc in rule_fncs:
+            rule_tokens = rule_fnc.__doc__.split(" ")
+            matched_tokens = []
+            return_tokens: list = [(rule_fnc, matched_tokens)]
+            current_pos: int = pos
+            for i, rule_token_name in enumerate(rule_tokens):
+                if current_pos + i + 1 > len(tokens):
+                    break
+                token = tokens[current_pos + i]
+                token.pos = current_pos + i
+                rule_token = getattr(TokenType, rule_token_name, None)
+                if rule_token is not None:
+                    if token.token_type is rule_token:
+                        matched_tokens.append(token)
+                        self._last_correct_token = token
+                        continue
+                    break
+                else:
+                    matches = self.match(rule_token_name, current_pos + i)
+                    if matches is not None:
+                        current_pos += self.count_tokens(matches) - 1
+                        return_tokens += matches
+                    else:
+                        break
+            else:
+                return return_tokens
+        return None
+
+
+def generate(lines: int) -> str:
+    src: list = ['html lang="en":']
+    while len(src) < lines:
+        src.append('    div class="section" id="s%d":' % len(src))
+        src.append('        style = "margin: 0;"')
+        src.append('        << "some text"')
+        src.append('        p:')
+        src.append('            << "paragraph"')
+        src.append('    << "after section"')
+    return "\n".join(src) + "\n"
+
+
+def bench(parser_class, src: str, repeat: int = 3) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        tokenizer = Tokenizer(src)
+        tokenizer.parse()
+        start: float = time.perf_counter()
+        parser_class(tokenizer.tokens).parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    sys.setrecursionlimit(100000)
+    sizes: list = [int(arg) for arg in sys.argv[1:]] or [100, 200, 400]
+    print(f"{'lines':>8} {'docstrings':>12} {'table':>12} {'speedup':>8}")
+    for lines in sizes:
+        src: str = generate(lines)
+        before: float = bench(DocstringParser, src)
+        after: float = bench(Parser, src)
+        print(f"{lines:>8} {before * 1000:>10.1f}ms {after * 1000:>10.1f}ms {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Load time of a pyhtmlc file against tokenizing and parsing the source again.
+The pyhtmlc file is timed when only the root is read, when every node was read and when
+the whole tree was compiled, the source when it was parsed and when it was compiled.
+
+Usage:
+    python3 benchmarks/bench_pyhtmlc.py [lines ...]
+"""
+# Standard library imports.
+import gc
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import Tokenizer, IterativeParser, Compiler, HTMLElement, PyhtmlcFile, write_pyhtmlc
+from bench_parser import generate
+
+
+def parse(src: str) -> HTMLElement:
+    tokenizer: Tokenizer = Tokenizer(src)
+    tokenizer.parse()
+    parser = IterativeParser(tokenizer.tokens)
+    parser.parse()
+    return parser._block_stack[0]
+
+
+def read_all(root: HTMLElement) -> int:
+    """Reads every node of the tree, returns their number."""
+    nodes: int = 0
+    stack: list = [root]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        if isinstance(node, HTMLElement):
+            stack.extend(node._attributes)
+            stack.extend(node._childs)
+    return nodes
+
+
+def best_time(fnc, repeat: int = 3) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start: float = time.perf_counter()
+        fnc()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    sizes: list = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    print(f"{'lines':>8} {'src KB':>7} {'pyhtmlc KB':>11} {'parse ms':>9} {'root ms':>8} {'all ms':>7}"
+          f" {'src+compile ms':>15} {'pyhtmlc+compile ms':>19}")
+    with tempfile.TemporaryDirectory() as directory:
+        for lines in sizes:
+            src: str = generate(lines)
+            path: str = os.path.join(directory, f"{lines}.pyhtmlc")
+            with open(path, "wb") as fh:
+                write_pyhtmlc(parse(src), fh)
+            parsed: float = best_time(lambda: parse(src))
+            root: float = best_time(lambda: PyhtmlcFile(path).root)
+            loaded: float = best_time(lambda: read_all(PyhtmlcFile(path).root))
+            compiled: float = best_time(lambda: Compiler(parse(src)).src)
+            loaded_compiled: float = best_time(lambda: Compiler(PyhtmlcFile(path).root).src)
+            assert Compiler(parse(src)).src == Compiler(PyhtmlcFile(path).root).src
+            print(f"{lines:>8} {len(src.encode()) / 1024:>7.0f} {os.path.getsize(path) / 1024:>11.0f} {parsed * 1000:>9.1f}"
+                  f" {root * 1000:>8.3f} {loaded * 1000:>7.1f} {compiled * 1000:>15.1f} {loaded_compiled * 1000:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Times the tokenizer, the parser and the compiler on the synthetic documents of generators.py
+and compares the results of two runs, it needs nothing but the standard library.
+
+Usage:
+    python3 benchmarks/bench_suite.py run [-g deep,wide] [-s 1K,100K,10M] [-r 3] [-o results.json]
+    python3 benchmarks/bench_suite.py compare base.json results.json [-t 0.1]
+
+run prints a table and saves it as JSON, compare prints the phases that got slower by more than
+the threshold and exits with 1 if there are any. The default sizes go up to 1M, larger
+documents like 100M need a few GB of memory and minutes per phase.
+"""
+# Standard library imports.
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import Tokenizer, IterativeParser, Compiler
+from generators import GENERATORS
+
+PHASES: tuple = ("tokenize", "parse", "compile")
+UNITS: dict = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(size: str) -> int:
+    size = size.strip().upper()
+    if size[-1:] in UNITS:
+        return int(float(size[:-1]) * UNITS[size[-1]])
+    return int(size)
+
+
+def format_size(size: int) -> str:
+    for unit in ("G", "M", "K"):
+        if size >= UNITS[unit] and size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return str(size)
+
+
+def time_phases(src: str, repeat: int, compact: bool) -> dict:
+    """Returns the fastest time of each phase over repeat runs and the number of tokens.
+    The garbage collector is off while a phase is timed."""
+    best: dict = dict.fromkeys(PHASES, float("inf"))
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start: float = time.perf_counter()
+            tokenizer: Tokenizer = Tokenizer(src, compact)
+            tokenizer.parse()
+            tokenized: float = time.perf_counter()
+            parser = IterativeParser(tokenizer.tokens)
+            parser.parse()
+            parsed: float = time.perf_counter()
+            html: str = Compiler(parser._block_stack[0]).src
+            compiled: float = time.perf_counter()
+        finally:
+            gc.enable()
+        best["tokenize"] = min(best["tokenize"], tokenized - start)
+        best["parse"] = min(best["parse"], parsed - tokenized)
+        best["compile"] = min(best["compile"], compiled - parsed)
+        tokens: int = len(tokenizer.tokens)
+        del tokenizer, parser, html
+    return {"seconds": best, "tokens": tokens}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    generators: list = args.generators.split(",")
+    sizes: list = [parse_size(size) for size in args.sizes.split(",")]
+    results: list = []
+    print(f"{'generator':>10} {'size':>6} {'tokens':>9} {'tokenize s':>11} {'parse s':>9} {'compile s':>10} {'MB/s':>7}")
+    for name in generators:
+        for size in sizes:
+            src: str = GENERATORS[name](size)
+            measured: dict = time_phases(src, args.repeat, args.compact)
+            seconds: dict = measured["seconds"]
+            total: float = sum(seconds.values())
+            results.append({"generator": name, "size": size, "bytes": len(src.encode()), "tokens": measured["tokens"],
+                            "seconds": seconds})
+            print(f"{name:>10} {format_size(size):>6} {measured['tokens']:>9} {seconds['tokenize']:>11.4f}"
+                  f" {seconds['parse']:>9.4f} {seconds['compile']:>10.4f} {len(src.encode()) / total / 1e6:>7.2f}")
+    report: dict = {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": args.repeat,
+        "compact": args.compact,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"saved {args.output}")
+
+
+def compare(args) -> int:
+    with open(args.base) as fh:
+        base: dict = json.load(fh)
+    with open(args.new) as fh:
+        new: dict = json.load(fh)
+    base_results: dict = {(result["generator"], result["size"]): result for result in base["results"]}
+    regressions: int = 0
+    print(f"{'generator':>10} {'size':>6} {'phase':>9} {'base s':>9} {'new s':>9} {'change':>8}")
+    for result in new["results"]:
+        key: tuple = (result["generator"], result["size"])
+        if key not in base_results:
+            continue
+        for phase in PHASES:
+            before: float = base_results[key]["seconds"][phase]
+            after: float = result["seconds"][phase]
+            # Phases faster than the resolution of a single run are only noise.
+            if before < args.min_seconds and after < args.min_seconds:
+                continue
+            change: float = after / before - 1 if before else float("inf")
+            flag: str = ""
+            if change > args.threshold:
+                regressions += 1
+                flag = " slower (╥﹏╥)"
+            print(f"{key[0]:>10} {format_size(key[1]):>6} {phase:>9} {before:>9.4f} {after:>9.4f} {change:>+8.1%}{flag}")
+    if regressions:
+        print(f"{regressions} regressions above {args.threshold:.0%}")
+        return 1
+    print("no regressions (˶ᵔ ᵕ ᵔ˶)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmarks of the tokenizer, parser and compiler phases")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="time the phases on synthetic documents")
+    run_parser.add_argument("-g", "--generators", default=",".join(GENERATORS), help="comma separated, of: " + ", ".join(GENERATORS))
+    run_parser.add_argument("-s", "--sizes", default="1K,10K,100K,1M", help="comma separated sizes like 1K, 10M")
+    run_parser.add_argument("-r", "--repeat", type=int, default=3, help="the fastest of that many runs is taken")
+    run_parser.add_argument("-o", "--output", default=None, help="JSON file the results are saved to")
+    run_parser.add_argument("--compact", action="store_true", help="keep the tokens in compact arrays")
+    compare_parser = commands.add_parser("compare", help="flag the phases that got slower")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("-t", "--threshold", type=float, default=0.1, help="relative slowdown that is a regression")
+    compare_parser.add_argument("--min-seconds", type=float, default=0.001, help="phases faster than this in both runs are skipped")
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
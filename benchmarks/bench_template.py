@@ -0,0 +1,53 @@
+"""Render time of a precompiled Template against compiling the source again and walking the tree
+with the Compiler on every render.
+
+Usage:
+    python3 benchmarks/bench_template.py [items ...]
+"""
+# Standard library imports.
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import Compiler, compile_pyhtml, parse_pyhtml, compile_template
+
+
+def template_source(items: int) -> str:
+    """A page with a title and a list of items, each with two placeholders."""
+    lines: list = ['html:', '    head:', '        title:', '            << "{title}"', '    body:', '        ul class="items":']
+    for i in range(items):
+        lines += [f'            li class="item" id="item{i}":', f'                << "{{name{i}}}: {{price{i}:.2f}}"']
+    return "\n".join(lines) + "\n"
+
+
+def best_time(fnc, repeat: int = 5) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        fnc()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    counts: list = [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000]
+    print(f"{'items':>6} {'compile ms':>11} {'tree walk ms':>13} {'template ms':>12} {'speedup':>8}")
+    for items in counts:
+        src: str = template_source(items)
+        context: dict = {"title": "Prices"}
+        for i in range(items):
+            context[f"name{i}"] = f"item {i}"
+            context[f"price{i}"] = i * 1.5
+        template = compile_template(src, "iterative")
+        element = parse_pyhtml(src, "iterative")
+        compiled: float = best_time(lambda: compile_pyhtml(src, "iterative").format_map(context))
+        walked: float = best_time(lambda: Compiler(element).src.format_map(context))
+        rendered: float = best_time(lambda: template.render(context))
+        print(f"{items:>6} {compiled * 1000:>11.3f} {walked * 1000:>13.3f} {rendered * 1000:>12.3f} {walked / rendered:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Throughput of the Tokenizer against the character at a time CharTokenizer.
+
+Usage:
+    python3 benchmarks/bench_tokenizer.py [kilobytes ...]
+"""
+# Standard library imports.
+import gc
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import Tokenizer, Token, TokenType, BlockTyp
+from bench_parser import generate
+
+
+class CharTokenizer(Tokenizer):
+    """The tokenizer as it was before the regular expressions: it walks the source one character
+    at a time. tests/test_tokenizer.py keeps it as the reference, both produce the same tokens."""
+
+    def __init__(self, src):
+        self._last_indent = ""
+        self.tokens = tokens = []
+        token: str = ""
+        last_char: str = ""
+        is_indendation: bool = False
+        colon: bool = False
+        text_block: bool = True
+        string: bool = False
+        line: int = 1
+        row: int = 0
+        for char in src:
+            row += 1
+            if is_indendation:
+                if char != " ":
+                    if self._last_indent is not None:
+                        pass
+                    if self._last_indent is not None and len(self._last_indent) <= len(token):
+                        tokens.append(Token(token, line, row, TokenType.INDENT))
+                    else:
+                        tokens.append(Token(token, line, row, TokenType.UNINDENT))
+                    self._last_indent = token
+                    token = char
+                    is_indendation = False
+                    last_char = char
+                    continue
+                else:
+                    token += char
+                    continue
+            elif is_indendation and last_char == " ":
+                token += " "
+            elif string:
+                if char == '"' and last_char != "\\":
+                    string = False
+                    #tokens.append(Token(token, line, row, TokenType.STRING))
+                    tokens.append(Token(token, line, row, TokenType.VALUE))
+                    token = ""
+                    last_char = char
+                    continue
+            elif char in self.delimiters and not string:
+                if token and char != "<":
+                    tokens.append(Token(token, line, row))
+                    token = ""
+                if char == "\n":
+                    line += 1
+                    row = 0
+                    is_indendation = True
+                    tokens.append(Token(char, line, row, TokenType.NEWLINE))
+                    if colon:
+                        current_block = BlockTyp.HTML_ELEMENT
+                        token = ""
+                        last_char = char
+                        continue
+                    else:
+                        current_block = BlockTyp.TEXT_BLOCK
+                        continue
+                elif char == "<":
+                    if last_char == "<":
+                        tokens.append(Token("<<", line, row, TokenType.ADD_TEXT))
+                        token = ""
+                    last_char = char
+                    continue
+                elif char == "=":
+                    tokens.append(Token(char, line, row, TokenType.ASSIGMENT))
+                    continue
+                elif char == ":":
+                    tokens.append(Token(char, line, row, TokenType.COLON))
+                    colon = True
+                    continue
+                elif char == " ":
+                    continue
+                elif char == '"':
+                    string = True
+                    continue
+            token += char
+            last_char = char
+
+
+def generate_text(size: int) -> str:
+    paragraph: str = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20
+    src: list = ["div:"]
+    length: int = 0
+    while length < size:
+        src.append('    p class="text":')
+        src.append('        << "%s' % paragraph)
+        src.append('%s"' % paragraph)
+        length += 2 * len(paragraph) + 40
+    return "\n".join(src) + "\n"
+
+
+def generate_markup(size: int) -> str:
+    return generate(size // 25)
+
+
+def throughput(tokenizer_class, src: str, repeat: int = 5) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start: float = time.perf_counter()
+        tokenizer_class(src)
+        best = min(best, time.perf_counter() - start)
+    return len(src.encode()) / best / 1e6
+
+
+def main():
+    sizes: list = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000]
+    print(f"{'document':>10} {'kB':>8} {'CharTokenizer':>14} {'Tokenizer':>14} {'speedup':>8}")
+    for size in sizes:
+        for name, generator in (("text", generate_text), ("markup", generate_markup)):
+            src: str = generator(size * 1000)
+            before: float = throughput(CharTokenizer, src)
+            after: float = throughput(Tokenizer, src)
+            print(f"{name:>10} {size:>8} {before:>9.1f}MB/s {after:>9.1f}MB/s {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
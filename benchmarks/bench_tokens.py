@@ -0,0 +1,57 @@
+"""Memory and time of the tokens stored as a list of Token objects against the compact TokenArray.
+
+Usage:
+    python3 benchmarks/bench_tokens.py [lines ...]
+"""
+# Standard library imports.
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local application/library specific imports.
+from pyhtml import Tokenizer, IterativeParser
+from bench_parser import generate
+
+
+def token_memory(src: str, compact: bool) -> tuple:
+    """Returns the number of tokens and the bytes allocated for them by the tokenizer."""
+    gc.collect()
+    tracemalloc.start()
+    tokenizer: Tokenizer = Tokenizer(src, compact)
+    tokenizer.parse()
+    size: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return len(tokenizer.tokens), size
+
+
+def parse_time(src: str, compact: bool, repeat: int = 3) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start: float = time.perf_counter()
+        tokenizer: Tokenizer = Tokenizer(src, compact)
+        tokenizer.parse()
+        IterativeParser(tokenizer.tokens).parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    sizes: list = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    print(f"{'lines':>8} {'tokens':>9} {'Token B/tok':>12} {'compact B/tok':>14} {'Token s':>9} {'compact s':>10}")
+    for lines in sizes:
+        src: str = generate(lines)
+        token_count, list_size = token_memory(src, False)
+        _, compact_size = token_memory(src, True)
+        list_time: float = parse_time(src, False)
+        compact_time: float = parse_time(src, True)
+        print(f"{lines:>8} {token_count:>9} {list_size / token_count:>12.1f} {compact_size / token_count:>14.1f}"
+              f" {list_time:>9.3f} {compact_time:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
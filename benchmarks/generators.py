@@ -0,0 +1,72 @@
+"""Synthetic pyhtml documents of a given size for the benchmarks.
+Every generator returns the same document for the same size, they do not use random numbers.
+The documents are made of whole blocks, so they are at least size bytes and less than one
+block larger.
+"""
+
+
+def _repeat(head: str, block, size: int) -> str:
+    """Returns head followed by block(i) for i = 0, 1, ... until the document has size bytes."""
+    parts: list = [head]
+    length: int = len(head.encode())
+    i: int = 0
+    while length < size:
+        part: str = block(i)
+        parts.append(part)
+        length += len(part.encode())
+        i += 1
+    return "".join(parts)
+
+
+def deep(size: int, depth: int = 100) -> str:
+    """Elements nested depth levels deep, again and again."""
+    def block(i: int) -> str:
+        return "".join(f'{"    " * level}div class="level{level}":\n' for level in range(1, depth + 1)) + \
+            f'{"    " * (depth + 1)}<< "leaf {i}"\n'
+    return _repeat("html:\n", block, size)
+
+
+def wide(size: int) -> str:
+    """One long list of sibling elements."""
+    return _repeat("html:\n    ul:\n", lambda i: f'        li:\n            << "item {i}"\n', size)
+
+
+def attributes(size: int) -> str:
+    """Elements with many attributes on their line and as attribute lines."""
+    def block(i: int) -> str:
+        return (f'    input type="text" name="field{i}" id="f{i}" class="input wide" value="" placeholder="value {i}":\n'
+                f'        data-index = "{i}"\n'
+                f'        style = "width: 100%; margin: 0 auto;"\n'
+                f'        aria-label = "field {i}"\n')
+    return _repeat('html lang="en":\n', block, size)
+
+
+def text(size: int, lines: int = 20) -> str:
+    """Long texts over many lines."""
+    def block(i: int) -> str:
+        paragraph: str = "\n".join(f"line {j} of paragraph {i} with some words in it" for j in range(lines))
+        return f'    p:\n        << "{paragraph}"\n'
+    return _repeat("html:\n", block, size)
+
+
+def mixed(size: int) -> str:
+    """Sections like a written document has them."""
+    def block(i: int) -> str:
+        return (f'    div class="section" id="s{i}":\n'
+                f'        style = "margin: 0;"\n'
+                f'        h2:\n'
+                f'            << "Section {i}"\n'
+                f'        p:\n'
+                f'            << "some text"\n'
+                f'            a href="#s{i}":\n'
+                f'                << "link"\n')
+    return _repeat("html:\n", block, size)
+
+
+GENERATORS: dict = {
+    "deep": deep,
+    "wide": wide,
+    "attributes": attributes,
+    "text": text,
+    "mixed": mixed,
+}
@@ -1,19 +1,34 @@
 # Standard library imports.
 import sys
+import os
+import io
+import codecs
+import hashlib
+import threading
+import mmap
+import struct
+import string
+from functools import lru_cache
+from html import escape as escape_html
+from functools import partial
+import time
+from collections import Counter, OrderedDict
+from array import array
 from enum import Enum
+import re
 from pathlib import Path
-import argparse
+from types import MappingProxyType
 import logging
-
+from bisect import bisect_right
+from itertools import accumulate
+from operator import attrgetter, itemgetter
+from contextlib import contextmanager, ExitStack
+
+# The module only logs, the handlers are up to the application, see pyhtml_cli --debug.
+# asyncio, concurrent.futures, inspect and tempfile are imported by the functions that use them,
+# they take longer to import than the rest of the module.
 logger = logging.getLogger(__name__)
 
-handler = logging.StreamHandler(sys.stdout)
-#handler.setLevel(logging.DEBUG)
-#formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-formatter = logging.Formatter("%(name)s - %(levelname)s - %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
-
 # Related third party imports.
 
 # Local application/library specific imports.
@@ -24,6 +39,12 @@ class BlockTyp(Enum):
     HTML_ELEMENT = 2
 
 
+class ScanMode(Enum):
+    TEXT = 1
+    INDENTATION = 2
+    STRING = 3
+
+
 class TokenType(Enum):
     HTML_ELEMENT = 1
     ATTRIBUTE = 2
@@ -36,6 +57,7 @@ class TokenType(Enum):
     TEXT_BLOCK = 9
     STRING = 10
     ADD_TEXT = 11
+    INCLUDE = 12
 
 
 class SyntaxError(Exception):
@@ -57,24 +79,178 @@ class Token:
         return f"Token('{self.token}', {self.line}, {self.row}, {self.token_type})"
 
 
+TOKEN_TYPES: tuple = (None,) + tuple(TokenType)
+
+
+class TokenArray:
+    """Tokens stored column wise in arrays instead of one Token object per token:
+        types: the value of the TokenType or 0
+        starts, ends: the slice of the source the token is taken from
+        lines, rows: the position like Token.line and Token.row
+    The text of a token is only sliced from the source when it is asked for. Indexing the
+    array returns a TokenRef that reads and writes the columns like a Token.
+    """
+
+    def __init__(self, src: str):
+        self._src: str = src
+        self.types: array = array("b")
+        self.starts: array = array("q")
+        self.ends: array = array("q")
+        self.lines: array = array("i")
+        self.rows: array = array("i")
+        # The texts of the few tokens that are not a slice of the source, like "ab" from "a<b".
+        self._texts: dict = {}
+
+    def append(self, token: str, line: int, row: int, token_type: TokenType | None, end: int):
+        start: int = end - len(token)
+        if not self._src.startswith(token, start):
+            self._texts[len(self.types)] = token
+        self.types.append(token_type.value if token_type is not None else 0)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+        self.rows.append(row)
+
+    def token(self, i: int) -> str:
+        if i in self._texts:
+            return self._texts[i]
+        return self._src[self.starts[i]:self.ends[i]]
+
+    def row(self, i: int) -> int:
+        return self.rows[i]
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, i: int | slice):
+        if isinstance(i, slice):
+            return [TokenRef(self, j) for j in range(*i.indices(len(self.types)))]
+        if i < 0:
+            i += len(self.types)
+        if not 0 <= i < len(self.types):
+            raise IndexError("token index out of range")
+        return TokenRef(self, i)
+
+    def __iter__(self):
+        for i in range(len(self.types)):
+            yield TokenRef(self, i)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class BytesTokenArray(TokenArray):
+    """A TokenArray over a utf-8 encoded bytes-like source, like a mmap of a file.
+    The text of a token is decoded when it is asked for. The rows are kept in bytes and counted
+    in characters from the start of their line when they are asked for, like for a SyntaxError.
+    """
+
+    def __init__(self, src):
+        super().__init__(src)
+        # The start of each line by its number, line 1 starts at 0.
+        self._line_starts: array = array("q", [0, 0])
+
+    def append(self, token: bytes, line: int, row: int, token_type: TokenType | None, end: int):
+        start: int = end - len(token)
+        if self._src[start:end] != token:
+            self._texts[len(self.types)] = str(token, "utf-8")
+        if token_type is TokenType.NEWLINE:
+            self._line_starts.append(end)
+        self.types.append(token_type.value if token_type is not None else 0)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+        self.rows.append(row)
+
+    def token(self, i: int) -> str:
+        if i in self._texts:
+            return self._texts[i]
+        return str(self._src[self.starts[i]:self.ends[i]], "utf-8")
+
+    def row(self, i: int) -> int:
+        row: int = self.rows[i]
+        if row <= 1:
+            return row
+        start: int = self._line_starts[self.lines[i]]
+        return len(str(self._src[start:start + row - 1], "utf-8", "replace")) + 1
+
+
+class TokenRef:
+    """A token of a TokenArray, it has the attributes of a Token."""
+
+    __slots__ = ("_tokens", "pos")
+
+    def __init__(self, tokens: TokenArray, pos: int):
+        self._tokens: TokenArray = tokens
+        self.pos: int = pos
+
+    @property
+    def token(self) -> str:
+        return self._tokens.token(self.pos)
+
+    @property
+    def line(self) -> int:
+        return self._tokens.lines[self.pos]
+
+    @property
+    def row(self) -> int:
+        return self._tokens.row(self.pos)
+
+    @property
+    def token_type(self) -> TokenType | None:
+        return TOKEN_TYPES[self._tokens.types[self.pos]]
+
+    @token_type.setter
+    def token_type(self, token_type: TokenType | None):
+        self._tokens.types[self.pos] = token_type.value if token_type is not None else 0
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, TokenRef) and self._tokens is other._tokens and self.pos == other.pos
+
+    def __hash__(self) -> int:
+        return hash((id(self._tokens), self.pos))
+
+    def __repr__(self):
+        return f"Token('{self.token}', {self.line}, {self.row}, {self.token_type})"
+
+
 class BaseElement:
-    pass
+    __slots__ = ()
 
 
 class HTMLElement(BaseElement):
+    """An element of the document.
+    The attributes are kept apart from the child elements, both start as a shared empty tuple
+    and become a list with the first appended node. The indent and the tag are interned, so
+    the elements of a document share the few different strings.
+    """
+
+    __slots__ = ("_indent", "_tag", "_attributes", "_childs")
+
     def __init__(self, indent: str, tag: str):
-        self._indent = indent
-        self._tag = tag
-        self._childs: list = []
+        self._indent: str = sys.intern(indent)
+        self._tag: str = sys.intern(tag)
+        self._attributes: list | tuple = ()
+        self._childs: list | tuple = ()
 
     def append(self, child):
-        self._childs.append(child)
+        if isinstance(child, Attribute):
+            if self._attributes:
+                self._attributes.append(child)
+            else:
+                self._attributes = [child]
+        elif self._childs:
+            self._childs.append(child)
+        else:
+            self._childs = [child]
 
     def __repr__(self):
-        return f"{self.__class__.__name__}({self._tag}, {repr(self._childs)})"
+        return f"{self.__class__.__name__}({self._tag}, {repr(list(self._attributes))}, {repr(list(self._childs))})"
 
 
 class Block(BaseElement):
+    __slots__ = ("_childs",)
+
     def __init__(self, childs: list):
         self._childs = [childs]
 
@@ -90,6 +266,8 @@ class Block(BaseElement):
 
 
 class AddText(BaseElement):
+    __slots__ = ("_value",)
+
     def __init__(self, value: str):
         self._value: str = value
 
@@ -104,9 +282,11 @@ class AddText(BaseElement):
 
 
 class Attribute(BaseElement):
+    __slots__ = ("_name", "_value")
+
     def __init__(self, name: str, value: str):
         self._value: str = value
-        self._name: str = name
+        self._name: str = sys.intern(name)
 
     def render(self):
         return f"{self._name} = '{value}'"
@@ -118,93 +298,231 @@ class Attribute(BaseElement):
         return f"{self._name}='{self._value}'"
 
 
+class Include(BaseElement):
+    """An include "_partial.pyhtml" line, the path is relative to the directory of the including
+    file. The partial it renders is set by Partials.resolve."""
+
+    __slots__ = ("_indent", "_path", "_partial", "_element")
+
+    def __init__(self, indent: str, path: str):
+        self._indent: str = sys.intern(indent)
+        self._path: str = path
+        self._partial: Partial | None = None
+        self._element: HTMLElement | None = None
+
+    @property
+    def element(self) -> HTMLElement:
+        """The elements of the partial indented like the include line, a copy per include line, so
+        the same partial included twice has different elements in an ElementIndex. Changing them
+        does not change the html of the include, that is compiled from the partial."""
+        if self._element is None:
+            self._element = self._partial.copy(self._indent)
+        return self._element
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._path})"
+
+
 class Tokenizer:
 
     #delimiters: list = [" ", "=", ":", "(", ")", "[", "]", "\n", '"', "<"]
     delimiters: list = [" ", "=", ":", "\n", '"', "<"]
 
-    def __init__(self, src):
-        self._last_indent = ""
-        self.tokens = tokens = []
-        token: str = ""
-        last_char: str = ""
-        is_indendation: bool = False
-        colon: bool = False
-        text_block: bool = True
-        string: bool = False
-        line: int = 1
-        row: int = 0
-        for char in src:
-            row += 1
-            if is_indendation:
-                if char != " ":
-                    if self._last_indent is not None:
-                        pass
-                    if self._last_indent is not None and len(self._last_indent) <= len(token):
-                        tokens.append(Token(token, line, row, TokenType.INDENT))
-                    else:
-                        tokens.append(Token(token, line, row, TokenType.UNINDENT))
-                    self._last_indent = token
-                    token = char
-                    is_indendation = False
-                    last_char = char
-                    continue
+    _delimiter_re = re.compile("[" + re.escape("".join(delimiters)) + "]")
+    _indent_re = re.compile(" *")
+    _text_line_re = re.compile(r'<< *"([^"\\]*)"')
+    _attribute_re = re.compile(r' +([^ =:\n"<\\]+)( *)=( *)"([^"\\]*)"')
+    _element_line_re = re.compile(r'([^ =:\n"<\\]+)((?:' + _attribute_re.pattern + ')*) *:')
+    _attribute_line_re = re.compile(r'([^ =:\n"<\\]+)( *)=( *)"([^"\\]*)"')
+    # The empty token and the characters _scan compares and adds: "", "<", '"', "=", ":", "\n", "\\"
+    _chars: tuple = ("", "<", '"', "=", ":", "\n", "\\")
+
+    def __init__(self, src, compact: bool = False):
+        """Splits the source into tokens.
+        The source is scanned from delimiter to delimiter and the text in between is taken
+        as one slice, strings are read up to their closing quote with str.find.
+        Lines in the common shapes are matched as a whole by a regular expression.
+        compact: stores the tokens in a TokenArray instead of a list of Token objects.
+        """
+        self.tokens = TokenArray(src) if compact else []
+        self._reset()
+        self._scan(src)
+
+    def _reset(self):
+        self._token: str = ""
+        self._last_char: str = ""
+        self._last_indent: str = ""
+        self._colon: bool = False
+        self._line: int = 1
+        self._row: int = 0
+        self._mode: ScanMode = ScanMode.TEXT
+
+    def _save_state(self) -> tuple:
+        """Returns the state of the scanner, _restore_state continues the scan from it."""
+        return (self._token, self._last_char, self._last_indent, self._colon, self._line, self._row, self._mode)
+
+    def _restore_state(self, state: tuple):
+        (self._token, self._last_char, self._last_indent, self._colon, self._line, self._row,
+         self._mode) = state
+
+    def _scan(self, src: str):
+        """Scans the next part of the source and appends the complete tokens to self.tokens.
+        The state of an unfinished token is kept, so the source can be scanned in parts.
+        The characters are read as slices of one character and compared with _chars, so the
+        same scan works on bytes.
+        """
+        if isinstance(self.tokens, TokenArray):
+            add = self.tokens.append
+        else:
+            append = self.tokens.append
+
+            def add(token: str, line: int, row: int, token_type: TokenType | None, end: int):
+                append(Token(token, line, row, token_type))
+        search = self._delimiter_re.search
+        indent_match = self._indent_re.match
+        text_line_match = self._text_line_re.match
+        element_line_match = self._element_line_re.match
+        attribute_line_match = self._attribute_line_re.match
+        attribute_finditer = self._attribute_re.finditer
+        find = src.find
+        empty, less, quote, equals, colon_char, newline_char, backslash = self._chars
+        add_text = less + less
+        end: int = len(src)
+        pos: int = 0
+        token: str = self._token
+        last_char: str = self._last_char
+        last_indent: str = self._last_indent
+        colon: bool = self._colon
+        line: int = self._line
+        mode: ScanMode = self._mode
+        # The row of the character at position k is k - newline.
+        newline: int = -1 - self._row
+        while True:
+            if mode is ScanMode.INDENTATION:
+                # The indentation ends with the first character that is not a space,
+                # this character starts the next token.
+                k: int = indent_match(src, pos).end()
+                token += src[pos:k]
+                if k == end:
+                    pos = end
+                    break
+                mode = ScanMode.TEXT
+                if len(last_indent) <= len(token):
+                    add(token, line, k - newline, TokenType.INDENT, k)
                 else:
-                    token += char
-                    continue
-            elif is_indendation and last_char == " ":
-                token += " "
-            elif string:
-                if char == '"' and last_char != "\\":
-                    string = False
-                    #tokens.append(Token(token, line, row, TokenType.STRING))
-                    tokens.append(Token(token, line, row, TokenType.VALUE))
-                    token = ""
-                    last_char = char
-                    continue
-            elif char in self.delimiters and not string:
-                if token and char != "<":
-                    tokens.append(Token(token, line, row))
-                    token = ""
-                if char == "\n":
-                    line += 1
-                    row = 0
-                    is_indendation = True
-                    tokens.append(Token(char, line, row, TokenType.NEWLINE))
-                    if colon:
-                        current_block = BlockTyp.HTML_ELEMENT
-                        token = ""
-                        last_char = char
+                    add(token, line, k - newline, TokenType.UNINDENT, k)
+                last_indent = token
+                token = empty
+                # Most lines are a text line, an element line or an attribute line,
+                # their tokens are taken from one match.
+                if src[k:k + 1] == less:
+                    match = text_line_match(src, k)
+                    if match is not None:
+                        add(add_text, line, k + 1 - newline, TokenType.ADD_TEXT, k + 2)
+                        pos = match.end()
+                        add(match.group(1), line, pos - 1 - newline, TokenType.VALUE, pos - 1)
+                        last_char = quote
                         continue
-                    else:
-                        current_block = BlockTyp.TEXT_BLOCK
+                else:
+                    match = element_line_match(src, k)
+                    if match is not None:
+                        add(match.group(1), line, match.end(1) - newline, None, match.end(1))
+                        last_char = src[match.end(1) - 1:match.end(1)]
+                        if match.end(2) > match.start(2):
+                            for attribute in attribute_finditer(src, match.start(2), match.end(2)):
+                                add(attribute.group(1), line, attribute.end(1) - newline, None, attribute.end(1))
+                                add(equals, line, attribute.end(2) - newline, TokenType.ASSIGMENT, attribute.end(2) + 1)
+                                add(attribute.group(4), line, attribute.end() - 1 - newline, TokenType.VALUE, attribute.end() - 1)
+                            last_char = quote
+                        pos = match.end()
+                        add(colon_char, line, pos - 1 - newline, TokenType.COLON, pos)
+                        colon = True
                         continue
-                elif char == "<":
-                    if last_char == "<":
-                        tokens.append(Token("<<", line, row, TokenType.ADD_TEXT))
-                        token = ""
+                    match = attribute_line_match(src, k)
+                    if match is not None:
+                        add(match.group(1), line, match.end(1) - newline, None, match.end(1))
+                        add(equals, line, match.end(2) - newline, TokenType.ASSIGMENT, match.end(2) + 1)
+                        pos = match.end()
+                        add(match.group(4), line, pos - 1 - newline, TokenType.VALUE, pos - 1)
+                        last_char = quote
+                        continue
+                token = last_char = src[k:k + 1]
+                pos = k + 1
+            elif mode is ScanMode.STRING:
+                k = find(quote, pos)
+                if k == -1:
+                    if pos < end:
+                        token += src[pos:]
+                        last_char = src[-1:]
+                        pos = end
+                    break
+                if k > pos:
+                    token += src[pos:k]
+                    last_char = src[k - 1:k]
+                pos = k + 1
+                if last_char != backslash:
+                    add(token, line, k - newline, TokenType.VALUE, k)
+                    token = empty
+                    last_char = quote
+                    mode = ScanMode.TEXT
+                else:
+                    token += quote
+                    last_char = quote
+                continue
+            match = search(src, pos)
+            if match is None:
+                if pos < end:
+                    token += src[pos:]
+                    last_char = src[-1:]
+                    pos = end
+                break
+            k = match.start()
+            if k > pos:
+                token += src[pos:k]
+                last_char = src[k - 1:k]
+            char = src[k:k + 1]
+            pos = k + 1
+            if token and char != less:
+                add(token, line, k - newline, None, k)
+                token = empty
+            if char == newline_char:
+                line += 1
+                newline = k
+                add(char, line, 0, TokenType.NEWLINE, k + 1)
+                if colon:
                     last_char = char
-                    continue
-                elif char == "=":
-                    tokens.append(Token(char, line, row, TokenType.ASSIGMENT))
-                    continue
-                elif char == ":":
-                    tokens.append(Token(char, line, row, TokenType.COLON))
-                    colon = True
-                    continue
-                elif char == " ":
-                    continue
-                elif char == '"':
-                    string = True
-                    continue
-            token += char
-            last_char = char
+                mode = ScanMode.INDENTATION
+            elif char == less:
+                if last_char == less:
+                    add(add_text, line, k - newline, TokenType.ADD_TEXT, k + 1)
+                    token = empty
+                last_char = char
+            elif char == equals:
+                add(char, line, k - newline, TokenType.ASSIGMENT, k + 1)
+            elif char == colon_char:
+                add(char, line, k - newline, TokenType.COLON, k + 1)
+                colon = True
+            elif char == quote:
+                mode = ScanMode.STRING
+        self._token = token
+        self._last_char = last_char
+        self._last_indent = last_indent
+        self._colon = colon
+        self._line = line
+        self._row = end - 1 - newline
+        self._mode = mode
 
     def parse(self):
+        """Types the tokens. A colon before the first token of the source and an assignment at its
+        end raise a SyntaxError."""
+        if isinstance(self.tokens, TokenArray):
+            return self._parse_types(self.tokens)
         first_element = None
         newline = True
         for i, token in enumerate(self.tokens):
             if token.token_type == TokenType.COLON:
+                if first_element is None:
+                    raise SyntaxError(token)
                 first_element.token_type = TokenType.HTML_ELEMENT
             #elif i == 0:
             #    token.token_type = TokenType.HTML_ELEMENT
@@ -213,34 +531,256 @@ class Tokenizer:
             elif newline:
                 first_element = token
                 newline = False
+            elif (token.token_type == TokenType.VALUE and self.tokens[i-1] is first_element
+                  and first_element.token == "include"):
+                first_element.token_type = TokenType.INCLUDE
             elif token.token == "=":
                 self.tokens[i-1].token_type = TokenType.ATTRIBUTE
+                if i + 1 == len(self.tokens):
+                    raise SyntaxError(token)
                 self.tokens[i+1].token_type = TokenType.VALUE
 
+    def _parse_types(self, tokens: TokenArray):
+        """Does the same as parse on the type column of a TokenArray."""
+        types: array = tokens.types
+        starts: array = tokens.starts
+        ends: array = tokens.ends
+        colon: int = TokenType.COLON.value
+        value: int = TokenType.VALUE.value
+        indents: tuple = (TokenType.INDENT.value, TokenType.UNINDENT.value)
+        first_element: int | None = None
+        newline: bool = True
+        for i in range(len(types)):
+            code: int = types[i]
+            if code == colon:
+                if first_element is None:
+                    raise SyntaxError(tokens[i])
+                types[first_element] = TokenType.HTML_ELEMENT.value
+            elif code in indents:
+                newline = True
+            elif newline:
+                first_element = i
+                newline = False
+            elif code == value and first_element == i - 1 and tokens.token(i - 1) == "include":
+                types[i-1] = TokenType.INCLUDE.value
+            elif ends[i] - starts[i] == 1 and tokens.token(i) == "=":
+                types[i-1] = TokenType.ATTRIBUTE.value
+                if i + 1 == len(types):
+                    raise SyntaxError(tokens[i])
+                types[i+1] = TokenType.VALUE.value
+
+
+class BytesTokenizer(Tokenizer):
+    """The Tokenizer for a utf-8 encoded bytes-like source, like a mmap of a file.
+    The source is scanned without decoding it, all delimiters are ASCII and can not be part
+    of a multi byte character. The tokens are kept in a BytesTokenArray, so only the tokens
+    that are used are decoded.
+    """
+
+    _delimiter_re = re.compile(Tokenizer._delimiter_re.pattern.encode())
+    _indent_re = re.compile(Tokenizer._indent_re.pattern.encode())
+    _text_line_re = re.compile(Tokenizer._text_line_re.pattern.encode())
+    _attribute_re = re.compile(Tokenizer._attribute_re.pattern.encode())
+    _element_line_re = re.compile(Tokenizer._element_line_re.pattern.encode())
+    _attribute_line_re = re.compile(Tokenizer._attribute_line_re.pattern.encode())
+    _chars: tuple = tuple(char.encode() for char in Tokenizer._chars)
+
+    def __init__(self, src):
+        self.tokens = BytesTokenArray(src)
+        self._reset()
+        self._scan(src)
+
+    def _reset(self):
+        super()._reset()
+        self._token: bytes = b""
+        self._last_char: bytes = b""
+        self._last_indent: bytes = b""
+
+
+class IncrementalTokenizer(Tokenizer):
+    """A tokenizer that is fed the source in chunks as they arrive:
+        tokenizer = IncrementalTokenizer()
+        for chunk in chunks:
+            tokens += tokenizer.feed(chunk)
+        tokens += tokenizer.close()
+    The tokens are typed like Tokenizer.parse does and given out as soon as their type is final.
+    Only the unfinished token and the tokens of the current line are held, not the source.
+    """
+
+    def __init__(self, encoding: str = "utf-8"):
+        """encoding: the encoding of chunks that are bytes."""
+        self.tokens = []
+        self._reset()
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._typed: int = 0
+        self._first_element: int | None = None
+        self._newline: bool = True
+
+    def feed(self, chunk: str | bytes) -> list:
+        """Scans the next chunk of the source and returns the tokens that are complete."""
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        self._scan(chunk)
+        return self._release(False)
+
+    def close(self) -> list:
+        """Ends the source and returns the remaining tokens.
+        An unfinished token at the end is dropped and an assignment at the end raises a SyntaxError
+        like Tokenizer does."""
+        self._scan(self._decoder.decode(b"", True))
+        return self._release(True)
+
+    def _release(self, final: bool) -> list:
+        tokens: list = self.tokens
+        # An assignment types the token after it, so the last token is typed when the next one is there.
+        end: int = len(tokens) if final else len(tokens) - 1
+        i: int = self._typed
+        first_element: int | None = self._first_element
+        newline: bool = self._newline
+        while i < end:
+            token = tokens[i]
+            if token.token_type == TokenType.COLON:
+                if first_element is None:
+                    raise SyntaxError(token)
+                tokens[first_element].token_type = TokenType.HTML_ELEMENT
+            elif token.token_type in (TokenType.INDENT, TokenType.UNINDENT):
+                newline = True
+            elif newline:
+                first_element = i
+                newline = False
+            elif (token.token_type == TokenType.VALUE and first_element == i - 1
+                  and tokens[i-1].token == "include"):
+                tokens[i-1].token_type = TokenType.INCLUDE
+            elif token.token == "=":
+                tokens[i-1].token_type = TokenType.ATTRIBUTE
+                if i + 1 == len(tokens):
+                    raise SyntaxError(token)
+                tokens[i+1].token_type = TokenType.VALUE
+            i += 1
+        # An assignment types the token before it and a colon the first element of the line.
+        released: int = len(tokens) if final else max(i - 1, 0)
+        if first_element is not None and not final:
+            released = min(released, first_element)
+            first_element -= released
+        complete: list = tokens[:released]
+        del tokens[:released]
+        self._typed = i - released
+        self._first_element = first_element
+        self._newline = newline
+        return complete
+
+
+def tokenize_stream(fh, chunk_size: int = 1 << 16):
+    """Yields the typed tokens of a file object that is read in chunks."""
+    tokenizer = IncrementalTokenizer()
+    while True:
+        chunk = fh.read(chunk_size)
+        if not chunk:
+            break
+        yield from tokenizer.feed(chunk)
+    yield from tokenizer.close()
+
 
 class UnknownRuleToken(Exception):
     pass
 
 
 class Parser:
-    def __init__(self, tokens):
+    def __init__(self, tokens, memoize: bool = True, memo_size: int | None = None, stats=None, index: bool = False):
+        """memoize: remembers the result of every rule at every token position (packrat parsing),
+            so each rule is tried at most once per position.
+        memo_size: the maximum number of remembered results, the oldest ones are dropped first.
+            None means unbounded.
+        stats: a CompileStats that counts the matches and failures of the rules.
+        index: builds an ElementIndex of the tree in parse, it is the index attribute then.
+            A tree with includes is indexed once they were resolved, see _run_parser.
+        """
+        self._stats: CompileStats | None = stats
+        self._build_index: bool = index
+        self.index: ElementIndex | None = None
+        # The Include nodes in the order of the document, see Partials.resolve.
+        self.includes: list = []
         self._tokens: list = tokens
-        self._last_correct_token = None
+        # The token types are compared as their integer values, a TokenArray already stores them so.
+        if isinstance(tokens, TokenArray):
+            self._types: array = tokens.types
+        else:
+            self._types: array = array("b", [0 if token.token_type is None else token.token_type.value for token in tokens])
+        self._memo: dict | None = {} if memoize else None
+        self._memo_size: int | None = memo_size
+        # The position of the last token that was matched by a rule, -1 if there is none.
+        self._last_correct_pos: int = -1
         self._block_stack: list = []
         self._current_indent: int = 0
         self._current_block: list = []
         #self._block_stack.append(self._current_block)
         self._parent_block: list = []
+        self._grammar: MappingProxyType = self.grammar()
+        self._type_grammar: MappingProxyType = self.type_grammar()
 
-    def get_fncs(self, fnc_name):
+    @property
+    def _last_correct_token(self):
+        if self._last_correct_pos < 0:
+            return None
+        return self._tokens[self._last_correct_pos]
+
+    @_last_correct_token.setter
+    def _last_correct_token(self, token):
+        self._last_correct_pos = -1 if token is None else token.pos
+
+    @classmethod
+    def grammar(cls) -> MappingProxyType:
+        """Returns the compiled grammar table of this parser class.
+        The docstring rules are compiled once per class into an immutable table:
+            grammar = {"r_rule": ((rule_fnc1, (TokenType.X, "r_sub_rule")), (rule_fnc2, (TokenType.Y,)))}
+        The alternatives of a rule are ordered like they are tried by match, longest rule first.
+        """
+        grammar = cls.__dict__.get("_grammar")
+        if grammar is None:
+            grammar = {}
+            for name in dir(cls):
+                if name.startswith("r_") and not name[-1].isdigit():
+                    grammar[name] = cls._compile_rule(name)
+            grammar = cls._grammar = MappingProxyType(grammar)
+        return grammar
+
+    @classmethod
+    def type_grammar(cls) -> MappingProxyType:
+        """Returns the grammar table with the values of the TokenTypes in place of the TokenTypes:
+            type_grammar = {"r_rule": ((rule_fnc1, (8, "r_sub_rule")), (rule_fnc2, (9,)))}
+        """
+        type_grammar = cls.__dict__.get("_type_grammar")
+        if type_grammar is None:
+            type_grammar = {}
+            for name, rule_fncs in cls.grammar().items():
+                type_grammar[name] = tuple(
+                    (rule_fnc, tuple(rule_token.value if rule_token.__class__ is TokenType else rule_token
+                                     for rule_token in rule_tokens))
+                    for rule_fnc, rule_tokens in rule_fncs)
+            type_grammar = cls._type_grammar = MappingProxyType(type_grammar)
+        return type_grammar
+
+    @classmethod
+    def _compile_rule(cls, fnc_name: str) -> tuple:
+        rule_fncs: list = []
+        for rule_fnc in cls._rule_fncs(fnc_name):
+            rule_tokens: list = []
+            for rule_token_name in rule_fnc.__doc__.split(" "):
+                rule_token = getattr(TokenType, rule_token_name, None)
+                rule_tokens.append(rule_token_name if rule_token is None else rule_token)
+            rule_fncs.append((rule_fnc, tuple(rule_tokens)))
+        return tuple(rule_fncs)
+
+    @classmethod
+    def _rule_fncs(cls, fnc_name: str) -> list:
         fncs: list = []
-        rule_fnc = getattr(self, fnc_name, None)
+        rule_fnc = getattr(cls, fnc_name, None)
         if rule_fnc is None:
             return fncs
         fncs.append(rule_fnc)
         j: int = 1
         while True:
-            rule_fnc = getattr(self, fnc_name + str(j), None)
+            rule_fnc = getattr(cls, fnc_name + str(j), None)
             if rule_fnc is None:
                 return fncs
             else:
@@ -253,55 +793,113 @@ class Parser:
                     fncs.append(rule_fnc)
             j += 1
 
+    def get_fncs(self, fnc_name):
+        return [rule_fnc.__get__(self) for rule_fnc, rule_tokens in self._grammar.get(fnc_name, ())]
+
     def match(self, fnc_name: str, pos:int=0) -> list | None:
-        logger.debug(f"fnc_name: {fnc_name} pos: {pos}")
-        rule_fncs: list =  self.get_fncs(fnc_name)
-        logger.debug("rule functions: " + str(rule_fncs))
+        """Returns the matches of the rule at the token position like count_tokens expects them
+        or None if no alternative of the rule does match.
+        """
+        matched = self._match(fnc_name, pos)
+        if matched is None:
+            return None
+        return self.flatten(matched[1])
+
+    def _match(self, fnc_name: str, pos: int) -> tuple | None:
+        """Returns a tuple with the number of matched tokens and the match tree or None.
+        match tree stucture:
+            match = (rule_fnc, [token1, token2], [sub_match1, sub_match2])
+        """
+        memo: dict | None = self._memo
+        if memo is None:
+            return self._match_rule(fnc_name, pos)
+        key: tuple = (fnc_name, pos)
+        memorized = memo.get(key)
+        if memorized is not None:
+            if self._stats is not None:
+                self._stats.memo_hits += 1
+            # Replay the side effect of the remembered match on the last correct token.
+            matched, last_correct_pos = memorized
+            if last_correct_pos >= 0:
+                self._last_correct_pos = last_correct_pos
+            return matched
+        last_correct_pos = self._last_correct_pos
+        self._last_correct_pos = -1
+        matched = self._match_rule(fnc_name, pos)
+        self._memorize(key, matched, last_correct_pos)
+        return matched
+
+    def _memorize(self, key: tuple, matched: tuple | None, last_correct_pos: int):
+        """Remembers the match and restores the last correct token from before the match
+        if the match did not change it."""
+        memorized: tuple = (matched, self._last_correct_pos)
+        if self._last_correct_pos < 0:
+            self._last_correct_pos = last_correct_pos
+        memo: dict = self._memo
+        if self._memo_size is not None and len(memo) >= self._memo_size:
+            if not self._memo_size:
+                return
+            del memo[next(iter(memo))]
+        memo[key] = memorized
+
+    def _match_rule(self, fnc_name: str, pos: int) -> tuple | None:
+        debug: bool = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(f"fnc_name: {fnc_name} pos: {pos}")
+        rule_fncs: tuple = self._type_grammar.get(fnc_name, ())
         tokens = self._tokens
-        for rule_fnc in rule_fncs:
-            logger.debug(f"rule_fnc: {rule_fnc.__name__}")
-            rule_tokens = rule_fnc.__doc__.split(" ")
+        types: array = self._types
+        stats: CompileStats | None = self._stats
+        for rule_fnc, rule_tokens in rule_fncs:
+            if debug:
+                logger.debug(f"rule_fnc: {rule_fnc.__name__} rule_tokens: {rule_tokens}")
             matched_tokens = []
-            return_tokens: list = [(rule_fnc, matched_tokens)]
-            logger.debug("rule_tokens: " + str(rule_tokens))
+            sub_matches: list = []
             current_pos: int = pos
-            for i, rule_token_name in enumerate(rule_tokens):
-                logger.debug(f"rule_token_name: {rule_token_name}")
-                if current_pos + i + 1 > len(tokens):
-                    logger.debug("no more tokens left (ó﹏ò｡)")
+            for i, rule_token in enumerate(rule_tokens):
+                if current_pos + i + 1 > len(types):
+                    if debug:
+                        logger.debug("no more tokens left (ó﹏ò｡)")
                     break
-                token = tokens[current_pos + i]
-                logger.debug(f"token: {token}")
-                token.pos = current_pos + i
-                rule_token = getattr(TokenType, rule_token_name, None)
-                logger.debug(f"rule_token: {token.token_type} {rule_token}")
-                if rule_token is not None:
-                    if token.token_type is rule_token:
-                        logger.debug(f"machted token: {token}")
-                        matched_tokens.append(token)
-                        self._last_correct_token = token
+                if debug:
+                    logger.debug(f"rule_token: {rule_token} token: {tokens[current_pos + i]}")
+                if rule_token.__class__ is int:
+                    if types[current_pos + i] == rule_token:
+                        matched_tokens.append(tokens[current_pos + i])
+                        self._last_correct_pos = current_pos + i
                         continue
                     break
                 else:
-                    print(f"{rule_token_name} could be another ruleset (ㅅ´ ˘ `)")
-                    matches = self.match(rule_token_name, current_pos + i)
-                    logger.debug("matches: " + str(matches))
-                    if matches is not None:
-                        token_count: int = self.count_tokens(matches)
-                        #rule_fnc(matched_tokens)
-                        logger.debug(f"current_pos: {current_pos}")
+                    matched = self._match(rule_token, current_pos + i)
+                    if matched is not None:
+                        token_count, sub_match = matched
                         current_pos += token_count - 1
-                        logger.debug(f"new current_pos: {current_pos}")
-                        return_tokens += matches
+                        if debug:
+                            logger.debug(f"{rule_token} matched {token_count} tokens, new current_pos: {current_pos}")
+                        sub_matches.append(sub_match)
                     else:
                         break
             else:
-                #rule_fnc(matched_tokens)
-                return return_tokens
+                if stats is not None:
+                    stats.rule_matches[rule_fnc.__name__] += 1
+                return (current_pos + len(rule_tokens) - pos, (rule_fnc, matched_tokens, sub_matches))
+            if stats is not None:
+                stats.count_failure(rule_fnc.__name__, i)
         else:
-            logger.debug("no function does match (╥﹏╥)")
+            if debug:
+                logger.debug("no function does match (╥﹏╥)")
             return None
 
+    def flatten(self, match: tuple) -> list:
+        """Flattens a match tree into the list of matches in the order the rule functions are called."""
+        matches: list = []
+        stack: list = [match]
+        while stack:
+            rule_fnc, tokens, sub_matches = stack.pop()
+            matches.append((rule_fnc, tokens))
+            stack.extend(reversed(sub_matches))
+        return matches
+
     def count_tokens(self, matches: list) -> int:
         """Counts the tokens in each match.
         A match is a tuple that contains the rule function in the first position and a list of all found tokens in the second position.
@@ -310,7 +908,6 @@ class Parser:
         """
         token_count: int = 0
         for match in matches:
-            logger.debug(f"match: {match}")
             token_count += len(match[1])
         return token_count
 
@@ -318,18 +915,27 @@ class Parser:
         self._current_pos: int = 0
         returned_tokens = self.match("r_html_element", 0)
         if returned_tokens is None:
-            print(f"last corret token: {self._last_correct_token}")
+            logger.debug(f"last correct token: {self._last_correct_token}")
         else:
             #print(returned_tokens)
             for rule_fnc, tokens in returned_tokens:
-                rule_fnc(tokens)
+                self.run_action(rule_fnc, tokens)
             logger.info("parsed correctly")
 
-        logger.debug(f"last_correct_token is last_token: {self._tokens[-1] is self._last_correct_token}")
-        if not self._tokens[-1] is self._last_correct_token:
-            for token in self._tokens[self._last_correct_token.pos + 1:]:
-                if token.token_type not in (TokenType.INDENT, TokenType.UNINDENT):
-                    raise SyntaxError(token)
+        types: array = self._types
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"last_correct_token is last_token: {self._last_correct_pos == len(types) - 1}")
+        for pos in range(self._last_correct_pos + 1, len(types)):
+            if types[pos] not in (TokenType.INDENT.value, TokenType.UNINDENT.value):
+                raise SyntaxError(self._tokens[pos])
+        # The rules of a dedent attach nodes after they were created, so the index is built
+        # from the finished tree in one pass. The includes have to be resolved first, see _run_parser.
+        if self._build_index and self._block_stack and not self.includes:
+            self.index = ElementIndex(self._block_stack[0])
+
+    def run_action(self, rule_fnc, tokens: list):
+        """Calls the rule function of a match with the matched tokens."""
+        rule_fnc(self, tokens)
 
     def indent(self, indent, t):
 
@@ -354,6 +960,11 @@ class Parser:
             self._current_block.append(t)
         self._current_indent = len(indent)
 
+    def include(self, indent, path) -> Include:
+        include = Include(indent, path)
+        self.includes.append(include)
+        return include
+
     def r_html_element(self, t):
         "HTML_ELEMENT COLON NEWLINE r_html_element"
         self._current_block = HTMLElement("", t[0].token)
@@ -514,6 +1125,38 @@ class Parser:
         "UNINDENT ADD_TEXT VALUE"
         self.unindent(t[0].token, AddText(t[2].token))
 
+    def r_html_element_body16(self, t):
+        "INDENT INCLUDE VALUE NEWLINE r_html_element_body"
+        self.indent(t[0].token, self.include(t[0].token, t[2].token))
+
+    def r_html_element_body17(self, t):
+        "UNINDENT INCLUDE VALUE NEWLINE r_html_element_body"
+        self.unindent(t[0].token, self.include(t[0].token, t[2].token))
+
+    def r_html_element_body18(self, t):
+        "INDENT INCLUDE VALUE NEWLINE r_html_element"
+        self.indent(t[0].token, self.include(t[0].token, t[2].token))
+
+    def r_html_element_body19(self, t):
+        "UNINDENT INCLUDE VALUE NEWLINE r_html_element"
+        self.unindent(t[0].token, self.include(t[0].token, t[2].token))
+
+    def r_html_element_body20(self, t):
+        "INDENT INCLUDE VALUE NEWLINE"
+        self.indent(t[0].token, self.include(t[0].token, t[2].token))
+
+    def r_html_element_body21(self, t):
+        "UNINDENT INCLUDE VALUE NEWLINE"
+        self.unindent(t[0].token, self.include(t[0].token, t[2].token))
+
+    def r_html_element_body22(self, t):
+        "INDENT INCLUDE VALUE"
+        self.indent(t[0].token, self.include(t[0].token, t[2].token))
+
+    def r_html_element_body23(self, t):
+        "UNINDENT INCLUDE VALUE"
+        self.unindent(t[0].token, self.include(t[0].token, t[2].token))
+
     """
     def r_html_element_body8(self, t):
         "INDENT ATTRIBUTE ASSIGMENT STRING r_newline"
@@ -557,30 +1200,292 @@ class Parser:
     start = r_html_element
 
 
+class IterativeParser(Parser):
+    """A parser for the same grammar that does not recurse into sub rules.
+    The rules that are matched at the moment are kept on an explicit stack, so the Python
+    stack depth stays constant while the nesting of the rules grows with the document's lines.
+    The parse time is linear in the token count with and without the memo table: the rule of a
+    line only falls back to its alternative without the following lines when the next line does
+    not match, so every line is tried a constant number of times. The memo table grows with the
+    document, memoize=False or a memo_size parses long documents with less memory.
+    """
+
+    def _match(self, fnc_name: str, pos: int) -> tuple | None:
+        tokens: list = self._tokens
+        types: array = self._types
+        token_count: int = len(types)
+        grammar: MappingProxyType = self._type_grammar
+        memo: dict | None = self._memo
+        stats: CompileStats | None = self._stats
+        debug: bool = logger.isEnabledFor(logging.DEBUG)
+        if memo is not None:
+            memorized = memo.get((fnc_name, pos))
+            if memorized is not None:
+                if stats is not None:
+                    stats.memo_hits += 1
+                matched, last_correct_pos = memorized
+                if last_correct_pos >= 0:
+                    self._last_correct_pos = last_correct_pos
+                return matched
+        # The state of the rule that is matched at the moment, the rules that wait for
+        # the result of their sub rule are pushed on the stack.
+        stack: list = []
+        rule_fncs: tuple = grammar.get(fnc_name, ())
+        alternative: int = 0
+        i: int = 0
+        current_pos: int = pos
+        matched_tokens: list = []
+        sub_matches: list = []
+        last_correct_pos: int = self._last_correct_pos
+        if memo is not None:
+            self._last_correct_pos = -1
+        while True:
+            matched = None
+            while alternative < len(rule_fncs):
+                rule_fnc, rule_tokens = rule_fncs[alternative]
+                if i == len(rule_tokens):
+                    if stats is not None:
+                        stats.rule_matches[rule_fnc.__name__] += 1
+                    matched = (current_pos + i - pos, (rule_fnc, matched_tokens, sub_matches))
+                    break
+                if current_pos + i < token_count:
+                    rule_token = rule_tokens[i]
+                    if rule_token.__class__ is int:
+                        if types[current_pos + i] == rule_token:
+                            matched_tokens.append(tokens[current_pos + i])
+                            self._last_correct_pos = current_pos + i
+                            i += 1
+                            continue
+                    else:
+                        memorized = None if memo is None else memo.get((rule_token, current_pos + i))
+                        if memorized is None:
+                            if debug:
+                                logger.debug(f"fnc_name: {rule_token} pos: {current_pos + i}")
+                            stack.append((fnc_name, pos, rule_fncs, alternative, i, current_pos,
+                                          matched_tokens, sub_matches, last_correct_pos))
+                            fnc_name, pos = rule_token, current_pos + i
+                            rule_fncs = grammar.get(fnc_name, ())
+                            alternative = i = 0
+                            current_pos = pos
+                            matched_tokens = []
+                            sub_matches = []
+                            last_correct_pos = self._last_correct_pos
+                            if memo is not None:
+                                self._last_correct_pos = -1
+                            continue
+                        if stats is not None:
+                            stats.memo_hits += 1
+                        sub_matched, sub_last_correct_pos = memorized
+                        if sub_last_correct_pos >= 0:
+                            self._last_correct_pos = sub_last_correct_pos
+                        if sub_matched is not None:
+                            current_pos += sub_matched[0] - 1
+                            sub_matches.append(sub_matched[1])
+                            i += 1
+                            continue
+                # The alternative does not match, try the next one.
+                if stats is not None:
+                    stats.count_failure(rule_fnc.__name__, i)
+                alternative += 1
+                i = 0
+                current_pos = pos
+                matched_tokens = []
+                sub_matches = []
+            if memo is not None:
+                self._memorize((fnc_name, pos), matched, last_correct_pos)
+            if not stack:
+                return matched
+            (fnc_name, pos, rule_fncs, alternative, i, current_pos,
+             matched_tokens, sub_matches, last_correct_pos) = stack.pop()
+            if matched is not None:
+                current_pos += matched[0] - 1
+                sub_matches.append(matched[1])
+                i += 1
+            else:
+                if stats is not None:
+                    stats.count_failure(rule_fncs[alternative][0].__name__, i)
+                alternative += 1
+                i = 0
+                current_pos = pos
+                matched_tokens = []
+                sub_matches = []
+
+
+PARSERS: dict = {
+    "recursive": Parser,
+    "iterative": IterativeParser,
+}
+
+
+class CompileStats:
+    """Timings and counters of compilations:
+        stats = CompileStats()
+        compile_pyhtml(src, stats=stats)
+        print(stats.report())
+    The parser counts per rule function how often it matched, failed, and failed after it
+    had matched a part of its rule (backtracks). The counters add up over several compilations.
+    """
+
+    def __init__(self):
+        self.tokenize_time: float = 0.0
+        self.parse_time: float = 0.0
+        self.compile_time: float = 0.0
+        self.tokens: int = 0
+        self.token_types: Counter = Counter()
+        self.rule_matches: Counter = Counter()
+        self.rule_failures: Counter = Counter()
+        self.rule_backtracks: Counter = Counter()
+        self.memo_hits: int = 0
+        self.output_bytes: int = 0
+
+    @property
+    def rule_attempts(self) -> Counter:
+        return self.rule_matches + self.rule_failures
+
+    def count_tokens(self, tokens: list):
+        self.tokens += len(tokens)
+        if isinstance(tokens, TokenArray):
+            self.token_types.update({TOKEN_TYPES[code]: count for code, count in Counter(tokens.types).items()})
+        else:
+            self.token_types.update(token.token_type for token in tokens)
+
+    def add(self, other):
+        """Adds the timings and counters of another CompileStats, like the one of a worker process."""
+        for name, value in vars(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def count_failure(self, rule_name: str, matched_rule_tokens: int):
+        self.rule_failures[rule_name] += 1
+        if matched_rule_tokens:
+            self.rule_backtracks[rule_name] += 1
+
+    def report(self) -> str:
+        lines: list = [
+            f"tokenize: {self.tokenize_time * 1000:.2f}ms",
+            f"parse:    {self.parse_time * 1000:.2f}ms",
+            f"compile:  {self.compile_time * 1000:.2f}ms",
+            f"tokens: {self.tokens} " + ", ".join(
+                f"{getattr(token_type, 'name', token_type)}: {count}" for token_type, count in self.token_types.most_common()),
+            f"output bytes: {self.output_bytes}",
+            f"memo hits: {self.memo_hits}",
+            f"{'rule':<28} {'attempts':>9} {'matches':>9} {'backtracks':>10}",
+        ]
+        attempts: Counter = self.rule_attempts
+        for rule_name in sorted(attempts, key=lambda rule_name: (-attempts[rule_name], rule_name)):
+            lines.append(f"{rule_name:<28} {attempts[rule_name]:>9} {self.rule_matches[rule_name]:>9} {self.rule_backtracks[rule_name]:>10}")
+        return "\n".join(lines)
+
+
 class Compiler:
 
     _print = False
     lines: list = None
+    _stack: list | None = None
+    # The string between the written parts, a tag or a text.
+    separator: str = "\n"
 
     def write(self, src):
         if self._print:
             print(src)
-        self.lines.append(src)
+        if self._fp is None:
+            self.lines.append(src)
+            return
+        # The lines are joined with the separator like src does.
+        if self._written or self._buffer:
+            self._buffer.append(self.separator)
+        self._buffer.append(src)
+        self._buffered += len(src) + len(self.separator)
+        if self._buffered >= self._flush_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered lines to the file object."""
+        if self._buffer:
+            chunk: str = "".join(self._buffer)
+            self._fp.write(chunk)
+            self._written += len(chunk)
+            if self._stats is not None:
+                self._stats.output_bytes += len(chunk.encode())
+            self._buffer.clear()
+            self._buffered = 0
 
     @property
     def src(self) -> str:
-        src: str = "\n".join(self.lines)
+        src: str = self.separator.join(self.lines)
         return src
 
-    def __init__(self, element):
+    def __init__(self, element, fp=None, flush_size: int = 1 << 16, stats=None):
+        """fp: a file object the lines are written to instead of keeping them in lines.
+            They are buffered until flush_size characters are collected.
+        stats: a CompileStats that gets the compile time and the output bytes.
+        """
+        if stats is not None:
+            start: float = time.perf_counter()
         self._element = element
-        self.lines = []
+        self._fp = fp
+        self._stats = stats
+        if fp is None:
+            self.lines = []
+        else:
+            self._buffer: list = []
+            self._buffered: int = 0
+            self._written: int = 0
+            self._flush_size: int = flush_size
         self.visit(element)
+        if fp is not None:
+            self.flush()
+        if stats is not None:
+            if fp is None:
+                stats.output_bytes += len(self.src.encode())
+            stats.compile_time += time.perf_counter() - start
+
+    @classmethod
+    def dispatch(cls) -> dict:
+        """Returns the table of the visit functions of this compiler class by node type:
+            dispatch = {HTMLElement: Compiler.visit_HTMLElement, AddText: Compiler.visit_AddText}
+        The table is built once per class from the visit_ methods of the node classes of this
+        module, other node types are looked up by their class name when they are first visited.
+        """
+        dispatch = cls.__dict__.get("_dispatch")
+        if dispatch is None:
+            dispatch = {}
+            for name in dir(cls):
+                node_class = globals().get(name[len("visit_"):])
+                if name.startswith("visit_") and isinstance(node_class, type):
+                    dispatch[node_class] = getattr(cls, name)
+            cls._dispatch = dispatch
+        return dispatch
 
     def visit(self, element):
-        element_name = element.__class__.__name__
-        fnc = getattr(self, f"visit_{element_name}")
-        fnc(element)
+        """Visits the element and its children without recursion.
+        The nodes that are still to be visited are kept on a stack, a visit function pushes the
+        children of its node and the str that is written after them, like the closing tag.
+        """
+        dispatch: dict = self.dispatch()
+        write = self.write
+        parent_stack: list | None = self._stack
+        stack: list = [element]
+        pop = stack.pop
+        self._stack = stack
+        while stack:
+            element = pop()
+            element_class = element.__class__
+            if element_class is str:
+                write(element)
+                continue
+            fnc = dispatch.get(element_class)
+            if fnc is None:
+                fnc = dispatch[element_class] = self._visit_fnc(element_class)
+            fnc(self, element)
+        self._stack = parent_stack
+
+    def _visit_fnc(self, element_class):
+        """Returns the visit function of the class or of the first of its base classes that has one."""
+        for node_class in element_class.__mro__:
+            fnc = getattr(self.__class__, f"visit_{node_class.__name__}", None)
+            if fnc is not None:
+                return fnc
+        raise AttributeError(f"{self.__class__.__name__} has no visit function for {element_class.__name__}")
 
     def visit_Attribute(self, element):
         if element._name == "text":
@@ -589,62 +1494,2105 @@ class Compiler:
     def visit_AddText(self, element):
         self.write(element._value)
 
+    def visit_Include(self, element):
+        """Writes the html of the partial, it is compiled once per compiler class and indentation."""
+        if element._partial is None:
+            raise ValueError(f'include "{element._path}" was not resolved, see Partials.resolve')
+        self.write(element._partial.html(self.__class__, element._indent))
+
+    def open_tag(self, element) -> str:
+        attributes_str: str = ""
+        if element._attributes:
+            attributes_str = " " + " ".join(map(str, element._attributes))
+        return f"{element._indent}<{element._tag}{attributes_str}>"
+
+    def close_tag(self, element) -> str:
+        return f"{element._indent}</{element._tag}>"
+
+    def visit_HTMLElement(self, element):
+        self.write(self.open_tag(element))
+        stack: list = self._stack
+        stack.append(self.close_tag(element))
+        stack.extend(reversed(element._childs))
+
+
+class MinifiedCompiler(Compiler):
+    """Writes the tags without the indentation of the source and without newlines between them.
+    The texts are written as they are and keep the newline before and after them, so only the
+    whitespace between two tags is left out."""
+
+    separator: str = ""
+    # The last written text is followed by another text, it was written without a newline after it.
+    _text_follows: bool = False
+
+    def _write_text(self, value: str):
+        """Writes the text with the newlines around it, which only the texts add, so the tags are
+        written without a check. The stack tells if the next node is a text too."""
+        stack: list = self._stack
+        follows: bool = bool(stack) and stack[-1].__class__ is AddText
+        started = self.lines if self._fp is None else self._written or self._buffer
+        if started and not self._text_follows:
+            value = "\n" + value
+        if stack and not follows:
+            value += "\n"
+        self._text_follows = follows
+        self.write(value)
+
+    def visit_Attribute(self, element):
+        if element._name == "text":
+            self._write_text(element._value)
+
+    def visit_AddText(self, element):
+        self._write_text(element._value)
+
+    def open_tag(self, element) -> str:
+        if element._attributes:
+            return f"<{element._tag} {' '.join(map(str, element._attributes))}>"
+        return f"<{element._tag}>"
+
+    def close_tag(self, element) -> str:
+        return f"</{element._tag}>"
+
+
+class _Closing:
+    """The closing tag of an element on the stack of the _RecordingCompiler."""
+
+    __slots__ = ("element",)
+
+    def __init__(self, element: HTMLElement):
+        self.element: HTMLElement = element
+
+
+class _RecordingCompiler(Compiler):
+    """A compiler that remembers the node of every line in owners, so the lines of a node can be found again."""
+
+    def __init__(self, element, stats=None):
+        self.owners: list = []
+        self._owner = None
+        Compiler.__init__(self, element, stats=stats)
+
+    def write(self, src):
+        self.owners.append(self._owner)
+        Compiler.write(self, src)
+
+    def visit_AddText(self, element):
+        self._owner = element
+        Compiler.visit_AddText(self, element)
+
+    def visit_Include(self, element):
+        self._owner = element
+        Compiler.visit_Include(self, element)
+
     def visit_HTMLElement(self, element):
-        tag_name: str = element._tag
-        indent: str = element._indent
+        self._owner = element
+        self.write(self.open_tag(element))
+        stack: list = self._stack
+        stack.append(_Closing(element))
+        stack.extend(reversed(element._childs))
+
+    def visit__Closing(self, closing):
+        self._owner = closing.element
+        self.write(self.close_tag(closing.element))
+
+
+class _UnitParser(IterativeParser):
+    """The parser of the IncrementalCompiler, it remembers the node that every action creates:
+        actions = [(rule_fnc, tokens, node, kind, owner)]
+    kind is "root", "indent", "unindent" or "attribute", owner is the current block after the action.
+    """
+
+    def __init__(self, tokens, stats=None):
+        IterativeParser.__init__(self, tokens, stats=stats)
+        self.actions: list = []
+        self._created: tuple | None = None
+
+    def run_action(self, rule_fnc, tokens: list):
+        if rule_fnc is None:
+            # The placeholder for the match of the units after the parsed ones.
+            return
+        block_count: int = len(self._block_stack)
+        self._created = None
+        rule_fnc(self, tokens)
+        if self._created is not None:
+            node, kind = self._created
+        elif len(self._block_stack) > block_count:
+            node, kind = self._block_stack[-1], "root"
+        elif rule_fnc.__name__.startswith("r_html_element_attribute"):
+            node, kind = self._current_block._attributes[-1], "attribute"
+        else:
+            node, kind = None, None
+        self.actions.append((rule_fnc, tokens, node, kind, self._current_block))
+
+    def indent(self, indent, t):
+        IterativeParser.indent(self, indent, t)
+        self._created = (t, "indent")
+
+    def unindent(self, indent, t):
+        IterativeParser.unindent(self, indent, t)
+        self._created = (t, "unindent")
+
+
+class _Unit:
+    """A part of the source from the start of a line to the next NEWLINE token.
+    state: the state of the tokenizer at the start of the unit
+    clean: the types of the tokens do not depend on the other units
+    tried: the rules the parser tried at the first token and if they did match
+    actions: the actions of the matches that start in the unit, like _UnitParser.actions
+    html: the html lines of the nodes of the unit
+    closing: the closing tags of the blocks that end with the unit, up to the first line of the next unit
+    chunk: the _UnitChunk the unit is in
+    """
+
+    __slots__ = ("text", "newlines", "state", "tokens", "clean", "tried", "actions", "html", "closing", "chunk")
+
+    def __init__(self, state: tuple):
+        self.text: str = ""
+        self.newlines: int = 0
+        self.state: tuple = state
+        self.tokens: list = []
+        self.clean: bool = False
+        self.tried: dict = {}
+        self.actions: list = []
+        self.html: _Lines = _Lines(self)
+        self.closing: _Lines = _Lines(self)
+        self.chunk: _UnitChunk | None = None
+
+    @property
+    def size(self) -> int:
+        return self.html.size + self.closing.size
+
+
+class _Lines:
+    """Html lines of a _Unit with the node that wrote every line, size counts their characters
+    with a newline after every line."""
+
+    __slots__ = ("unit", "lines", "owners", "size")
+
+    def __init__(self, unit: _Unit):
+        self.unit: _Unit = unit
+        self.lines: list = []
+        self.owners: list = []
+        self.size: int = 0
+
+    def append(self, line: str, owner):
+        self.lines.append(line)
+        self.owners.append(owner)
+        self.size += len(line) + 1
+
+    def start(self, units) -> int:
+        """Returns the html character the lines start at."""
+        unit: _Unit = self.unit
+        start: int = units.offsets(units.index(unit))[2]
+        return start + unit.html.size if self is unit.closing else start
+
+
+class _UnitChunk:
+    """A part of a _UnitList, sums = (units, lines, source characters, html characters) of its units,
+    position is its index in the chunks of the list."""
+
+    __slots__ = ("units", "sums", "position")
+
+    def __init__(self, units: list):
+        self.units: list = units
+        for unit in units:
+            unit.chunk = self
+        self.sums: tuple = self.total(units)
+        self.position: int = 0
+
+    @staticmethod
+    def total(units: list) -> tuple:
+        return (len(units), sum(map(attrgetter("newlines"), units)), sum(map(len, map(attrgetter("text"), units))),
+                sum(map(attrgetter("size"), units)))
+
+
+class _UnitList:
+    """The units of an IncrementalCompiler in chunks of up to 2 * CHUNK units. The sums of the
+    chunks are kept in a Fenwick tree, so a unit and its offsets are found and a replaced or
+    resized unit is summed up again in the steps of the tree and the units of one chunk. The
+    tree is only built again when chunks are split or removed.
+    """
+
+    CHUNK: int = 64
+
+    def __init__(self, units: list):
+        self._chunks: list = [_UnitChunk(units[i:i + self.CHUNK]) for i in range(0, len(units), self.CHUNK)]
+        self._build()
+
+    def _build(self):
+        chunks: list = self._chunks
+        tree: list = [[0, 0, 0, 0] for _ in range(len(chunks) + 1)]
+        for i, chunk in enumerate(chunks, 1):
+            chunk.position = i - 1
+            tree[i] = [a + b for a, b in zip(tree[i], chunk.sums)]
+            parent: int = i + (i & -i)
+            if parent <= len(chunks):
+                tree[parent] = [a + b for a, b in zip(tree[parent], tree[i])]
+        self._tree: list = tree
+
+    def _add(self, position: int, old: tuple, new: tuple):
+        """Changes the sums of the chunk at the position from old to new."""
+        tree: list = self._tree
+        deltas: list = [b - a for a, b in zip(old, new)]
+        i: int = position + 1
+        while i < len(tree):
+            tree[i] = [a + b for a, b in zip(tree[i], deltas)]
+            i += i & -i
+
+    def _prefix(self, position: int) -> list:
+        """Returns the sums of the chunks before the position."""
+        tree: list = self._tree
+        sums: list = [0, 0, 0, 0]
+        i: int = position
+        while i:
+            sums = [a + b for a, b in zip(sums, tree[i])]
+            i -= i & -i
+        return sums
+
+    def _search(self, field: int, value: int) -> tuple:
+        """Returns the position of the chunk the value of the field is in, counted over the chunks
+        like bisect_right, and the rest of the value in the chunk."""
+        tree: list = self._tree
+        position: int = 0
+        step: int = 1 << (len(tree) - 1).bit_length()
+        while step:
+            i: int = position + step
+            if i < len(tree) and tree[i][field] <= value:
+                position = i
+                value -= tree[i][field]
+            step >>= 1
+        return position, value
+
+    def __len__(self) -> int:
+        return self._prefix(len(self._chunks))[0]
+
+    def __getitem__(self, index: int) -> _Unit:
+        position, rest = self._search(0, index)
+        return self._chunks[position].units[rest]
+
+    def index(self, unit: _Unit) -> int:
+        chunk: _UnitChunk = unit.chunk
+        return self._prefix(chunk.position)[0] + chunk.units.index(unit)
+
+    def find(self, line: int) -> int:
+        """Returns the index of the unit of the line, or of the last unit after the last line."""
+        position, rest = self._search(1, line)
+        if position == len(self._chunks):
+            return len(self) - 1
+        line_ends: list = list(accumulate(map(attrgetter("newlines"), self._chunks[position].units)))
+        return self._prefix(position)[0] + bisect_right(line_ends, rest)
+
+    def offsets(self, index: int) -> tuple:
+        """Returns the line, the source character and the html character the unit starts at,
+        the ends of the last unit for the length of the list."""
+        position, rest = self._search(0, index)
+        sums: list = self._prefix(position)
+        if position < len(self._chunks):
+            sums = [a + b for a, b in zip(sums, _UnitChunk.total(self._chunks[position].units[:rest]))]
+        return tuple(sums[1:])
+
+    def replace(self, start: int, end: int, units: list):
+        """Replaces the units from start up to end with the units, start has to be a unit of the list."""
+        chunks: list = self._chunks
+        first, head = self._search(0, start)
+        last, tail = self._search(0, end - 1) if end > start else (first, head - 1)
+        units = chunks[first].units[:head] + units + chunks[last].units[tail + 1:]
+        if len(units) > 2 * self.CHUNK:
+            new_chunks: list = [_UnitChunk(units[i:i + self.CHUNK]) for i in range(0, len(units), self.CHUNK)]
+        else:
+            new_chunks = [_UnitChunk(units)] if units else []
+        if len(new_chunks) == last + 1 - first:
+            for position, chunk in enumerate(new_chunks, first):
+                chunk.position = position
+                self._add(position, chunks[position].sums, chunk.sums)
+                chunks[position] = chunk
+        else:
+            chunks[first:last + 1] = new_chunks
+            self._build()
+
+    def resized(self, units: list):
+        """Sums up the chunks of the units again after their text or html was changed."""
+        for chunk in {id(unit.chunk): unit.chunk for unit in units}.values():
+            sums: tuple = _UnitChunk.total(chunk.units)
+            self._add(chunk.position, chunk.sums, sums)
+            chunk.sums = sums
+
+
+class IncrementalCompiler:
+    """Compiles a source and recompiles it after lines were replaced.
+    The source is kept in units that reach from the start of a line to the next NEWLINE token.
+    An edit tokenizes the edited units again and the following units until the tokenizer is in
+    the state of an old unit again. Only the new tokens are parsed, the results of the rules at
+    the first following unit are taken from the former parse. If the new units make the same
+    actions as the old ones or only text lines are replaced, the nodes and the html lines of the
+    units are patched, any other edit compiles the whole source again.
+    The units are kept in a _UnitList with their offsets and every node knows the places of its
+    html lines, so a patch only copies the source and the html once and does not go through them.
+    stats: a CompileStats that counts the tokens and rules of every compilation.
+    partials: the Partials the includes are loaded from, an edited include line compiles the
+        whole source again.
+    """
+
+    def __init__(self, src: str, stats=None, partials=None):
+        self._stats: CompileStats | None = stats
+        self._partials: Partials = Partials() if partials is None else partials
+        self.full_compiles: int = 0
+        self._compile(src)
+
+    def update(self, start: int, end: int, text: str) -> str:
+        """Replaces the lines from start up to end with the text and returns the new html.
+        The lines are counted from 0 and include their newline, end is not replaced."""
+        end = max(start, end)
+        units: _UnitList | None = self._units
+        if not units:
+            self._compile(self._replace_lines(self.src, start, end, text))
+            return self.html
+        first: int = units.find(start)
+        last: int = max(first, units.find(max(start, end - 1)))
+        base, text_start, _ = units.offsets(first)
+        text_end: int = units.offsets(last + 1)[1]
+        region: str = self._replace_lines(self.src[text_start:text_end], start - base, end - base, text)
+        src: str = "".join((self.src[:text_start], region, self.src[text_end:]))
+        if self._patch(first, last, region):
+            self.src = src
+        else:
+            self._compile(src)
+        return self.html
+
+    @staticmethod
+    def _replace_lines(src: str, start: int, end: int, text: str) -> str:
+        offsets: list = [0]
+        while len(offsets) <= end:
+            offset: int = src.find("\n", offsets[-1]) + 1
+            offsets.append(offset or len(src))
+        return src[:offsets[start]] + text + src[offsets[end]:]
+
+    @staticmethod
+    def _split_lines(src: str):
+        start: int = 0
+        while start < len(src):
+            end: int = src.find("\n", start) + 1 or len(src)
+            yield src[start:end]
+            start = end
+
+    @staticmethod
+    def _type(tokens: list, first: bool) -> bool:
+        """Types the tokens of a unit like Tokenizer.parse, returns False if the types depend on
+        the units before, they have to start with an INDENT or UNINDENT token for that."""
+        if not first and (not tokens or tokens[0].token_type not in (TokenType.INDENT, TokenType.UNINDENT)):
+            return False
+        typer = Tokenizer("")
+        typer.tokens = tokens
+        try:
+            typer.parse()
+        except SyntaxError:
+            return False
+        return True
+
+    def _scan_units(self, state: tuple, src: str, units: list, index: int) -> tuple:
+        """Tokenizes the source from the tokenizer state on and then the units from index on,
+        until the tokenizer is in the state of the next unit.
+        Returns the new units and the index of the first unit that was not tokenized again."""
+        scanner = Tokenizer("")
+        scanner._restore_state(state)
+        new_units: list = []
+        parts: list = []
+        unit = _Unit(state)
+        scanner.tokens = unit.tokens
+        while True:
+            for line in self._split_lines(src):
+                scanner._scan(line)
+                parts.append(line)
+                if scanner._mode is ScanMode.INDENTATION and not scanner._token:
+                    unit.text = "".join(parts)
+                    unit.newlines = len(parts)
+                    parts = []
+                    new_units.append(unit)
+                    unit = _Unit(scanner._save_state())
+                    scanner.tokens = unit.tokens
+            if index == len(units):
+                break
+            # The line number may differ, everything else has to be the same.
+            old_state: tuple = units[index].state
+            if not parts and unit.state[:4] == old_state[:4] and unit.state[5:] == old_state[5:]:
+                break
+            src = units[index].text
+            index += 1
+        if parts:
+            unit.text = "".join(parts)
+            unit.newlines = unit.text.count("\n")
+            new_units.append(unit)
+        return new_units, index
+
+    def _assign(self, units: list, parser: _UnitParser):
+        """Gives the actions of the parser and the tried rules to the units of their tokens."""
+        unit_of: dict = {}
+        pos: int = 0
+        memo: dict = parser._memo
+        for unit in units:
+            unit.tried = {name: memo[name, pos][0] is not None for name in parser._grammar if (name, pos) in memo}
+            unit.actions = []
+            for token in unit.tokens:
+                unit_of[id(token)] = unit
+            pos += len(unit.tokens)
+        for action in parser.actions:
+            unit_of[id(action[1][0])].actions.append(action)
+
+    def _compile(self, src: str):
+        self.src: str = src
+        self._units: _UnitList | None = None
+        self.full_compiles += 1
+        units, _ = self._scan_units(Tokenizer("")._save_state(), src, [], 0)
+        tokens: list = []
+        for i, unit in enumerate(units):
+            unit.clean = self._type([Token(token.token, token.line, token.row, token.token_type) for token in unit.tokens], i == 0)
+            tokens.extend(unit.tokens)
+        typer = Tokenizer("")
+        typer.tokens = tokens
+        typer.parse()
+        if self._stats is not None:
+            self._stats.count_tokens(tokens)
+        parser = _UnitParser(tokens, stats=self._stats)
+        parser.parse()
+        if parser.includes:
+            self._partials.resolve(parser.includes)
+        self.element: HTMLElement = parser._block_stack[0]
+        self._assign(units, parser)
+        compiler = _RecordingCompiler(self.element, self._stats)
+        self._compiler: _RecordingCompiler = compiler
+        self._places: dict = self._spans(units, compiler.lines, compiler.owners)
+        self.html: str = compiler.src
+        self._units = _UnitList(units)
+
+    @staticmethod
+    def _spans(units: list, lines: list, owners: list) -> dict:
+        """Gives every unit the html lines of its nodes and the closing tags up to the first line
+        of the next unit. Returns the places of the lines of every node:
+            places[id(node)] = [(lines, position in lines)]"""
+        unit_of: dict = {id(action[2]): i for i, unit in enumerate(units) for action in unit.actions}
+        places: dict = {}
+        i: int = 0
+        for line, owner in zip(lines, owners):
+            j: int = unit_of.get(id(owner), i)
+            if j > i:
+                i = j
+            unit_lines: _Lines = units[i].html if j == i and not units[i].closing.lines else units[i].closing
+            places.setdefault(id(owner), []).append((unit_lines, len(unit_lines.lines)))
+            unit_lines.append(line, owner)
+        return places
+
+    def _splice(self, edits: list):
+        """Replaces the html from start up to end with the text, edits = [(start, end, text)].
+        The offsets count a newline after every line, the last line of the html has none."""
+        html: str = self.html
+        pieces: list = []
+        position: int = 0
+        for start, end, text in sorted(edits, key=itemgetter(0)):
+            if end > len(html):
+                end = len(html)
+                if text:
+                    text = text[:-1]
+                else:
+                    start = max(start - 1, 0)
+            pieces += (html[position:start], text)
+            position = end
+        pieces.append(html[position:])
+        self.html = "".join(pieces)
+
+    def _patch(self, first: int, last: int, src: str) -> bool:
+        """Tokenizes and parses the units from first to last again with the new source and
+        patches the tree and the html. Returns False if the source has to be compiled again."""
+        units: _UnitList = self._units
+        new_units, index = self._scan_units(units[first].state, src, units, last + 1)
+        old_units: list = [units[i] for i in range(first, index)]
+        following: _Unit | None = units[index] if index < len(units) else None
+        if not all(unit.clean for unit in old_units) or (following is not None and not following.clean):
+            return False
+        tokens: list = []
+        for i, unit in enumerate(new_units):
+            unit.clean = self._type(unit.tokens, first == 0 and i == 0)
+            if not unit.clean:
+                return False
+            tokens.extend(unit.tokens)
+        if self._stats is not None:
+            self._stats.count_tokens(tokens)
+        count: int = len(tokens)
+        if following is not None:
+            # The following units are represented by their first token and the remembered
+            # results of the rules that were tried there.
+            tokens.append(following.tokens[0])
+        parser = _UnitParser(tokens, stats=self._stats)
+        memo: dict = parser._memo
+        if following is not None:
+            for name, matched in following.tried.items():
+                memo[name, count] = ((1, (None, [], [])), count) if matched else (None, -1)
+        chain: tuple | None = None
+        for name, matched in old_units[0].tried.items():
+            result = parser._match(name, 0)
+            if (result is not None) is not matched:
+                return False
+            if result is not None:
+                chain = result
+        if chain is None or chain[0] != len(tokens):
+            return False
+        if any(pos >= count and (following is None or name not in following.tried) for name, pos in memo):
+            return False
+        parser._current_block = HTMLElement("", "")
+        for rule_fnc, match_tokens in parser.flatten(chain[1]):
+            parser.run_action(rule_fnc, match_tokens)
+        if parser.includes:
+            return False
+        self._assign(new_units, parser)
+        if not all(unit.actions for unit in new_units):
+            return False
+        if len(old_units) == len(new_units) and all(
+                [action[0] for action in old_unit.actions] == [action[0] for action in new_unit.actions]
+                for old_unit, new_unit in zip(old_units, new_units)):
+            self._patch_nodes(old_units, new_units)
+        elif all(self._is_text(unit) for unit in old_units) and all(self._is_text(unit) for unit in new_units):
+            return self._replace_texts(first, old_units, new_units)
+        else:
+            return False
+        return True
+
+    @staticmethod
+    def _is_text(unit: _Unit) -> bool:
+        """A text line only appends an AddText to the current block."""
+        return len(unit.actions) == 1 and unit.actions[0][3] == "indent" and isinstance(unit.actions[0][2], AddText)
+
+    def _patch_nodes(self, old_units: list, new_units: list):
+        """Copies the values of the new nodes into the old nodes that were made by the same actions
+        and the new units into the old units, so the places of the lines stay valid, and patches
+        the html lines of the changed nodes."""
+        places: dict = self._places
+        compiler: _RecordingCompiler = self._compiler
+        patches: dict = {}
+        for old_unit, new_unit in zip(old_units, new_units):
+            for old_action, new_action in zip(old_unit.actions, new_unit.actions):
+                old_node, new_node = old_action[2], new_action[2]
+                if isinstance(old_node, AddText):
+                    old_node._value = new_node._value
+                    patches[places[id(old_node)][0]] = old_node._value
+                    continue
+                if isinstance(old_node, HTMLElement):
+                    old_node._indent, old_node._tag = new_node._indent, new_node._tag
+                    element = old_node
+                elif isinstance(old_node, Attribute):
+                    old_node._name, old_node._value = new_node._name, new_node._value
+                    element = old_action[4]
+                else:
+                    continue
+                if isinstance(element, HTMLElement):
+                    for (lines, i), line in zip(places[id(element)], (compiler.open_tag(element), compiler.close_tag(element))):
+                        if lines.lines[i] != line:
+                            patches[lines, i] = line
+            old_unit.actions = [new_action[:2] + old_action[2:] for old_action, new_action in zip(old_unit.actions, new_unit.actions)]
+            old_unit.text, old_unit.newlines, old_unit.state = new_unit.text, new_unit.newlines, new_unit.state
+            old_unit.tokens, old_unit.clean, old_unit.tried = new_unit.tokens, new_unit.clean, new_unit.tried
+        units: _UnitList = self._units
+        edits: list = []
+        for (lines, i), line in patches.items():
+            old_line: str = lines.lines[i]
+            start: int = lines.start(units) + sum(map(len, lines.lines[:i])) + i
+            edits.append((start, start + len(old_line), line))
+        for (lines, i), line in patches.items():
+            lines.size += len(line) - len(lines.lines[i])
+            lines.lines[i] = line
+        self._splice(edits)
+        units.resized(old_units + [lines.unit for lines, _ in patches])
+
+    def _replace_texts(self, first: int, old_units: list, new_units: list) -> bool:
+        """Replaces the text lines of the old units in their block with the ones of the new units,
+        the closing tags after the last text go to the last new unit or to the unit before."""
+        block = old_units[0].actions[0][4]
+        old_texts: list = [unit.actions[0][2] for unit in old_units]
+        new_texts: list = [unit.actions[0][2] for unit in new_units]
+        childs: list = block._childs
+        position: int = childs.index(old_texts[0])
+        places: dict = self._places
+        if childs[position:position + len(old_texts)] != old_texts or not (new_units or first):
+            return False
+        # Every old unit has its text as only line, only the last one has closing tags.
+        if any(places.get(id(text)) != [(unit.html, 0)] or len(unit.html.lines) != 1 for unit, text in zip(old_units, old_texts)):
+            return False
+        if any(unit.closing.lines for unit in old_units[:-1]):
+            return False
+        units: _UnitList = self._units
+        start: int = units.offsets(first)[2]
+        end: int = start + sum(unit.html.size for unit in old_units)
+        childs[position:position + len(old_texts)] = new_texts
+        for text in old_texts:
+            del places[id(text)]
+        for unit, text in zip(new_units, new_texts):
+            unit.actions = [unit.actions[0][:4] + (block,)]
+            places[id(text)] = [(unit.html, 0)]
+            unit.html.append(text._value, text)
+        closing: _Lines = old_units[-1].closing
+        last: _Unit = new_units[-1] if new_units else units[first - 1]
+        if not last.closing.lines:
+            last.closing, closing.unit = closing, last
+        else:
+            for i, (line, owner) in enumerate(zip(closing.lines, closing.owners)):
+                places[id(owner)] = [(last.closing, len(last.closing.lines)) if place == (closing, i) else place
+                                     for place in places[id(owner)]]
+                last.closing.append(line, owner)
+        self._splice([(start, end, "".join([unit.html.lines[0] + "\n" for unit in new_units]))])
+        units.replace(first, first + len(old_units), new_units)
+        if not new_units:
+            units.resized([last])
+        return True
+
+
+PYHTMLC_MAGIC: bytes = b"PYHC"
+PYHTMLC_VERSION: int = 1
+# magic, version, flags, strings, nodes, index entries
+_PYHTMLC_HEADER = struct.Struct("<4sHHIII")
+# kind, then indent, tag, first index entry, attributes, childs of an element,
+# name and value of an attribute or the value of a text
+_PYHTMLC_RECORD = struct.Struct("<B3xIIIII")
+_PYHTMLC_ELEMENT, _PYHTMLC_ATTRIBUTE, _PYHTMLC_TEXT = 1, 2, 3
+
+
+def write_pyhtmlc(element: HTMLElement, fp):
+    """Writes the tree to the binary file object in the pyhtmlc format:
+        header            magic b"PYHC", format version, flags, string, node and index entry counts
+        string offsets    string count + 1 uint32 offsets into the string data
+        node records      one fixed size record per node, the root is node 0
+        index             uint32 node numbers, the attributes and then the childs of each element
+        string data       the utf-8 encoded strings
+    The nodes are numbered breadth first, so deep trees are written without recursion.
+    An included partial is written as its elements, indented like the include line."""
+    strings: dict = {}
+    string_id = lambda value: strings.setdefault(value, len(strings))
+    records: list = []
+    index: array = array("I")
+    nodes: list = [element]
+    pack = _PYHTMLC_RECORD.pack
+    for node in nodes:
+        node_class = node.__class__
+        if isinstance(node, HTMLElement):
+            records.append(pack(_PYHTMLC_ELEMENT, string_id(node._indent), string_id(node._tag), len(index),
+                                len(node._attributes), len(node._childs)))
+            for child in (*node._attributes, *node._childs):
+                if child.__class__ is Include:
+                    if child._partial is None:
+                        raise ValueError(f'include "{child._path}" was not resolved, see Partials.resolve')
+                    child = child._partial.tree(child._indent)
+                index.append(len(nodes))
+                nodes.append(child)
+        elif node_class is Attribute:
+            records.append(pack(_PYHTMLC_ATTRIBUTE, string_id(node._name), string_id(node._value), 0, 0, 0))
+        elif node_class is AddText:
+            records.append(pack(_PYHTMLC_TEXT, string_id(node._value), 0, 0, 0, 0))
+        else:
+            raise TypeError(f"{node_class.__name__} can not be written to a pyhtmlc file")
+    data: list = [value.encode() for value in strings]
+    offsets: array = array("I", accumulate(map(len, data), initial=0))
+    for part in (_PYHTMLC_HEADER.pack(PYHTMLC_MAGIC, PYHTMLC_VERSION, 0, len(data), len(records), len(index)),
+                 _little_endian(offsets), b"".join(records), _little_endian(index), b"".join(data)):
+        fp.write(part)
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class LazyHTMLElement(HTMLElement):
+    """An element of a PyhtmlcFile, its attributes and childs are read from the file the first
+    time they are used. The unset slots raise an AttributeError, so __getattr__ is only called
+    until they were read."""
+
+    __slots__ = ("_file", "_node")
+
+    def __init__(self, indent: str, tag: str, file, node: int):
+        self._indent: str = sys.intern(indent)
+        self._tag: str = sys.intern(tag)
+        self._file = file
+        self._node: int = node
+
+    def __getattr__(self, name: str):
+        if name not in ("_attributes", "_childs"):
+            raise AttributeError(name)
+        self._attributes, self._childs = self._file.read_childs(self._node)
+        return getattr(self, name)
+
+    def close(self):
+        """Unmaps the file of the element, the nodes that were not read yet can not be read then."""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PyhtmlcFile:
+    """A memory mapped pyhtmlc file, see write_pyhtmlc:
+        with PyhtmlcFile("page.pyhtmlc") as pyhtmlc:
+            html = Compiler(pyhtmlc.root).src
+    Only the header is read when the file is opened, the nodes and strings are read when they
+    are used and every string is decoded once.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:4] != PYHTMLC_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a pyhtmlc file")
+        _, version, flags, string_count, node_count, index_count = _PYHTMLC_HEADER.unpack_from(self._mmap)
+        if version != PYHTMLC_VERSION:
+            self.close()
+            raise ValueError(f"{path} has the pyhtmlc version {version}, expected {PYHTMLC_VERSION}")
+        self._offsets: int = _PYHTMLC_HEADER.size
+        self._records: int = self._offsets + 4 * (string_count + 1)
+        self._index: int = self._records + _PYHTMLC_RECORD.size * node_count
+        self._data: int = self._index + 4 * index_count
+        self._strings: list = [None] * string_count
+        self.node_count: int = node_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    @property
+    def root(self) -> HTMLElement:
+        return self.node(0)
+
+    def string(self, string_id: int) -> str:
+        value: str | None = self._strings[string_id]
+        if value is None:
+            start, end = struct.unpack_from("<II", self._mmap, self._offsets + 4 * string_id)
+            value = self._strings[string_id] = str(self._mmap[self._data + start:self._data + end], "utf-8")
+        return value
+
+    def node(self, node: int):
+        kind, a, b, _, _, _ = _PYHTMLC_RECORD.unpack_from(self._mmap, self._records + _PYHTMLC_RECORD.size * node)
+        if kind == _PYHTMLC_ELEMENT:
+            return LazyHTMLElement(self.string(a), self.string(b), self, node)
+        if kind == _PYHTMLC_ATTRIBUTE:
+            return Attribute(self.string(a), self.string(b))
+        return AddText(self.string(a))
+
+    def read_childs(self, node: int) -> tuple:
+        """Returns the attributes and the childs of the element node."""
+        _, _, _, first, attributes, childs = _PYHTMLC_RECORD.unpack_from(
+            self._mmap, self._records + _PYHTMLC_RECORD.size * node)
+        nodes: list = [self.node(child) for child in
+                       struct.unpack_from(f"<{attributes + childs}I", self._mmap, self._index + 4 * first)]
+        return nodes[:attributes] or (), nodes[attributes:] or ()
+
+
+def load_pyhtmlc(path) -> LazyHTMLElement:
+    """Returns the root element of the pyhtmlc file. The file stays mapped until the root is closed:
+        with load_pyhtmlc("page.pyhtmlc") as root:
+            html = Compiler(root).src
+    """
+    return PyhtmlcFile(path).root
+
+
+class _TemplateCompiler(Compiler):
+    """Renders the tree as a format string, the braces of the tags and the attribute names are
+    doubled so only the ones of the texts and the attribute values are placeholders."""
+
+    def open_tag(self, element) -> str:
+        attributes_str: str = ""
+        if element._attributes:
+            attributes_str = " " + " ".join(
+                f"{self._braces(attribute._name)}='{attribute._value}'" for attribute in element._attributes)
+        return f"{self._braces(element._indent)}<{self._braces(element._tag)}{attributes_str}>"
+
+    def close_tag(self, element) -> str:
+        return self._braces(super().close_tag(element))
+
+    @staticmethod
+    def _braces(src: str) -> str:
+        return src.replace("{", "{{").replace("}", "}}")
+
+
+class Template:
+    """A document that was compiled into a Python function:
+        template = compile_template('p class="{kind}":\n    << "Hello {name}"\n')
+        html = template.render({"kind": "greeting", "name": "World"})
+    The texts and attribute values of the document can contain {name} and {name:format_spec}
+    placeholders, {{ and }} are braces. The html between the placeholders is joined into
+    constant strings when the function is generated, so rendering only joins those with the
+    values of the context. The values are html escaped unless escape is False.
+    """
+
+    def __init__(self, element: HTMLElement, escape: bool = True):
+        parts: list = []
+        names: list = []
+        literals: list = []
+        for literal, name, format_spec, conversion in string.Formatter().parse(_TemplateCompiler(element).src):
+            literals.append(literal)
+            if name is None:
+                continue
+            if "".join(literals):
+                parts.append(repr("".join(literals)))
+            literals.clear()
+            if not name.isidentifier() or conversion is not None or "{" in format_spec:
+                raise ValueError(f"invalid placeholder {{{name}}}, expected {{name}} or {{name:format_spec}}")
+            value: str = f"format(context[{name!r}], {format_spec!r})" if format_spec else f"str(context[{name!r}])"
+            parts.append(f"escape({value}, True)" if escape else value)
+            if name not in names:
+                names.append(name)
+        if "".join(literals):
+            parts.append(repr("".join(literals)))
+        self.names: tuple = tuple(names)
+        if len(parts) > 1:
+            body: str = f"''.join(({', '.join(parts)}))"
+        else:
+            body = parts[0] if parts else "''"
+        self.source: str = f"def render(context, escape=escape_html):\n    return {body}\n"
+        namespace: dict = {"escape_html": escape_html}
+        self.code = compile(self.source, "<pyhtml template>", "exec")
+        exec(self.code, namespace)
+        self._render = namespace["render"]
+
+    def render(self, context: dict | None = None, **values) -> str:
+        """Returns the html with the placeholders filled from the context and the keyword arguments."""
+        if values:
+            context = {**context, **values} if context else values
+        return self._render(context or {})
+
+
+def compile_template(src: str, engine: str = "recursive", escape: bool = True) -> Template:
+    """Returns the Template of the source, the last 256 templates are kept compiled. The includes
+    are relative to the current directory and the key of a source with include lines has the
+    digests of its partials, so it is compiled again when one of them changed."""
+    partials: Partials = _default_partials(engine)
+    return _compile_template(src, engine, escape, partials.cache_variant(src))
+
+
+@lru_cache(maxsize=256)
+def _compile_template(src: str, engine: str, escape: bool, variant: str) -> Template:
+    return Template(parse_pyhtml(src, engine, partials=_default_partials(engine)), escape)
+
+
+# A compound selector: a tag or *, then any number of .class, #id, [name] and [name="value"].
+# Only the descendant combinator is supported, > + ~ and , are invalid.
+_SELECTOR_RE = re.compile(r'\s*([^\s.#\[\]*>+~,]+|\*)?((?:\.[^\s.#\[\]]+|#[^\s.#\[\]]+|\[[^\s=\]]+(?:="[^"]*"|=\'[^\']*\'|=[^\]"\']*)?\])*)(?=\s|$)')
+_SELECTOR_PART_RE = re.compile(r'\.([^\s.#\[\]]+)|#([^\s.#\[\]]+)|\[([^\s=\]]+)(?:="([^"]*)"|=\'([^\']*)\'|=([^\]"\']*))?\]')
+
+
+@lru_cache(maxsize=256)
+def _parse_selector(selector: str) -> tuple:
+    """Returns the compound selectors of a descendant selector, each as
+        (tag or None, classes, ids, attributes), attributes = ((name, value or None), ...)
+    """
+    compounds: list = []
+    pos: int = 0
+    while pos < len(selector.rstrip()):
+        match = _SELECTOR_RE.match(selector, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f"invalid selector {selector!r} at {pos}")
+        pos = match.end()
+        tag, parts = match.groups()
+        classes: list = []
+        ids: list = []
         attributes: list = []
-        html_elements: list = []
-        for child_element in element._childs:
-            if isinstance(child_element, Attribute):
-                attributes.append(str(child_element))
+        for part in _SELECTOR_PART_RE.finditer(parts):
+            class_name, id_value, name, double, single, bare = part.groups()
+            if class_name:
+                classes.append(class_name)
+            elif id_value:
+                ids.append(id_value)
+            elif "=" in part.group():
+                attributes.append((name, double if double is not None else single if single is not None else bare))
             else:
-                html_elements.append(child_element)
-        attributes_str: str = " ".join(attributes)
-        if attributes_str:
-            attributes_str = " " + attributes_str
-        self.write(f"{indent}<{tag_name}{attributes_str}>")
-        for child_element in html_elements:
-            self.visit(child_element)
-        self.write(f"{indent}</{tag_name}>")
-
+                attributes.append((name, None))
+        compounds.append((None if tag in (None, "*") else tag, tuple(classes), tuple(ids), tuple(attributes)))
+    if not compounds:
+        raise ValueError("empty selector")
+    return tuple(compounds)
+
+
+def _child_elements(element: HTMLElement) -> list:
+    """Returns the child elements of the element, an included partial as the elements of its
+    include line, see Include.element. Includes that were not resolved are left out."""
+    childs: list = []
+    for child in element._childs:
+        if isinstance(child, HTMLElement):
+            childs.append(child)
+        elif child.__class__ is Include and child._partial is not None:
+            childs.append(child.element)
+    return childs
+
+
+class ElementIndex:
+    """The elements of a tree by tag, attribute and id, each list in document order:
+        index = index_pyhtml(src)
+        index.tags["a"], index.attributes[("href", "/")], index.names["href"], index.ids["main"]
+        for a in index.select("div.nav a[href]"):
+            ...
+    classes has the elements of each of the space separated names of the class attributes and
+    ids the elements of each id, more than one if the document repeats an id. Each element also
+    has the range of document positions of its subtree, so select answers a selector from these
+    lists and ranges, without walking the tree or the ancestors of an element. The elements of
+    included partials are indexed as the copies of Include.element. The index does not follow
+    changes of the tree except for changed attribute values, which select checks on the elements.
+    """
 
-def main():
-    parser = argparse.ArgumentParser(
-                    prog='pyhtml',
-                    description='pyhtml to html compiler')
-    parser.add_argument('pyhtml_file') # positional argument
-    parser.add_argument('html_file', nargs="?", default=None) # positional argument
-    parser.add_argument('-d', '--debug', action='store_true')
-    args = parser.parse_args(sys.argv[1:])
-
-    if args.debug:
-        logger.setLevel(logging.DEBUG)
-
-    with open(args.pyhtml_file, "r") as fh:
-        src = fh.read()
-    print(src)
-    html_src: str = compile_pyhtml(src)
-
-    if args.html_file is None:
-        html_file: str = str(Path(args.pyhtml_file).with_suffix(''))+".html"
+    def __init__(self, root: HTMLElement):
+        self.root: HTMLElement = root
+        self.elements: list = []
+        self.tags: dict = {}
+        self.attributes: dict = {}
+        self.names: dict = {}
+        self.classes: dict = {}
+        self.ids: dict = {}
+        self._parents: dict = {root: None}
+        # The position of an element in document order and the end of the positions of its subtree.
+        self._positions: dict = {}
+        stack: list = [root]
+        while stack:
+            element: HTMLElement = stack.pop()
+            self._positions[element] = len(self.elements)
+            self._add(element)
+            childs: list = _child_elements(element)
+            for child in childs:
+                self._parents[child] = element
+            stack.extend(reversed(childs))
+        self._ends: list = list(range(1, len(self.elements) + 1))
+        for element in reversed(self.elements):
+            parent: HTMLElement | None = self._parents[element]
+            if parent is not None:
+                position: int = self._positions[parent]
+                self._ends[position] = max(self._ends[position], self._ends[self._positions[element]])
+
+    def _add(self, element: HTMLElement):
+        self.elements.append(element)
+        self.tags.setdefault(element._tag, []).append(element)
+        for attribute in element._attributes:
+            name: str = attribute._name
+            value: str = attribute._value
+            self.attributes.setdefault((name, value), []).append(element)
+            self.names.setdefault(name, []).append(element)
+            if name == "class":
+                for class_name in dict.fromkeys(value.split()):
+                    self.classes.setdefault(class_name, []).append(element)
+            elif name == "id":
+                self.ids.setdefault(value, []).append(element)
+
+    def parent(self, element: HTMLElement) -> HTMLElement | None:
+        return self._parents[element]
+
+    def _candidates(self, compound: tuple) -> list:
+        """Returns the shortest list of the index that has every element of the compound selector."""
+        tag, classes, ids, attributes = compound
+        lists: list = []
+        for id_value in ids:
+            lists.append(self.ids.get(id_value, []))
+        if tag is not None:
+            lists.append(self.tags.get(tag, []))
+        for class_name in classes:
+            lists.append(self.classes.get(class_name, []))
+        for name, value in attributes:
+            lists.append(self.names.get(name, []) if value is None else self.attributes.get((name, value), []))
+        return min(lists, key=len) if lists else self.elements
+
+    @staticmethod
+    def _matches(element: HTMLElement, compound: tuple) -> bool:
+        tag, classes, ids, attributes = compound
+        if tag is not None and element._tag != tag:
+            return False
+        for class_name in classes:
+            if not any(attribute._name == "class" and class_name in attribute._value.split()
+                       for attribute in element._attributes):
+                return False
+        for id_value in ids:
+            if not any(attribute._name == "id" and attribute._value == id_value for attribute in element._attributes):
+                return False
+        for name, value in attributes:
+            if not any(attribute._name == name and (value is None or attribute._value == value)
+                       for attribute in element._attributes):
+                return False
+        return True
+
+    def _inside(self, element: HTMLElement, starts: list, ends: list) -> bool:
+        """Checks if the element is below one of the elements with the subtrees starts and ends."""
+        position: int = self._positions[element]
+        i: int = bisect_right(starts, position) - 1
+        return i >= 0 and starts[i] < position < ends[i]
+
+    def iselect(self, selector: str):
+        """Yields the elements that match the selector in document order, a selector is made of
+        compound selectors like div, .item, #main, a[href] or input[type="text"], separated by
+        spaces for descendants."""
+        compounds: tuple = _parse_selector(selector)
+        # The subtrees of the elements that matched the compounds so far, the ones inside an
+        # other one are left out, so the starts and the ends are both sorted.
+        starts: list = []
+        ends: list = []
+        for i, compound in enumerate(compounds[:-1]):
+            matched: list = [element for element in self._candidates(compound) if self._matches(element, compound)
+                             and (i == 0 or self._inside(element, starts, ends))]
+            starts, ends = [], []
+            for element in matched:
+                position: int = self._positions[element]
+                if not ends or position >= ends[-1]:
+                    starts.append(position)
+                    ends.append(self._ends[position])
+            if not starts:
+                return
+        last: tuple = compounds[-1]
+        for element in self._candidates(last):
+            if self._matches(element, last) and (len(compounds) == 1 or self._inside(element, starts, ends)):
+                yield element
+
+    def select(self, selector: str) -> list:
+        return list(self.iselect(selector))
+
+    def select_one(self, selector: str) -> HTMLElement | None:
+        """Returns the first element that matches the selector or None."""
+        return next(self.iselect(selector), None)
+
+
+def index_pyhtml(src: str, engine: str = "recursive", stats=None, compact: bool = False, partials=None) -> ElementIndex:
+    """Parses the source like parse_pyhtml and returns the ElementIndex of the tree, its root
+    is the root element."""
+    return _run_parser(src, engine, stats, compact, True, partials).index
+
+
+_PATH_STEP_RE = re.compile(r"([^\s/\[\]]+)(?:\[([1-9][0-9]*)\])?")
+
+
+def find_element(root, element_id: str | None = None, path: str | None = None) -> HTMLElement:
+    """Returns the element with the id or at the path below the root, a HTMLElement or an ElementIndex.
+    path: the tags from the root to the element, like "html/body/div[2]/p", [n] is the n-th
+        child element with that tag and defaults to the first one.
+    Only the elements on the path or before the element with the id are visited, so an element of
+    a PyhtmlcFile is found without reading the rest of the file. The elements of included partials
+    are found as the copies of Include.element. If an id is repeated, the first element has it.
+    Raises a KeyError if there is no such element."""
+    if (element_id is None) == (path is None):
+        raise ValueError("either an element_id or a path is needed")
+    if isinstance(root, ElementIndex):
+        if element_id is not None:
+            if element_id not in root.ids:
+                raise KeyError(f"no element with the id {element_id!r}")
+            return root.ids[element_id][0]
+        root = root.root
+    if path is not None:
+        steps: list = []
+        for step in path.strip("/").split("/"):
+            match = _PATH_STEP_RE.fullmatch(step)
+            if match is None:
+                raise ValueError(f"invalid path {path!r}, expected tags like html/body/div[2]")
+            steps.append((match.group(1), int(match.group(2) or 1)))
+        tag, n = steps[0]
+        if root._tag != tag or n != 1:
+            raise KeyError(f"no element at {path!r}, the root is {root._tag}")
+        element: HTMLElement = root
+        for tag, n in steps[1:]:
+            for child in _child_elements(element):
+                if child._tag == tag:
+                    n -= 1
+                    if not n:
+                        element = child
+                        break
+            else:
+                raise KeyError(f"no element at {path!r}")
+        return element
+    stack: list = [root]
+    while stack:
+        element = stack.pop()
+        for attribute in element._attributes:
+            if attribute._name == "id" and attribute._value == element_id:
+                return element
+        stack.extend(reversed(_child_elements(element)))
+    raise KeyError(f"no element with the id {element_id!r}")
+
+
+def compile_fragment(src, element_id: str | None = None, path: str | None = None, engine: str = "recursive",
+                     stats=None, compact: bool = False, partials=None) -> str:
+    """Returns the html of the element with the id or at the path, see find_element. It is the
+    same as the part of the html of the whole document, indentation included.
+    src: a source, or the parsed root element or an ElementIndex of it, so several fragments of
+        a document are rendered without parsing it again.
+    partials: the Partials the includes of a source are loaded from, see parse_pyhtml."""
+    if isinstance(src, (HTMLElement, ElementIndex)):
+        root = src
     else:
-        html_file: str = args.html_file
-    with open(html_file, "w") as fh:
-        fh.write(html_src)
+        root = parse_pyhtml(src, engine, stats, compact, partials)
+    return Compiler(find_element(root, element_id, path), stats=stats).src
+
+
+def compile_fragment_file(source, element_id: str | None = None, path: str | None = None,
+                          engine: str = "recursive", stats=None) -> str:
+    """compile_fragment of a file. A .pyhtmlc file is not parsed and only the records of the
+    visited elements and of the fragment are read from it, see find_element."""
+    if Path(source).suffix == ".pyhtmlc":
+        with PyhtmlcFile(source) as pyhtmlc:
+            return compile_fragment(pyhtmlc.root, element_id, path, stats=stats)
+    return compile_fragment(parse_pyhtml_file(source, engine, stats), element_id, path, stats=stats)
 
-    print("Done! (˶ᵔ ᵕ ᵔ˶)")
 
+def compiler_version() -> str:
+    """Returns a hash of the source of this module, a cached html is only used by the same compiler."""
+    global _compiler_version
+    if _compiler_version is None:
+        with open(__file__, "rb") as fh:
+            _compiler_version = hashlib.sha256(fh.read()).hexdigest()
+    return _compiler_version
 
-def compile_pyhtml(src: str) -> str:
-    tokenizer: Tokenizer = Tokenizer(src)
+
+_compiler_version: str | None = None
+
+
+class _TeeWriter:
+    """Writes to several file objects at once."""
+
+    __slots__ = ("_fps",)
+
+    def __init__(self, *fps):
+        self._fps: tuple = fps
+
+    def write(self, chunk: str):
+        for fp in self._fps:
+            fp.write(chunk)
+
+
+class CompileCache:
+    """Compiled html on disk, addressed by a hash of the source and the compiler version:
+        cache = CompileCache()
+        html = compile_pyhtml(src, cache=cache)
+        print(cache.report())
+    The entries are written to a temporary file first and renamed, so other processes never
+    read a half written entry. A hit renews the modification time of its entry and when the
+    entries get bigger than max_size bytes, the ones that were not used the longest are deleted.
+    directory: defaults to $PYHTML_CACHE_DIR or pyhtml in the user cache directory.
+    """
+
+    def __init__(self, directory=None, max_size: int = 256 << 20):
+        if directory is None:
+            directory = os.environ.get("PYHTML_CACHE_DIR") or Path(
+                os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "pyhtml"
+        self.directory: Path = Path(directory)
+        self.max_size: int = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._size: int | None = None
+
+    def key(self, src: str, variant: str = "") -> str:
+        """src: the source as str or as utf-8 encoded bytes, both give the same key.
+        variant: tells apart the html of the same source compiled differently, like "minify"."""
+        digest = hashlib.sha256(f"{compiler_version()}\0{variant}\0".encode())
+        digest.update(src.encode() if isinstance(src, str) else src)
+        return digest.hexdigest()
+
+    def path(self, src: str, variant: str = "") -> Path:
+        return self.directory / f"{self.key(src, variant)}.html"
+
+    def get(self, src: str, variant: str = "") -> str | None:
+        """Returns the cached html of the source or None."""
+        path: Path = self.path(src, variant)
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as fh:
+                html: str = fh.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.debug(f"cache hit {path.name}")
+        return html
+
+    def put(self, src: str, html: str, variant: str = ""):
+        with self.writer(src, variant) as fh:
+            fh.write(html)
+
+    @contextmanager
+    def writer(self, src: str, variant: str = ""):
+        """Returns a file object for the html of the source, the entry is added when the block
+        ends without an exception."""
+        import tempfile
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(".tmp", dir=self.directory)
+        try:
+            with open(fd, "w", encoding="utf-8", newline="") as fh:
+                yield fh
+            size: int = os.path.getsize(tmp_path)
+            path: Path = self.path(src, variant)
+            # A rewritten entry, or one that another process wrote meanwhile, only adds the difference.
+            try:
+                size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if self._size is None:
+            self._size = sum(entry.stat().st_size for entry in self._entries())
+        else:
+            self._size += size
+        if self._size > self.max_size:
+            self.evict()
+
+    def _entries(self) -> list:
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith(".html")]
+
+    def evict(self):
+        """Deletes the least recently used entries until the cache fits into max_size."""
+        entries: list = []
+        for entry in self._entries():
+            try:
+                entries.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+            except FileNotFoundError:
+                pass
+        entries.sort()
+        size: int = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+            self.evictions += 1
+        self._size = size
+
+    def report(self) -> str:
+        lookups: int = self.hits + self.misses
+        return (f"cache: {self.hits} hits, {self.misses} misses"
+                f" ({self.hits / lookups if lookups else 0:.0%} hit rate), {self.evictions} evictions in {self.directory}")
+
+
+class MemoryCache:
+    """Compiled html in memory for processes that compile the same sources again and again:
+        cache = MemoryCache(max_entries=500, max_bytes=32 << 20, ttl=300)
+        html = compile_pyhtml(src, cache=cache)
+    The least recently used entries are dropped when there are more than max_entries or they
+    take more than max_bytes, entries older than ttl seconds are compiled again.
+    The cache can be shared by threads, but not by processes: compile_many with workers and an
+    AsyncCompiler on a ProcessPoolExecutor refuse it, use a CompileCache there.
+    The entries are keyed by the (src, variant) tuple, not by its digest like a CompileCache.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 << 20, ttl: float | None = None):
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.ttl: float | None = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+        self.size: int = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, src: str, variant: str = "") -> str | None:
+        """Returns the cached html of the source or None."""
+        key: tuple = (src, variant)
+        with self._lock:
+            entry: tuple | None = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, src: str, html: str, variant: str = ""):
+        size: int = sys.getsizeof(src) + sys.getsizeof(html)
+        if size > self.max_bytes or not self.max_entries:
+            return
+        expires: float | None = None if self.ttl is None else time.monotonic() + self.ttl
+        key: tuple = (src, variant)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (html, size, expires)
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    @contextmanager
+    def writer(self, src: str, variant: str = ""):
+        """Returns a file object for the html of the source, the entry is added when the block
+        ends without an exception."""
+        fh = io.StringIO()
+        yield fh
+        self.put(src, fh.getvalue(), variant)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key: tuple):
+        self.size -= self._entries.pop(key)[1]
+
+    def report(self) -> str:
+        lookups: int = self.hits + self.misses
+        return (f"cache: {self.hits} hits, {self.misses} misses"
+                f" ({self.hits / lookups if lookups else 0:.0%} hit rate), {self.evictions} evictions,"
+                f" {self.expirations} expirations, {len(self._entries)} entries of {self.size} bytes")
+
+
+# An include line, found without parsing for the cache keys and the IncludeGraph.
+_INCLUDE_LINE_RE = re.compile(r'^ *include +"([^"\\]*)" *$', re.MULTILINE)
+_INCLUDE_LINE_BYTES_RE = re.compile(_INCLUDE_LINE_RE.pattern.encode(), re.MULTILINE)
+
+
+def find_includes(src) -> list:
+    """Returns the paths of the include lines of the source, a str or utf-8 encoded bytes, without
+    parsing it. A line like an include line in a text with several lines is found too."""
+    if isinstance(src, str):
+        return _INCLUDE_LINE_RE.findall(src)
+    return [path.decode() for path in _INCLUDE_LINE_BYTES_RE.findall(src)]
+
+
+def is_partial(path) -> bool:
+    """Partials are files whose name starts with an underscore, they are not compiled on their own."""
+    return Path(path).name.startswith("_")
+
+
+class Partial:
+    """A parsed partial file of Partials. Its html is compiled once per compiler class and
+    indentation of the include line: the tags are indented by the include line, the texts are
+    written as they are, like in the including file.
+    digest: a hash of the source of the partial and the digests of the partials it includes."""
+
+    def __init__(self, path: Path, signature: tuple, source_digest: str, element: HTMLElement, includes: list):
+        self.path: Path = path
+        self.signature: tuple = signature
+        self.source_digest: str = source_digest
+        self.element: HTMLElement = element
+        self.includes: list = includes
+        digest = hashlib.sha256(source_digest.encode())
+        for include in includes:
+            digest.update(include._partial.digest.encode())
+        self.digest: str = digest.hexdigest()
+        self._trees: dict = {}
+        self._html: dict = {}
+
+    def tree(self, indent: str) -> HTMLElement:
+        """Returns the copy of the tree for the indent, it is made once per indent, see copy."""
+        tree: HTMLElement | None = self._trees.get(indent)
+        if tree is None:
+            tree = self._trees[indent] = self.copy(indent)
+        return tree
+
+    def copy(self, indent: str) -> HTMLElement:
+        """Returns a copy of the tree with the indent in front of the indentation of every element.
+        The attributes and texts are shared with the tree of the partial."""
+        tree = HTMLElement(indent + self.element._indent, self.element._tag)
+        stack: list = [(self.element, tree)]
+        while stack:
+            element, copy = stack.pop()
+            copy._attributes = element._attributes
+            childs: list = []
+            for child in element._childs:
+                if isinstance(child, HTMLElement):
+                    child_copy = HTMLElement(indent + child._indent, child._tag)
+                    stack.append((child, child_copy))
+                elif child.__class__ is Include:
+                    child_copy = Include(indent + child._indent, child._path)
+                    child_copy._partial = child._partial
+                else:
+                    child_copy = child
+                childs.append(child_copy)
+            copy._childs = childs or ()
+        return tree
+
+    def html(self, compiler_class, indent: str) -> str:
+        key: tuple = (compiler_class, indent)
+        html: str | None = self._html.get(key)
+        if html is None:
+            html = self._html[key] = compiler_class(self.tree(indent)).src
+        return html
+
+
+class Partials:
+    """The included files of a build, each is parsed once and its html is compiled once per
+    compiler class and indentation, so the pages that include it share them:
+        partials = Partials()
+        compile_file("index.pyhtml", partials=partials)
+        compile_file("about.pyhtml", partials=partials)
+    A file is parsed again once its modification time or size changed. The include paths of a
+    file are relative to its directory, the ones of a source given as str to directory.
+    An include cycle raises a ValueError. The partials can be shared by threads.
+    engine: the name of the parser of the partials in PARSERS.
+    """
+
+    def __init__(self, directory=".", engine: str = "recursive"):
+        self.directory: Path = Path(directory)
+        self.engine: str = engine
+        self.parses: int = 0
+        self._partials: dict = {}
+        # The partials that are loaded at the moment, a partial in it includes itself.
+        self._loading: list = []
+        self._lock = threading.RLock()
+
+    def resolve(self, includes: list, directory=None):
+        """Loads the partial of each Include node, relative to the directory or self.directory."""
+        directory = self.directory if directory is None else Path(directory)
+        for include in includes:
+            include._partial = self.load(directory / include._path)
+
+    def load(self, path) -> Partial:
+        """Returns the partial of the file, it is parsed if it is new or was changed and compiled
+        again if one of the partials it includes was changed."""
+        path = Path(os.path.abspath(path))
+        with self._lock:
+            if path in self._loading:
+                cycle: list = self._loading[self._loading.index(path):] + [path]
+                raise ValueError(f"include cycle: {' -> '.join(map(str, cycle))}")
+            stat = os.stat(path)
+            signature: tuple = (stat.st_mtime_ns, stat.st_size)
+            partial: Partial | None = self._partials.get(path)
+            self._loading.append(path)
+            try:
+                if partial is None or partial.signature != signature:
+                    partial = self._parse(path, signature)
+                else:
+                    includes: list = [self.load(path.parent / include._path) for include in partial.includes]
+                    if any(new is not include._partial for new, include in zip(includes, partial.includes)):
+                        for new, include in zip(includes, partial.includes):
+                            include._partial = new
+                        partial = Partial(path, signature, partial.source_digest, partial.element, partial.includes)
+            finally:
+                self._loading.pop()
+            self._partials[path] = partial
+            return partial
+
+    def _parse(self, path: Path, signature: tuple) -> Partial:
+        with open(path, "rb") as fh:
+            src: bytes = fh.read()
+        self.parses += 1
+        parser = _run_parser(src.decode(), self.engine, None, False, partials=self, include_dir=path.parent)
+        if not parser._block_stack:
+            raise ValueError(f"the partial {path} has no element")
+        return Partial(path, signature, hashlib.sha256(src).hexdigest(), parser._block_stack[0], parser.includes)
+
+    def cache_variant(self, src, variant: str = "", directory=None) -> str:
+        """Returns the cache variant of the source with the digests of the partials it includes,
+        so its cached html is only used while they are unchanged. A missing partial is left out,
+        compiling the source fails then anyway."""
+        paths: list = find_includes(src)
+        if not paths:
+            return variant
+        directory = self.directory if directory is None else Path(directory)
+        digests: list = []
+        for path in paths:
+            try:
+                digests.append(self.load(directory / path).digest)
+            except OSError:
+                digests.append("")
+        return f"{variant}\0includes {' '.join(digests)}"
+
+
+def parse_pyhtml(src: str, engine: str = "recursive", stats=None, compact: bool = False, partials=None,
+                 include_dir=None) -> HTMLElement:
+    """Returns the root element of the source.
+    src: a str or utf-8 encoded bytes, a bytes-like source is tokenized by the BytesTokenizer.
+    engine: the name of the parser in PARSERS, "iterative" parses without recursion.
+    stats: a CompileStats that gets the timings and counters of the tokenizer and the parser.
+    compact: keeps the tokens in a TokenArray instead of a list of Token objects.
+    partials: the Partials the includes are loaded from, a new one if None.
+    include_dir: the directory the include paths are relative to, defaults to the one of partials."""
+    return _run_parser(src, engine, stats, compact, partials=partials, include_dir=include_dir)._block_stack[0]
+
+
+def _run_parser(src: str, engine: str, stats, compact: bool, index: bool = False, partials=None, include_dir=None):
+    """Tokenizes and parses the source and resolves its includes, see parse_pyhtml, and returns the parser."""
+    if stats is not None:
+        start: float = time.perf_counter()
+    if isinstance(src, str):
+        tokenizer: Tokenizer = Tokenizer(src, compact)
+    else:
+        tokenizer = BytesTokenizer(src)
     tokenizer.parse()
-    print(tokenizer.tokens)
-    parser = Parser(tokenizer.tokens)
+    if stats is not None:
+        stats.tokenize_time += time.perf_counter() - start
+        stats.count_tokens(tokenizer.tokens)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"tokens: {tokenizer.tokens}")
+    if stats is not None:
+        start = time.perf_counter()
+    parser = PARSERS[engine](tokenizer.tokens, stats=stats, index=index)
     parser.parse()
+    if parser.includes:
+        (Partials(engine=engine) if partials is None else partials).resolve(parser.includes, include_dir)
+        if index:
+            parser.index = ElementIndex(parser._block_stack[0])
+    if stats is not None:
+        stats.parse_time += time.perf_counter() - start
     #print("block stack:", parser._block_stack)
-    compiler = Compiler(parser._block_stack[0])
+    return parser
+
+
+@contextmanager
+def map_file(path):
+    """Returns the content of the file as a read only mmap, or empty bytes for an empty file."""
+    with open(path, "rb") as fh:
+        if not os.fstat(fh.fileno()).st_size:
+            yield b""
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def parse_pyhtml_file(path, engine: str = "recursive", stats=None, partials=None) -> HTMLElement:
+    """Returns the root element of the file, its content is memory mapped and tokenized as bytes,
+    so the source is neither read into memory nor decoded as a whole. The include paths are
+    relative to the directory of the file."""
+    with map_file(path) as src:
+        return parse_pyhtml(src, engine, stats, partials=partials, include_dir=Path(path).parent)
+
+
+_shared_partials: dict = {}
+
+
+def _default_partials(engine: str) -> Partials:
+    """The Partials of the cached compilations without partials, one per engine. It lives as long
+    as the process, so the cache key of a source with includes only parses the partials again
+    when they changed on disk."""
+    partials: Partials | None = _shared_partials.get(engine)
+    if partials is None:
+        partials = _shared_partials.setdefault(engine, Partials(engine=engine))
+    return partials
+
+
+def compile_pyhtml(src: str, engine: str = "recursive", stats=None, compact: bool = False, cache=None,
+                   minify: bool = False, partials=None) -> str:
+    """stats: a CompileStats that is filled with the timings and counters of the compilation.
+    cache: a CompileCache or MemoryCache, the source is only tokenized and parsed if its html is not cached.
+        The cache key includes the digests of the included partials.
+    minify: compiles with the MinifiedCompiler.
+    partials: the Partials the includes are loaded from, relative to its directory. With a cache
+        it defaults to a Partials that is shared by the calls, see _default_partials."""
+    variant: str = "minify" if minify else ""
+    if cache is not None:
+        if partials is None:
+            partials = _default_partials(engine)
+        variant = partials.cache_variant(src, variant)
+        html: str | None = cache.get(src, variant)
+        if html is not None:
+            return html
+    compiler_class = MinifiedCompiler if minify else Compiler
+    compiler = compiler_class(parse_pyhtml(src, engine, stats, compact, partials), stats=stats)
+    if cache is not None:
+        cache.put(src, compiler.src, variant)
     return compiler.src
 
 
+def compile_pyhtml_to(src: str, fp, engine: str = "recursive", flush_size: int = 1 << 16, stats=None,
+                      compact: bool = False, cache=None, minify: bool = False, partials=None):
+    """Compiles the source and writes the html to the file object while it is compiled.
+    The output is written in chunks of about flush_size characters and never held as a whole.
+    cache: a CompileCache or MemoryCache, a missing entry is written along with the file object.
+    minify, partials: see compile_pyhtml."""
+    compiler_class = MinifiedCompiler if minify else Compiler
+    if cache is None:
+        compiler_class(parse_pyhtml(src, engine, stats, compact, partials), fp, flush_size, stats)
+        return
+    if partials is None:
+        partials = _default_partials(engine)
+    variant: str = partials.cache_variant(src, "minify" if minify else "")
+    html: str | None = cache.get(src, variant)
+    if html is not None:
+        fp.write(html)
+        return
+    element: HTMLElement = parse_pyhtml(src, engine, stats, compact, partials)
+    with cache.writer(src, variant) as entry:
+        compiler_class(element, _TeeWriter(fp, entry), flush_size, stats)
+
+
+class _StreamCancelled(Exception):
+    """Raised in the worker thread of a stream whose consumer is gone."""
+
+
+def _compile_with_stats(src: str, engine: str, compact: bool, cache) -> tuple:
+    """compile_pyhtml with a new CompileStats in a worker process, returns the html and the stats."""
+    stats = CompileStats()
+    return compile_pyhtml(src, engine, stats, compact, cache), stats
+
+
+class AsyncCompiler:
+    """Compiles for asyncio programs on an executor, so the event loop keeps running:
+        compiler = AsyncCompiler(max_concurrency=4)
+        html = await compiler.compile(src)
+        async for chunk in compiler.stream(src):
+            await response.write(chunk)
+    executor: a ThreadPoolExecutor by default, a ProcessPoolExecutor compiles outside the GIL,
+        but it streams the html only after it was compiled and adds the stats of the worker
+        to a CompileStats once the compilation is done.
+    max_concurrency: the number of compilations that run at once, the others wait.
+    A cancelled compilation that was not started yet does not run, a started stream stops at
+    its next chunk and a started compile runs to its end with its result thrown away. It keeps
+    its place in max_concurrency until then.
+    """
+
+    def __init__(self, executor=None, max_concurrency: int | None = None, engine: str = "recursive",
+                 flush_size: int = 1 << 16):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        self.executor = executor if executor is not None else ThreadPoolExecutor(thread_name_prefix="pyhtml")
+        self.engine: str = engine
+        self.flush_size: int = flush_size
+        self._semaphore: asyncio.Semaphore | None = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def _submit(self, fnc, *args):
+        """Submits the function to the executor once the semaphore allows it and returns the future
+        of the executor, the semaphore is released when the function has returned."""
+        import asyncio
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+        try:
+            future = self.executor.submit(fnc, *args)
+        except BaseException:
+            if self._semaphore is not None:
+                self._semaphore.release()
+            raise
+        if self._semaphore is not None:
+            loop = asyncio.get_running_loop()
+            future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._semaphore.release))
+        return future
+
+    async def compile(self, src: str, stats=None, compact: bool = False, cache=None, engine: str | None = None) -> str:
+        """compile_pyhtml on the executor, with the engine of the compiler if none is given."""
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor
+        if isinstance(cache, MemoryCache) and isinstance(self.executor, ProcessPoolExecutor):
+            raise ValueError("a MemoryCache can not be shared by processes, use a CompileCache")
+        if stats is not None and isinstance(self.executor, ProcessPoolExecutor):
+            # The worker fills a copy of the stats, they are added to the stats of the caller.
+            future = await self._submit(partial(_compile_with_stats, src, engine or self.engine, compact, cache))
+            html, worker_stats = await asyncio.wrap_future(future)
+            stats.add(worker_stats)
+            return html
+        future = await self._submit(partial(compile_pyhtml, src, engine or self.engine, stats, compact, cache))
+        return await asyncio.wrap_future(future)
+
+    async def stream(self, src: str, stats=None, compact: bool = False, max_chunks: int = 8):
+        """Yields the html in chunks of about flush_size characters while it is compiled.
+        max_chunks: the number of chunks that are compiled ahead of the consumer."""
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor
+        if isinstance(self.executor, ProcessPoolExecutor):
+            html: str = await self.compile(src, stats, compact)
+            for start in range(0, len(html), self.flush_size):
+                yield html[start:start + self.flush_size]
+            return
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        slots = threading.Semaphore(max_chunks)
+        cancelled = threading.Event()
+        done = object()
+
+        class Writer:
+            def write(self, chunk: str):
+                slots.acquire()
+                if cancelled.is_set():
+                    raise _StreamCancelled()
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+
+        def run():
+            try:
+                compile_pyhtml_to(src, Writer(), self.engine, self.flush_size, stats, compact)
+            except _StreamCancelled:
+                return
+            except BaseException as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+                return
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        future = await self._submit(run)
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is done:
+                    return
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                slots.release()
+                yield chunk
+        finally:
+            if not future.done():
+                cancelled.set()
+                future.cancel()
+                slots.release()
+
+    async def compile_to(self, src: str, write, stats=None, compact: bool = False):
+        """Passes the chunks of stream to write, a function or a coroutine function like the
+        write method of a streamed web response."""
+        import inspect
+        async for chunk in self.stream(src, stats, compact):
+            written = write(chunk)
+            if inspect.isawaitable(written):
+                await written
+
+
+_async_compiler: AsyncCompiler | None = None
+
+
+def _default_async_compiler() -> AsyncCompiler:
+    global _async_compiler
+    if _async_compiler is None:
+        _async_compiler = AsyncCompiler()
+    return _async_compiler
+
+
+async def compile_pyhtml_async(src: str, engine: str | None = None, stats=None, compact: bool = False, cache=None,
+                               compiler: AsyncCompiler | None = None) -> str:
+    """compile_pyhtml on the executor of the compiler, that defaults to a shared AsyncCompiler
+    with a thread pool. engine: defaults to the engine of the compiler."""
+    return await (compiler or _default_async_compiler()).compile(src, stats, compact, cache, engine)
+
+
+def stream_pyhtml(src: str, stats=None, compact: bool = False, compiler: AsyncCompiler | None = None):
+    """Returns an async iterator of the html chunks of the source, see AsyncCompiler.stream."""
+    return (compiler or _default_async_compiler()).stream(src, stats, compact)
+
+
+async def compile_pyhtml_to_async(src: str, write, stats=None, compact: bool = False,
+                                  compiler: AsyncCompiler | None = None):
+    """Passes the html chunks of the source to write while it is compiled, see AsyncCompiler.compile_to."""
+    await (compiler or _default_async_compiler()).compile_to(src, write, stats, compact)
+
+
+def find_sources(paths, partials: bool = False) -> list:
+    """Returns the files of the paths and the *.pyhtml files in the directories of the paths.
+    partials: returns the partials in the directories too, see is_partial."""
+    sources: list = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            sources.extend(sorted(source for source in path.rglob("*.pyhtml") if partials or not is_partial(source)))
+        else:
+            sources.append(path)
+    return sources
+
+
+class CompileResult:
+    """The outcome of compiling one file, error is the message of the exception it failed with
+    and cached is None if no cache was looked up. gzip_bytes is the size of the .gz file, if one
+    was written."""
+
+    __slots__ = ("source", "html_file", "error", "source_bytes", "output_bytes", "gzip_bytes", "seconds", "cached",
+                 "stats")
+
+    def __init__(self, source: Path, html_file: str):
+        self.source: Path = source
+        self.html_file: str = html_file
+        self.error: str | None = None
+        self.source_bytes: int = 0
+        self.output_bytes: int = 0
+        self.gzip_bytes: int = 0
+        self.seconds: float = 0.0
+        self.cached: bool | None = None
+        self.stats: CompileStats | None = None
+
+    def __repr__(self) -> str:
+        return f"CompileResult({str(self.source)!r}, {self.html_file!r}, error={self.error!r})"
+
+
+def compile_file(source, html_file: str | None = None, engine: str = "recursive", flush_size: int = 1 << 16,
+                 compact: bool = False, cache=None, stats=None, emit_pyhtmlc: bool = False,
+                 use_mmap: bool = False, minify: bool = False, gzip_level: int | None = None, partials=None) -> str:
+    """Compiles the pyhtml file into the html file, that defaults to the source with an .html suffix.
+    The html file is only opened once the source was parsed.
+    A .pyhtmlc source is loaded instead of parsed, see write_pyhtmlc.
+    emit_pyhtmlc: writes the parsed tree to the source with a .pyhtmlc suffix too.
+    use_mmap: tokenizes the memory mapped bytes of the source instead of reading it into a str,
+        the cache has to be a CompileCache then.
+    minify: compiles with the MinifiedCompiler.
+    gzip_level: writes the html gzip compressed at that level (1 to 9) to the html file with a .gz
+        suffix too, like nginx's gzip_static expects it. The chunks of the html are compressed
+        while they are written, see open_gzip.
+    partials: the Partials the includes are loaded from, relative to the directory of the source.
+    Returns the name of the html file."""
+    compiler_class = MinifiedCompiler if minify else Compiler
+    variant: str = "minify" if minify else ""
+    if partials is None:
+        partials = Partials(engine=engine)
+    if html_file is None:
+        html_file = str(Path(source).with_suffix(''))+".html"
+    with ExitStack() as stack:
+        html: str | None = None
+        if Path(source).suffix == ".pyhtmlc":
+            element: HTMLElement = stack.enter_context(PyhtmlcFile(source)).root
+            cache = None
+        else:
+            if use_mmap:
+                src = stack.enter_context(map_file(source))
+            else:
+                with open(source, "r") as fh:
+                    src = fh.read()
+            if cache is not None:
+                variant = partials.cache_variant(src, variant, Path(source).parent)
+                if not emit_pyhtmlc:
+                    html = cache.get(src, variant)
+            if html is None:
+                element = parse_pyhtml(src, engine, stats, compact, partials, Path(source).parent)
+            if emit_pyhtmlc:
+                with open(Path(source).with_suffix(".pyhtmlc"), "wb") as fh:
+                    write_pyhtmlc(element, fh)
+        with ExitStack() as outputs:
+            fps: list = [outputs.enter_context(open(html_file, "w"))]
+            if gzip_level is not None:
+                fps.append(outputs.enter_context(open_gzip(html_file + ".gz", gzip_level)))
+            if html is not None:
+                for fh in fps:
+                    fh.write(html)
+            else:
+                if cache is not None:
+                    fps.append(outputs.enter_context(cache.writer(src, variant)))
+                compiler_class(element, fps[0] if len(fps) == 1 else _TeeWriter(*fps), flush_size, stats)
+    return html_file
+
+
+def open_gzip(path, level: int = 9):
+    """Returns a text file object that writes utf-8 compressed with gzip to the path.
+    The header has no time, so the same html always gives the same file."""
+    import gzip
+    return io.TextIOWrapper(gzip.GzipFile(path, "wb", level, mtime=0), encoding="utf-8", newline="")
+
+
+_worker_cache = None
+_worker_partials: Partials | None = None
+
+
+def _init_worker(cache, engine: str):
+    global _worker_cache, _worker_partials
+    _worker_cache = cache
+    _worker_partials = Partials(engine=engine)
+
+
+def _compile_job(job: tuple) -> CompileResult:
+    """Compiles one file of compile_many and catches its errors."""
+    (source, html_file, engine, flush_size, compact, cache, with_stats, emit_pyhtmlc, use_mmap, minify, gzip_level,
+     partials) = job
+    if cache is None:
+        cache = _worker_cache
+    if partials is None:
+        partials = _worker_partials
+    result = CompileResult(source, html_file)
+    stats: CompileStats | None = CompileStats() if with_stats else None
+    lookups: tuple = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    start: float = time.perf_counter()
+    try:
+        result.html_file = compile_file(source, html_file, engine, flush_size, compact, cache, stats, emit_pyhtmlc,
+                                        use_mmap, minify, gzip_level, partials)
+        result.source_bytes = os.path.getsize(source)
+        result.output_bytes = os.path.getsize(result.html_file)
+        if gzip_level is not None:
+            result.gzip_bytes = os.path.getsize(result.html_file + ".gz")
+    except Exception as e:
+        result.error = f"{e.__class__.__name__}: {e}"
+    result.seconds = time.perf_counter() - start
+    if cache is not None and (cache.hits, cache.misses) != lookups:
+        result.cached = cache.hits > lookups[0]
+    result.stats = stats
+    return result
+
+
+def compile_many(paths, workers: int | None = 1, engine: str = "recursive", flush_size: int = 1 << 16,
+                 compact: bool = False, cache=None, stats=None, html_files: dict | None = None,
+                 emit_pyhtmlc: bool = False, use_mmap: bool = False, minify: bool = False,
+                 gzip_level: int | None = None, partials=None) -> list:
+    """Compiles the files and the *.pyhtml files in the directories of the paths, each into an
+    html file next to it, and returns a CompileResult per file. A file that fails does not stop
+    the others, its result has the error.
+    workers: the number of processes, None uses every cpu, 1 compiles in this process.
+    cache: a CompileCache the workers share, its counters get the hits and misses of all of them.
+        A MemoryCache only works with workers=1, it can not be shared by processes.
+    stats: a CompileStats that gets the timings and counters of every file.
+    html_files: the html file names of sources that do not get the default one.
+    emit_pyhtmlc: writes the tree of each source to a .pyhtmlc file next to it too.
+    use_mmap: tokenizes the memory mapped bytes of each source, see compile_file.
+    minify, gzip_level: see compile_file.
+    partials: the Partials of the files compiled in this process, each worker process has its own,
+        so a partial is parsed once per process. Files whose names start with an underscore are
+        partials and only compiled if they are given as a file."""
+    sources: list = find_sources(paths)
+    html_files = html_files or {}
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(sources))
+    if workers <= 1:
+        if partials is None:
+            partials = Partials(engine=engine)
+        results: list = [_compile_job((source, html_files.get(source), engine, flush_size, compact, cache,
+                                       stats is not None, emit_pyhtmlc, use_mmap, minify, gzip_level, partials))
+                         for source in sources]
+    else:
+        if isinstance(cache, MemoryCache):
+            raise ValueError("a MemoryCache can not be shared by processes, use a CompileCache or workers=1")
+        jobs: list = [(source, html_files.get(source), engine, flush_size, compact, None, stats is not None, emit_pyhtmlc,
+                       use_mmap, minify, gzip_level, None) for source in sources]
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(cache, engine)) as executor:
+            results = list(executor.map(_compile_job, jobs, chunksize=max(1, len(jobs) // (workers * 8))))
+        if cache is not None:
+            for result in results:
+                if result.cached is not None:
+                    cache.hits += result.cached
+                    cache.misses += not result.cached
+    if stats is not None:
+        for result in results:
+            if result.stats is not None:
+                stats.add(result.stats)
+    return results
+
+
+def batch_summary(results: list, seconds: float) -> str:
+    """Returns the number of compiled and failed files and the throughput of compile_many."""
+    failed: int = sum(result.error is not None for result in results)
+    cached: int = sum(result.cached is True for result in results)
+    source_bytes: int = sum(result.source_bytes for result in results)
+    output_bytes: int = sum(result.output_bytes for result in results)
+    gzip_bytes: int = sum(result.gzip_bytes for result in results)
+    summary: str = (f"{len(results) - failed} of {len(results)} files compiled ({failed} failed, {cached} cached) in {seconds:.2f}s:"
+                    f" {len(results) / seconds if seconds else 0:.1f} files/s, {source_bytes / seconds / 1e6 if seconds else 0:.2f} MB/s source,"
+                    f" {output_bytes / 1e6:.2f} MB html")
+    if gzip_bytes:
+        summary += f", {gzip_bytes / 1e6:.2f} MB gzip ({gzip_bytes / output_bytes if output_bytes else 0:.0%} of the html)"
+    return summary
+
+
+class IncludeGraph:
+    """The partials each file includes, found with find_includes, so the files that include a
+    changed partial directly or through other partials are known without parsing them:
+        graph = IncludeGraph(find_sources(["docs"], partials=True))
+        pages = graph.dependents([Path("docs/_nav.pyhtml")])
+    """
+
+    def __init__(self, sources=()):
+        self._includes: dict = {}
+        self._sources: dict = {}
+        self.update(sources)
+
+    def update(self, sources):
+        """Reads the include lines of the sources again, a source that is gone is removed."""
+        for source in sources:
+            path: Path = Path(os.path.abspath(source))
+            try:
+                with open(path, "rb") as fh:
+                    src: bytes = fh.read()
+            except OSError:
+                self._includes.pop(path, None)
+                self._sources.pop(path, None)
+                continue
+            self._sources[path] = source
+            self._includes[path] = {Path(os.path.abspath(path.parent / include)) for include in find_includes(src)}
+
+    def includes(self, source) -> set:
+        """Returns the absolute paths of the files the source includes directly."""
+        return self._includes.get(Path(os.path.abspath(source)), set())
+
+    def dependents(self, paths) -> list:
+        """Returns the sources that include one of the paths, directly or through other partials,
+        in the order they were added. The paths themselves are not returned."""
+        included_by: dict = {}
+        for path, includes in self._includes.items():
+            for include in includes:
+                included_by.setdefault(include, []).append(path)
+        changed: set = {Path(os.path.abspath(path)) for path in paths}
+        found: set = set()
+        stack: list = list(changed)
+        while stack:
+            for path in included_by.get(stack.pop(), ()):
+                if path not in found and path not in changed:
+                    found.add(path)
+                    stack.append(path)
+        return [source for path, source in self._sources.items() if path in found]
+
+
+class Watcher:
+    """Polls the modification times and sizes of the sources of the paths and of the partials in
+    them, see find_sources. wait returns the changed files once they were not changed again for
+    debounce seconds, so the files an editor saves at once are compiled together and only once."""
+
+    def __init__(self, paths, interval: float = 0.25, debounce: float = 0.1):
+        self.paths: list = list(paths)
+        self.interval: float = interval
+        self.debounce: float = debounce
+        self._signatures: dict = self.scan()
+
+    def scan(self) -> dict:
+        signatures: dict = {}
+        for source in find_sources(self.paths, partials=True):
+            try:
+                stat = os.stat(source)
+            except FileNotFoundError:
+                continue
+            signatures[source] = (stat.st_mtime_ns, stat.st_size)
+        return signatures
+
+    def changes(self) -> list:
+        """Returns the sources that were added or changed since the last scan."""
+        signatures: dict = self.scan()
+        changed: list = [source for source, signature in signatures.items() if self._signatures.get(source) != signature]
+        self._signatures = signatures
+        return changed
+
+    def wait(self) -> list:
+        changed: list = []
+        while not changed:
+            time.sleep(self.interval)
+            changed = self.changes()
+        while True:
+            time.sleep(self.debounce)
+            more: list = self.changes()
+            if not more:
+                return changed
+            changed.extend(source for source in more if source not in changed)
+
+
+def watch(paths, interval: float = 0.25, debounce: float = 0.1, rebuilds: int | None = None, **options):
+    """Compiles the sources of the paths again whenever they change, until rebuilds rebuilds
+    were made or forever. A changed partial compiles the sources that include it, see IncludeGraph.
+    Prints per file how long its compilation took and how long after it was saved the html was written.
+    options: the arguments of compile_many, like engine or cache."""
+    watcher = Watcher(paths, interval, debounce)
+    graph = IncludeGraph(watcher._signatures)
+    if options.get("partials") is None:
+        options["partials"] = Partials(engine=options.get("engine", "recursive"))
+    while rebuilds is None or rebuilds > 0:
+        changed: list = watcher.wait()
+        graph.update(changed)
+        sources: list = [source for source in changed + graph.dependents(changed) if not is_partial(source)]
+        for result in compile_many(sources, 1, **options):
+            if result.error is not None:
+                print(f"{result.source}: {result.error}", file=sys.stderr)
+                continue
+            try:
+                latency: float = time.time() - os.stat(result.source).st_mtime
+            except FileNotFoundError:
+                continue
+            print(f"{result.source}: {result.html_file} in {result.seconds * 1000:.1f}ms,"
+                  f" {latency * 1000:.0f}ms after the save")
+        if rebuilds is not None:
+            rebuilds -= 1
+
+
+def main():
+    """The command line interface, it is in pyhtml_cli so that importing pyhtml does not set it up."""
+    from pyhtml_cli import main
+    main()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,97 @@
+"""The command line interface of pyhtml, python3 pyhtml.py runs it too:
+    python3 pyhtml_cli.py [options] paths...
+It is kept apart from pyhtml, so that importing the library does not set up argparse or
+a logging handler.
+"""
+# Standard library imports.
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Local application/library specific imports.
+from pyhtml import PARSERS, CompileCache, CompileStats, compile_many, batch_summary, watch, logger
+
+
+def is_output(paths: list) -> bool:
+    """The second of two paths is the html file of the first one, unless it is a directory or a source,
+    like pyhtml page.pyhtml page.htm. An existing html file is overwritten."""
+    return (len(paths) == 2 and not Path(paths[0]).is_dir() and not Path(paths[1]).is_dir()
+            and Path(paths[1]).suffix not in (".pyhtml", ".pyhtmlc"))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+                    prog='pyhtml',
+                    description='pyhtml to html compiler',
+                    epilog="A single source can be followed by the name of its html file, like with --output.")
+    parser.add_argument('paths', nargs="+", help="pyhtml or pyhtmlc files and directories that are searched for *.pyhtml files") # positional argument
+    parser.add_argument('-o', '--output', default=None, help="the html file of a single source")
+    parser.add_argument('-d', '--debug', action='store_true', help="log the tokens and the steps of the parser")
+    parser.add_argument('-e', '--engine', choices=PARSERS, default="recursive")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="compile in that many processes, 0 uses every cpu")
+    parser.add_argument('-w', '--watch', action='store_true', help="compile the files again whenever they change")
+    parser.add_argument('--interval', type=float, default=0.25, help="seconds between the checks for changes in watch mode")
+    parser.add_argument('--flush-size', type=int, default=1 << 16, help="characters written to the html file at once")
+    parser.add_argument('--stats', action='store_true', help="print timings and counters of the compilation")
+    parser.add_argument('--compact', action='store_true', help="store the tokens in compact arrays to save memory")
+    parser.add_argument('--mmap', action='store_true',
+                        help="tokenize the memory mapped bytes of the files instead of reading them, for very large files")
+    parser.add_argument('--emit-pyhtmlc', action='store_true',
+                        help="write the parsed tree of each file to a .pyhtmlc file that can be compiled instead of the source")
+    parser.add_argument('--minify', action='store_true', help="write the tags without indentation and newlines between them")
+    parser.add_argument('--gzip', action='store_true', help="write a gzip compressed .html.gz next to each html file too")
+    parser.add_argument('--gzip-level', type=int, default=9, choices=range(1, 10), metavar="LEVEL",
+                        help="the compression level of --gzip from 1 (fastest) to 9 (smallest, the default)")
+    parser.add_argument('--no-cache', action='store_true', help="always compile, do not read or write the compilation cache")
+    parser.add_argument('--cache-dir', default=None, help="directory of the compilation cache")
+    parser.add_argument('--cache-stats', action='store_true', help="print the hits and misses of the compilation cache")
+    args = parser.parse_args(sys.argv[1:])
+    gzip_level: int | None = args.gzip_level if args.gzip else None
+
+    if args.debug:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(name)s - %(levelname)s - %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+
+    html_files: dict = {}
+    paths: list = args.paths
+    if is_output(paths):
+        args.output = paths.pop()
+    if args.output is not None:
+        if len(paths) != 1 or Path(paths[0]).is_dir():
+            parser.error("--output needs a single source file")
+        html_files[Path(paths[0])] = args.output
+    stats: CompileStats | None = CompileStats() if args.stats else None
+    cache: CompileCache | None = None if args.no_cache else CompileCache(args.cache_dir)
+    start: float = time.perf_counter()
+    results: list = compile_many(paths, args.jobs or None, args.engine, args.flush_size, args.compact, cache, stats,
+                                 html_files, args.emit_pyhtmlc, args.mmap, args.minify, gzip_level)
+    for result in results:
+        if result.error is not None:
+            print(f"{result.source}: {result.error}", file=sys.stderr)
+    if stats is not None:
+        print(stats.report(), file=sys.stderr)
+    if args.cache_stats and cache is not None:
+        print(cache.report(), file=sys.stderr)
+    if len(results) > 1 or args.gzip:
+        print(batch_summary(results, time.perf_counter() - start), file=sys.stderr)
+    if args.watch:
+        print(f"Watching {', '.join(paths)} for changes (ctrl+c stops) ...")
+        try:
+            watch(paths, args.interval, engine=args.engine, flush_size=args.flush_size, compact=args.compact,
+                  cache=cache, html_files=html_files, emit_pyhtmlc=args.emit_pyhtmlc, use_mmap=args.mmap,
+                  minify=args.minify, gzip_level=gzip_level)
+        except KeyboardInterrupt:
+            pass
+        return
+    if not results or any(result.error is not None for result in results):
+        sys.exit(1)
+
+    print("Done! (˶ᵔ ᵕ ᵔ˶)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+
+
+def touch(path, src: str, mtime: int):
+    """Writes the source with the mtime in nanoseconds, so a change is seen even within the
+    timestamp resolution of the file system."""
+    path.write_text(src)
+    os.utime(path, ns=(mtime, mtime))
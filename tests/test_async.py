@@ -0,0 +1,176 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pyhtml
+from pyhtml import AsyncCompiler, compile_pyhtml, compile_pyhtml_async, stream_pyhtml, compile_pyhtml_to_async
+
+
+SRC: str = "html:\n" + '    div class="item":\n        << "text"\n' * 2000
+
+
+def test_compile_async():
+    async def main():
+        ticks: list = []
+
+        async def tick():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0)
+
+        ticker = asyncio.create_task(tick())
+        html: str = await compile_pyhtml_async(SRC, "iterative")
+        ticker.cancel()
+        return html, len(ticks)
+
+    html, ticks = asyncio.run(main())
+    assert html == compile_pyhtml(SRC, "iterative")
+    assert ticks > 1
+
+
+def test_stream_async():
+    async def main():
+        compiler = AsyncCompiler(engine="iterative", flush_size=1000)
+        chunks: list = [chunk async for chunk in compiler.stream(SRC)]
+        written: list = []
+
+        async def write(chunk: str):
+            written.append(chunk)
+
+        await compile_pyhtml_to_async(SRC, write, compiler=compiler)
+        default: list = [chunk async for chunk in stream_pyhtml("p:\n")]
+        return chunks, written, default
+
+    chunks, written, default = asyncio.run(main())
+    assert len(chunks) > 10 and all(len(chunk) >= 1000 for chunk in chunks[:-1])
+    assert "".join(chunks) == "".join(written) == compile_pyhtml(SRC, "iterative")
+    assert default == [compile_pyhtml("p:\n")]
+
+
+def test_async_errors():
+    async def main():
+        with pytest.raises(pyhtml.SyntaxError):
+            await compile_pyhtml_async("html:\n    =\n")
+        with pytest.raises(pyhtml.SyntaxError):
+            async for chunk in stream_pyhtml("html:\n    =\n"):
+                pass
+
+    asyncio.run(main())
+
+
+def test_async_concurrency_and_cancellation(monkeypatch):
+    active: list = [0]
+    peak: list = [0]
+    started: list = []
+    lock = threading.Lock()
+
+    def slow_compile(src: str, *args) -> str:
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            started.append(src)
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return src
+
+    monkeypatch.setattr(pyhtml, "compile_pyhtml", slow_compile)
+
+    async def main():
+        compiler = AsyncCompiler(max_concurrency=2)
+        results: list = await asyncio.gather(*(compiler.compile(f"{i}") for i in range(6)))
+        first = asyncio.create_task(compiler.compile("first"))
+        second = asyncio.create_task(compiler.compile("second"))
+        waiting = asyncio.create_task(compiler.compile("cancelled"))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        return results, await first, await second
+
+    results, first, second = asyncio.run(main())
+    assert results == [f"{i}" for i in range(6)]
+    assert peak[0] == 2
+    assert (first, second) == ("first", "second")
+    assert "cancelled" not in started
+
+
+def test_stream_cancellation(monkeypatch):
+    writes: list = []
+    ended: list = []
+    compile_pyhtml_to = pyhtml.compile_pyhtml_to
+
+    class CountingWriter:
+        def __init__(self, fp):
+            self.fp = fp
+
+        def write(self, chunk: str):
+            writes.append(chunk)
+            self.fp.write(chunk)
+
+    def recorded(src: str, fp, *args):
+        try:
+            compile_pyhtml_to(src, CountingWriter(fp), *args)
+        except BaseException as e:
+            ended.append(e.__class__)
+            raise
+        ended.append(None)
+
+    monkeypatch.setattr(pyhtml, "compile_pyhtml_to", recorded)
+
+    async def main():
+        compiler = AsyncCompiler(engine="iterative", flush_size=100)
+        stream = compiler.stream(SRC, max_chunks=2)
+        chunks: list = []
+        async for chunk in stream:
+            chunks.append(chunk)
+            break
+        await stream.aclose()
+        await asyncio.sleep(0.05)
+        compiler.executor.shutdown(wait=True)
+        return chunks, len(writes)
+
+    chunks, written = asyncio.run(main())
+    # The worker stops at its next chunk, it compiled at most the chunks ahead of the consumer.
+    assert ended == [pyhtml._StreamCancelled]
+    assert len(chunks) == 1 and written == len(writes) <= 4
+    assert len(compile_pyhtml(SRC, "iterative")) > 100 * 100
+
+
+def test_process_executor_stats():
+    from concurrent.futures import ProcessPoolExecutor
+
+    async def main():
+        compiler = AsyncCompiler(ProcessPoolExecutor(1), engine="iterative", flush_size=1000)
+        stats = pyhtml.CompileStats()
+        html: str = await compiler.compile(SRC, stats)
+        stream_stats = pyhtml.CompileStats()
+        chunks: list = [chunk async for chunk in compiler.stream(SRC, stream_stats)]
+        compiler.executor.shutdown(wait=True)
+        return html, stats, "".join(chunks), stream_stats
+
+    html, stats, streamed, stream_stats = asyncio.run(main())
+    expected = pyhtml.CompileStats()
+    assert html == streamed == compile_pyhtml(SRC, "iterative", expected)
+    assert stats.rule_matches == stream_stats.rule_matches == expected.rule_matches
+    assert stats.rule_matches and stats.parse_time > 0 and stats.output_bytes == expected.output_bytes
+
+
+def test_process_executor_memory_cache():
+    from concurrent.futures import ProcessPoolExecutor
+
+    async def main():
+        compiler = AsyncCompiler(ProcessPoolExecutor(1))
+        try:
+            with pytest.raises(ValueError):
+                await compiler.compile(SRC, cache=pyhtml.MemoryCache())
+        finally:
+            compiler.executor.shutdown(wait=True)
+
+    asyncio.run(main())
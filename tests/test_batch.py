@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from pyhtml import CompileCache, MemoryCache, CompileStats, compile_many, compile_file, find_sources, batch_summary, compile_pyhtml
+
+
+def write_sources(directory, count: int) -> dict:
+    sources: dict = {}
+    (directory / "sub").mkdir()
+    for i in range(count):
+        path = directory / ("sub" if i % 2 else "") / f"page{i}.pyhtml"
+        sources[path] = f'html:\n    p class="page":\n        << "{i}"\n'
+        path.write_text(sources[path])
+    return sources
+
+
+def test_find_sources(tmp_path):
+    sources: dict = write_sources(tmp_path, 4)
+    (tmp_path / "notes.txt").write_text("")
+    single = tmp_path / "single.txt"
+    assert find_sources([tmp_path, single]) == sorted(sources) + [single]
+
+
+def test_compile_file(tmp_path):
+    source = tmp_path / "page.pyhtml"
+    source.write_text("div:\n")
+    assert compile_file(source) == str(tmp_path / "page.html")
+    assert (tmp_path / "page.html").read_text() == compile_pyhtml("div:\n")
+
+
+def test_compile_many(tmp_path):
+    sources: dict = write_sources(tmp_path, 6)
+    (tmp_path / "sub" / "broken.pyhtml").write_text("html:\n    =\n")
+    for workers in (1, 2):
+        stats = CompileStats()
+        results: list = compile_many([tmp_path], workers, stats=stats)
+        assert len(results) == 7
+        errors: list = [result for result in results if result.error is not None]
+        assert [result.source.name for result in errors] == ["broken.pyhtml"]
+        assert errors[0].error.startswith("SyntaxError")
+        assert not os.path.exists(tmp_path / "sub" / "broken.html")
+        for result in results:
+            if result.error is None:
+                assert open(result.html_file).read() == compile_pyhtml(sources[result.source])
+                assert result.output_bytes == os.path.getsize(result.html_file)
+        assert stats.tokens > 6 * 10
+    assert "6 of 7 files compiled (1 failed, 0 cached)" in batch_summary(results, 1.0)
+
+
+def test_compile_many_cache(tmp_path):
+    (tmp_path / "src").mkdir()
+    write_sources(tmp_path / "src", 4)
+    cache = CompileCache(tmp_path / "cache")
+    compile_many([tmp_path / "src"], 2, cache=cache)
+    results: list = compile_many([tmp_path / "src"], 2, cache=cache)
+    assert [result.cached for result in results] == [True] * 4
+    assert (cache.hits, cache.misses) == (4, 4)
+
+
+
+def test_compile_many_memory_cache(tmp_path):
+    write_sources(tmp_path, 4)
+    cache = MemoryCache()
+    with pytest.raises(ValueError):
+        compile_many([tmp_path], 2, cache=cache)
+    compile_many([tmp_path], 1, cache=cache)
+    results: list = compile_many([tmp_path], 1, cache=cache)
+    assert [result.cached for result in results] == [True] * 4
+
+def test_compile_many_html_files(tmp_path):
+    source = tmp_path / "page.pyhtml"
+    source.write_text("div:\n")
+    results: list = compile_many([source], html_files={source: str(tmp_path / "out.html")})
+    assert results[0].html_file == str(tmp_path / "out.html")
+    assert results[0].cached is None
+    assert os.path.exists(tmp_path / "out.html")
+
+
+def test_cli_html_file(tmp_path):
+    (tmp_path / "page.pyhtml").write_text("div:\n")
+    cli: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pyhtml_cli.py")
+    for args in (["out.htm"], ["out.htm"], ["-o", "other.txt"], ["--output", "page.xhtml"]):
+        done = subprocess.run([sys.executable, cli, "--no-cache", "page.pyhtml", *args], cwd=tmp_path,
+                              capture_output=True, text=True)
+        assert done.returncode == 0, done.stderr
+        assert (tmp_path / args[-1]).read_text() == compile_pyhtml("div:\n")
+    assert not (tmp_path / "page.html").exists()
+    (tmp_path / "second.pyhtml").write_text("p:\n")
+    done = subprocess.run([sys.executable, cli, "--no-cache", "page.pyhtml", "second.pyhtml"], cwd=tmp_path,
+                          capture_output=True, text=True)
+    assert done.returncode == 0 and (tmp_path / "second.html").exists() and (tmp_path / "page.html").exists()
+    done = subprocess.run([sys.executable, cli, "--no-cache", "-o", "x.html", "page.pyhtml", "second.pyhtml"],
+                          cwd=tmp_path, capture_output=True, text=True)
+    assert done.returncode == 2 and "--output needs a single source file" in done.stderr
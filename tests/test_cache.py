@@ -0,0 +1,147 @@
+import io
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pyhtml
+from pyhtml import CompileCache, MemoryCache, CompileStats, compile_pyhtml, compile_pyhtml_to
+
+
+SRC: str = """html:
+    p class="text":
+        << "textline"
+"""
+
+
+def test_cache_hit_skips_parsing(tmp_path):
+    cache = CompileCache(tmp_path)
+    stats = CompileStats()
+    html: str = compile_pyhtml(SRC, stats=stats, cache=cache)
+    tokens: int = stats.tokens
+    assert compile_pyhtml(SRC, stats=stats, cache=cache) == html == compile_pyhtml(SRC)
+    assert stats.tokens == tokens
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert CompileCache(tmp_path).get(SRC) == html
+
+
+def test_cache_compile_to(tmp_path):
+    cache = CompileCache(tmp_path)
+    for _ in range(2):
+        fp = io.StringIO()
+        compile_pyhtml_to(SRC, fp, flush_size=4, cache=cache)
+        assert fp.getvalue() == compile_pyhtml(SRC)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_key(tmp_path, monkeypatch):
+    cache = CompileCache(tmp_path)
+    assert cache.key(SRC) == CompileCache(tmp_path / "other").key(SRC)
+    assert cache.key(SRC) != cache.key(SRC + "\n")
+    key: str = cache.key(SRC)
+    monkeypatch.setattr(pyhtml, "_compiler_version", "another version")
+    assert cache.key(SRC) != key
+
+
+def test_cache_failed_compilation(tmp_path):
+    cache = CompileCache(tmp_path)
+    try:
+        compile_pyhtml_to("html:\n    =\n", io.StringIO(), cache=cache)
+    except pyhtml.SyntaxError:
+        pass
+    try:
+        with cache.writer(SRC) as fh:
+            fh.write("<html>")
+            raise KeyboardInterrupt
+    except KeyboardInterrupt:
+        pass
+    assert os.listdir(tmp_path) == []
+
+
+def test_cache_lru_eviction(tmp_path):
+    sources: list = [f'p:\n    << "{i}"\n' for i in range(4)]
+    html: str = compile_pyhtml(sources[0])
+    cache = CompileCache(tmp_path, max_size=3 * len(html.encode()))
+    for i, src in enumerate(sources[:3]):
+        cache.put(src, compile_pyhtml(src))
+        os.utime(cache.path(src), (i, i))
+    assert cache.get(sources[0]) is not None
+    cache.put(sources[3], compile_pyhtml(sources[3]))
+    assert cache.evictions == 1
+    assert [cache.path(src).exists() for src in sources] == [True, False, True, True]
+
+
+def test_cache_rewritten_entry(tmp_path):
+    html: str = compile_pyhtml(SRC)
+    cache = CompileCache(tmp_path, max_size=10 * len(html.encode()))
+    cache.put(SRC, html)
+    # Writing the same entry again, like emit_pyhtmlc or another process does, does not count it twice.
+    for _ in range(3):
+        cache.put(SRC, html)
+    assert cache._size == len(html.encode()) and cache.evictions == 0
+
+
+def test_memory_cache():
+    cache = MemoryCache()
+    stats = CompileStats()
+    html: str = compile_pyhtml(SRC, stats=stats, cache=cache)
+    tokens: int = stats.tokens
+    assert compile_pyhtml(SRC, stats=stats, cache=cache) == html
+    assert stats.tokens == tokens
+    fp = io.StringIO()
+    compile_pyhtml_to(SRC + "p:\n", fp, cache=cache)
+    assert cache.get(SRC + "p:\n") == fp.getvalue()
+    assert (cache.hits, cache.misses, len(cache)) == (2, 2, 2)
+
+
+def test_memory_cache_budgets():
+    sources: list = [f'p:\n    << "{i}"\n' for i in range(4)]
+    cache = MemoryCache(max_entries=3)
+    for src in sources[:3]:
+        compile_pyhtml(src, cache=cache)
+    compile_pyhtml(sources[0], cache=cache)
+    compile_pyhtml(sources[3], cache=cache)
+    assert [cache.get(src) is not None for src in sources] == [True, False, True, True]
+    assert cache.evictions == 1
+    cache = MemoryCache(max_bytes=2 * (sys.getsizeof(sources[0]) + sys.getsizeof(compile_pyhtml(sources[0]))))
+    for src in sources:
+        compile_pyhtml(src, cache=cache)
+    assert len(cache) == 2 and cache.evictions == 2
+    assert cache.size <= cache.max_bytes
+    cache.put(SRC * 10000, "")
+    assert len(cache) == 2
+
+
+def test_memory_cache_ttl(monkeypatch):
+    now: list = [100.0]
+    monkeypatch.setattr(pyhtml.time, "monotonic", lambda: now[0])
+    cache = MemoryCache(ttl=10)
+    compile_pyhtml(SRC, cache=cache)
+    now[0] += 9
+    assert cache.get(SRC) is not None
+    now[0] += 1
+    assert cache.get(SRC) is None
+    assert (cache.expirations, len(cache), cache.size) == (1, 0, 0)
+
+
+def test_memory_cache_threads():
+    cache = MemoryCache(max_entries=5)
+    sources: list = [f'p:\n    << "{i}"\n' for i in range(8)]
+    expected: dict = {src: compile_pyhtml(src) for src in sources}
+    errors: list = []
+
+    def work(offset: int):
+        for i in range(200):
+            src: str = sources[(i + offset) % len(sources)]
+            if compile_pyhtml(src, cache=cache) != expected[src]:
+                errors.append(src)
+
+    threads: list = [threading.Thread(target=work, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert cache.hits + cache.misses == 800
+    assert len(cache) == 5
@@ -1,9 +1,10 @@
+import io
 import os
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from pyhtml import Tokenizer, Parser, Compiler, compile_pyhtml, SyntaxError
+from pyhtml import Tokenizer, Parser, Compiler, HTMLElement, AddText, compile_pyhtml, compile_pyhtml_to, CompileStats, TokenType, SyntaxError
 
 
 def test_compiler1():
@@ -238,3 +239,89 @@ def test_invalid_syntax():
         assert err.line == 5
         assert err.row == 13
 
+
+
+def test_compile_pyhtml_to():
+    src: str = """div class="window":
+    << "textline"
+    div class="title":
+        << "another textline"
+"""
+    for flush_size in (1, 10, 1 << 16):
+        fp = io.StringIO()
+        compile_pyhtml_to(src, fp, flush_size=flush_size)
+        assert fp.getvalue() == compile_pyhtml(src)
+
+
+def test_compile_pyhtml_to_chunks():
+    class Chunks(list):
+        write = list.append
+
+    src: str = "div:\n" + "    << \"text\"\n" * 100
+    chunks = Chunks()
+    compile_pyhtml_to(src, chunks, flush_size=50)
+    assert len(chunks) > 10
+    assert max(len(chunk) for chunk in chunks) < 60
+    assert "".join(chunks) == compile_pyhtml(src)
+
+
+def test_compile_stats():
+    src: str = """div class="window":
+    << "textline"
+"""
+    stats = CompileStats()
+    html = compile_pyhtml(src, stats=stats)
+    assert stats.tokens == 10
+    assert stats.token_types[TokenType.VALUE] == 2
+    assert stats.output_bytes == len(html)
+    assert stats.rule_matches["r_html_element19"] == 1
+    assert stats.rule_attempts["r_html_element19"] == 1
+    assert stats.rule_backtracks["r_html_element_attribute1"] == 1
+    assert stats.tokenize_time > 0 and stats.parse_time > 0 and stats.compile_time > 0
+    assert "r_html_element19" in stats.report()
+
+    iterative_stats = CompileStats()
+    compile_pyhtml(src, engine="iterative", stats=iterative_stats)
+    assert iterative_stats.rule_attempts == stats.rule_attempts
+    assert iterative_stats.rule_backtracks == stats.rule_backtracks
+
+
+def test_compile_compact():
+    src: str = """div class="window" style="position: absolute;":
+    << "textline"
+    div class = "title":
+        << "another
+textline"
+    style = "color: red"
+"""
+    assert compile_pyhtml(src, compact=True) == compile_pyhtml(src)
+    assert compile_pyhtml(src, engine="iterative", compact=True) == compile_pyhtml(src)
+    stats = CompileStats()
+    compile_pyhtml(src, stats=stats, compact=True)
+    assert stats.token_types[TokenType.VALUE] == 6
+
+
+def test_compiler_deep_tree():
+    root = parent = HTMLElement("", "html")
+    for i in range(10000):
+        child = HTMLElement("    ", "div")
+        parent.append(child)
+        parent = child
+    parent.append(AddText("text"))
+    html = Compiler(root).src
+    assert html.startswith("<html>\n    <div>\n    <div>")
+    assert html.count("</div>") == 10000
+    assert html.endswith("    </div>\n</html>")
+
+
+def test_compiler_dispatch():
+    class UpperCompiler(Compiler):
+        def visit_AddText(self, element):
+            self.write(element._value.upper())
+
+    assert Compiler.dispatch() is Compiler.dispatch()
+    assert Compiler.dispatch()[AddText] is Compiler.visit_AddText
+    assert UpperCompiler.dispatch()[AddText] is UpperCompiler.visit_AddText
+    element = HTMLElement("", "p")
+    element.append(AddText("text"))
+    assert UpperCompiler(element).src == "<p>\nTEXT\n</p>"
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from pyhtml import (PyhtmlcFile, compile_fragment, compile_fragment_file, compile_file, compile_pyhtml, find_element,
+                    index_pyhtml, parse_pyhtml)
+
+
+SRC: str = """html:
+    head:
+        title:
+            << "page"
+    body:
+        div class="nav":
+            a href="/":
+                << "home"
+        div:
+            id = "main"
+            p:
+                << "first"
+            p:
+                << "second"
+"""
+
+
+# A dedent after a text line nests the next element into the previous block, so body is a child of
+# head and the div with the id main a child of the first div.
+MAIN: str = "html/head/body/div/div"
+
+
+def test_fragment_by_id_and_path():
+    html: str = compile_pyhtml(SRC)
+    main: str = compile_fragment(SRC, "main")
+    assert main.startswith("        <div id='main'>") and main in html
+    assert compile_fragment(SRC, path=f"/{MAIN}/") == main
+    assert compile_fragment(SRC, path=f"{MAIN}/p[2]") == "            <p>\nsecond\n            </p>"
+    assert compile_fragment(SRC, path="html") == html
+    root = parse_pyhtml(SRC)
+    assert find_element(root, path="html/head/body/div[1]") is root._childs[0]._childs[1]._childs[0]
+    index = index_pyhtml(SRC)
+    assert compile_fragment(index, "main") == compile_fragment(root, "main") == main
+
+
+def test_fragment_errors():
+    root = parse_pyhtml(SRC)
+    for path in ("body", "html/head/body/div[2]", "html/span"):
+        with pytest.raises(KeyError):
+            find_element(root, path=path)
+    with pytest.raises(KeyError):
+        find_element(index_pyhtml(SRC), "missing")
+    with pytest.raises(KeyError):
+        compile_fragment(SRC, "missing")
+    for path in ("html/div[0]", "html//p", "html/p[x]"):
+        with pytest.raises(ValueError):
+            find_element(root, path=path)
+    with pytest.raises(ValueError):
+        find_element(root, "main", "html")
+    with pytest.raises(ValueError):
+        find_element(root)
+
+
+def test_fragment_file(tmp_path, monkeypatch):
+    source = tmp_path / "page.pyhtml"
+    source.write_text(SRC)
+    compile_file(source, emit_pyhtmlc=True)
+    main: str = compile_fragment(SRC, "main")
+    assert compile_fragment_file(source, "main") == main
+    reads: list = []
+    read_childs = PyhtmlcFile.read_childs
+
+    def counted(self, node: int) -> tuple:
+        reads.append(node)
+        return read_childs(self, node)
+
+    monkeypatch.setattr(PyhtmlcFile, "read_childs", counted)
+    assert compile_fragment_file(tmp_path / "page.pyhtmlc", path=MAIN) == main
+    # The elements on the path and of the fragment are read, but not title and a.
+    assert len(reads) == len(set(reads)) == 7
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pyhtml
+from pyhtml import compile_pyhtml, parse_pyhtml
+
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_is_lightweight():
+    code: str = ("import sys, pyhtml; print([m for m in ('argparse', 'asyncio', 'concurrent.futures', 'inspect', 'tempfile')"
+                 " if m in sys.modules], pyhtml.logger.handlers)")
+    out: str = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert out == "[] []\n"
+
+
+def test_compile_prints_nothing(capsys):
+    compile_pyhtml('html:\n    p:\n        << "text"\n')
+    parse_pyhtml("div:\n", "iterative")
+    for engine in ("recursive", "iterative"):
+        with pytest.raises(pyhtml.SyntaxError):
+            parse_pyhtml("html:\n    =\n", engine)
+    assert capsys.readouterr() == ("", "")
+
+
+def test_cli(tmp_path):
+    (tmp_path / "page.pyhtml").write_text("div:\n")
+    for script in ("pyhtml.py", "pyhtml_cli.py"):
+        (tmp_path / "page.html").unlink(missing_ok=True)
+        done = subprocess.run([sys.executable, os.path.join(ROOT, script), "--no-cache", str(tmp_path / "page.pyhtml")],
+                              capture_output=True, text=True)
+        assert done.returncode == 0 and done.stdout == "Done! (˶ᵔ ᵕ ᵔ˶)\n"
+        assert (tmp_path / "page.html").read_text() == compile_pyhtml("div:\n")
+    assert pyhtml.logger.handlers == []
@@ -0,0 +1,174 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pyhtml
+from pyhtml import (CompileCache, IncludeGraph, IncrementalCompiler, MemoryCache, Partials, compile_file, compile_many,
+                    compile_pyhtml, compile_fragment, find_includes, find_sources, index_pyhtml, load_pyhtmlc,
+                    watch)
+
+from conftest import touch
+
+
+NAV: str = """nav class="main":
+    a href="/":
+        << "home"
+    include "_links.pyhtml"
+"""
+
+LINKS: str = """ul:
+    li:
+        << "one"
+"""
+
+PAGE: str = """html:
+    body:
+        include "_nav.pyhtml"
+        div:
+            << "page"
+"""
+
+
+def write_site(path):
+    (path / "_nav.pyhtml").write_text(NAV)
+    (path / "_links.pyhtml").write_text(LINKS)
+    (path / "page.pyhtml").write_text(PAGE)
+    (path / "about.pyhtml").write_text(PAGE.replace("page", "about"))
+
+
+def test_include(tmp_path):
+    write_site(tmp_path)
+    partials = Partials(tmp_path)
+    html: str = compile_pyhtml(PAGE, partials=partials)
+    assert html == """<html>
+    <body>
+        <nav class='main'>
+            <a href='/'>
+home
+            </a>
+            <ul>
+                <li>
+one
+                </li>
+            </ul>
+        </nav>
+        <div>
+page
+        </div>
+    </body>
+</html>"""
+    assert compile_pyhtml(PAGE, partials=partials, minify=True) == (
+        "<html><body><nav class='main'><a href='/'>\nhome\n</a><ul><li>\none\n</li></ul></nav><div>\npage\n</div></body></html>")
+    # A partial is parsed once and compiled once per compiler and indentation.
+    assert compile_pyhtml("div:\n    include \"_links.pyhtml\"\n", partials=partials) == (
+        "<div>\n    <ul>\n        <li>\none\n        </li>\n    </ul>\n</div>")
+    assert partials.parses == 2
+    links = partials.load(tmp_path / "_links.pyhtml")
+    assert sorted((compiler_class.__name__, len(indent)) for compiler_class, indent in links._html) == [
+        ("Compiler", 4), ("Compiler", 12), ("MinifiedCompiler", 12)]
+    assert find_includes(PAGE) == find_includes(PAGE.encode()) == ["_nav.pyhtml"]
+
+
+def test_include_errors(tmp_path):
+    write_site(tmp_path)
+    (tmp_path / "_links.pyhtml").write_text('ul:\n    include "_nav.pyhtml"\n')
+    with pytest.raises(ValueError, match="include cycle: .*_nav.pyhtml -> .*_links.pyhtml -> .*_nav.pyhtml"):
+        compile_pyhtml(PAGE, partials=Partials(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        compile_pyhtml('div:\n    include "_missing.pyhtml"\n', partials=Partials(tmp_path))
+    with pytest.raises(ValueError, match="not resolved"):
+        pyhtml.Compiler(pyhtml.HTMLElement("", "div")).visit_Include(pyhtml.Include("    ", "_nav.pyhtml"))
+
+
+def test_include_cache(tmp_path):
+    write_site(tmp_path)
+    cache = CompileCache(tmp_path / "cache")
+    partials = Partials()
+    results: list = compile_many([tmp_path], cache=cache, partials=partials)
+    assert [result.source.name for result in results] == ["about.pyhtml", "page.pyhtml"]
+    assert [result.cached for result in results] == [False, False]
+    assert partials.parses == 2
+    assert [result.cached for result in compile_many([tmp_path], cache=cache, partials=partials)] == [True, True]
+    # A changed partial that is included by the nav is parsed again and the pages are compiled again.
+    touch(tmp_path / "_links.pyhtml", LINKS.replace("one", "two"), 1)
+    assert [result.cached for result in compile_many([tmp_path], cache=cache, partials=partials)] == [False, False]
+    assert partials.parses == 3
+    assert "two" in (tmp_path / "page.html").read_text()
+    assert [result.cached for result in compile_many([tmp_path], cache=cache)] == [True, True]
+
+
+def test_include_memory_cache(tmp_path, monkeypatch):
+    write_site(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    partials = pyhtml._default_partials("recursive")
+    parses: int = partials.parses
+    cache = MemoryCache()
+    html: str = compile_pyhtml(PAGE, cache=cache)
+    for _ in range(4):
+        assert compile_pyhtml(PAGE, cache=cache) == html
+    # The partials are parsed once, the hits only compare their modification times.
+    assert (cache.hits, cache.misses, partials.parses - parses) == (4, 1, 2)
+    touch(tmp_path / "_links.pyhtml", LINKS.replace("one", "two"), 1)
+    assert "two" in compile_pyhtml(PAGE, cache=cache)
+    assert (cache.misses, partials.parses - parses) == (2, 3)
+    assert compile_pyhtml("p:\n", cache=cache) == compile_pyhtml("p:\n")
+
+
+def test_include_pyhtmlc_and_incremental(tmp_path):
+    write_site(tmp_path)
+    compile_file(tmp_path / "page.pyhtml", emit_pyhtmlc=True)
+    html: str = (tmp_path / "page.html").read_text()
+    assert pyhtml.Compiler(load_pyhtmlc(tmp_path / "page.pyhtmlc")).src == html
+    compiler = IncrementalCompiler(PAGE, partials=Partials(tmp_path))
+    assert compiler.html == html
+    assert compiler.update(4, 5, '            << "edited"\n') == html.replace("\npage\n", "\nedited\n")
+    assert compiler.full_compiles == 1
+    compiler.update(2, 3, '        include "_links.pyhtml"\n')
+    assert compiler.full_compiles == 2 and "nav" not in compiler.html
+
+
+def test_include_index_and_fragment(tmp_path):
+    write_site(tmp_path)
+    (tmp_path / "_links.pyhtml").write_text('ul id="links":\n    li:\n        << "one"\n')
+    src: str = PAGE + '        include "_links.pyhtml"\n'
+    partials = Partials(tmp_path)
+    index = index_pyhtml(src, partials=partials)
+    assert [element._tag for element in index.elements] == ["html", "body", "nav", "a", "ul", "li", "div", "ul", "li"]
+    # The partial is included twice, each include line has its own elements.
+    first, second = index.ids["links"]
+    assert first is not second and index.parent(first)._tag == "nav" and index.parent(second)._tag == "body"
+    assert index.select("nav #links li") == [index.elements[5]]
+    html: str = compile_pyhtml(src, partials=partials)
+    fragment: str = compile_fragment(index, "links")
+    assert fragment.startswith("            <ul id='links'>") and fragment in html
+    assert compile_fragment(src, path="html/body/ul", partials=partials) == compile_fragment(index, path="html/body/ul")
+    assert compile_fragment(index, path="html/body/ul").startswith("        <ul id='links'>")
+
+
+def test_include_graph(tmp_path):
+    write_site(tmp_path)
+    (tmp_path / "plain.pyhtml").write_text("div:\n")
+    assert [source.name for source in find_sources([tmp_path])] == ["about.pyhtml", "page.pyhtml", "plain.pyhtml"]
+    graph = IncludeGraph(find_sources([tmp_path], partials=True))
+    assert [source.name for source in graph.dependents([tmp_path / "_links.pyhtml"])] == [
+        "_nav.pyhtml", "about.pyhtml", "page.pyhtml"]
+    assert graph.dependents([tmp_path / "plain.pyhtml"]) == []
+    assert graph.includes(tmp_path / "page.pyhtml") == {tmp_path / "_nav.pyhtml"}
+
+
+def test_watch_partial(tmp_path, monkeypatch, capsys):
+    write_site(tmp_path)
+    for source in tmp_path.iterdir():
+        os.utime(source, ns=(1, 1))
+
+    def sleep(seconds: float):
+        touch(tmp_path / "_links.pyhtml", LINKS.replace("one", "two"), 2)
+
+    monkeypatch.setattr(pyhtml.time, "sleep", sleep)
+    watch([tmp_path], rebuilds=1)
+    assert "two" in (tmp_path / "page.html").read_text() and "two" in (tmp_path / "about.html").read_text()
+    out: str = capsys.readouterr().out
+    assert "page.pyhtml" in out and "about.pyhtml" in out and "_links" not in out
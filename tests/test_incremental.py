@@ -0,0 +1,99 @@
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pyhtml
+from pyhtml import IncrementalCompiler, CompileStats, compile_pyhtml
+
+
+SRC: str = """html:
+    div class="title":
+        << "textline"
+    p:
+        << "another textline"
+"""
+
+
+def document(count: int) -> str:
+    return "html:\n" + '    div class="item":\n        << "text"\n' * count
+
+
+def compiled(src: str):
+    try:
+        return compile_pyhtml(src, engine="iterative")
+    except Exception as e:
+        return e.__class__
+
+
+def test_incremental_text():
+    compiler = IncrementalCompiler(SRC)
+    html = compiler.update(2, 3, '        << "changed"\n')
+    assert html == compile_pyhtml(compiler.src)
+    assert '"changed"' in compiler.src and "changed" in html
+    assert compiler.full_compiles == 1
+
+
+def test_incremental_element():
+    compiler = IncrementalCompiler(SRC)
+    assert compiler.update(1, 2, '    span id="title":\n') == compile_pyhtml(compiler.src)
+    assert compiler.update(2, 3, '        << "a"\n        << "b"\n') == compile_pyhtml(compiler.src)
+    assert compiler.full_compiles == 1
+    assert compiler.update(3, 3, "    div:\n") == compile_pyhtml(compiler.src)
+    assert compiler.full_compiles == 2
+
+
+def test_incremental_cost_independent_of_size():
+    counts: list = []
+    for count in (50, 2000):
+        stats = CompileStats()
+        compiler = IncrementalCompiler(document(count), stats)
+        tokens: int = stats.tokens
+        rules: int = sum(stats.rule_matches.values()) + sum(stats.rule_failures.values())
+        line: int = count // 2 * 2 + 1
+        compiler.update(line, line + 1, '    div class="other":\n')
+        compiler.update(line + 1, line + 2, '        << "other"\n')
+        assert compiler.full_compiles == 1
+        assert compiler.html == compiled(compiler.src)
+        counts.append((stats.tokens - tokens, sum(stats.rule_matches.values()) + sum(stats.rule_failures.values()) - rules))
+    assert counts[0] == counts[1]
+
+
+def test_incremental_patch_time_independent_of_size():
+    seconds: list = []
+    for count in (250, 8000):
+        compiler = IncrementalCompiler(document(count))
+        line: int = count // 2 * 2 + 1
+        best: float = float("inf")
+        for i in range(10):
+            start: float = time.perf_counter()
+            compiler.update(line, line + 1, f'    div class="other{i}":\n')
+            compiler.update(line + 1, line + 2, f'        << "other{i}"\n        << "more"\n')
+            compiler.update(line + 1, line + 3, '        << "text"\n')
+            best = min(best, time.perf_counter() - start)
+        assert compiler.full_compiles == 1
+        assert compiler.html == compiled(compiler.src)
+        seconds.append(best)
+    # The units, their offsets and the html lines are patched in place, only copying the source
+    # and the html of a 32 times larger document may take longer.
+    assert seconds[1] < seconds[0] * 8
+
+
+def test_incremental_random_edits(monkeypatch):
+    # Chunks of 2 units split and drop the chunks of the unit list on the way.
+    monkeypatch.setattr(pyhtml._UnitList, "CHUNK", 2)
+    lines: list = ['    p:\n', '        << "text"\n', '    << "more"\n', '    a = "b"\n', '    span class="x":\n', 'html:\n',
+                   '\n', '  q:\n', 'x', '    =\n', '        << "multi\nline"\n']
+    for seed in range(20):
+        rng = random.Random(seed)
+        compiler = IncrementalCompiler("html:\n" + "".join(rng.choice(lines[:5]) for _ in range(20)))
+        for _ in range(20):
+            start: int = rng.randint(0, compiler.src.count("\n") + 1)
+            text: str = "".join(rng.choice(lines) for _ in range(rng.randint(0, 2)))
+            try:
+                html = compiler.update(start, start + rng.randint(0, 2), text)
+            except Exception as e:
+                html = e.__class__
+            assert html == compiled(compiler.src)
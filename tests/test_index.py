@@ -0,0 +1,128 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from pyhtml import (ElementIndex, HTMLElement, IterativeParser, Tokenizer, Compiler, index_pyhtml, parse_pyhtml,
+                    load_pyhtmlc, write_pyhtmlc, find_element)
+
+
+SRC: str = """html lang="en":
+    div class="nav main" id="top":
+        a href="/":
+            << "home"
+        a href="/about" class="ext":
+            << "about"
+    div class="content":
+        p:
+            << "text"
+        a href="/":
+            << "link"
+"""
+
+
+def walk(element: HTMLElement, ancestors: tuple = ()):
+    """Yields the elements with their ancestors in document order."""
+    stack: list = [(element, ancestors)]
+    while stack:
+        element, ancestors = stack.pop()
+        yield element, ancestors
+        stack.extend((child, ancestors + (element,)) for child in reversed(element._childs)
+                     if isinstance(child, HTMLElement))
+
+
+def attributes(element: HTMLElement) -> list:
+    return [(attribute._name, attribute._value) for attribute in element._attributes]
+
+
+def test_index_lists():
+    index: ElementIndex = index_pyhtml(SRC)
+    elements: list = [element for element, _ in walk(index.root)]
+    assert index.elements == elements
+    assert [element._tag for element in index.tags["a"]] == ["a", "a", "a"]
+    assert index.attributes[("href", "/")] == [elements[2], elements[6]]
+    assert index.names["href"] == [elements[2], elements[3], elements[6]]
+    assert index.classes["main"] == index.classes["nav"] == [elements[1]]
+    assert index.ids == {"top": [elements[1]]}
+    assert index.parent(elements[2]) is elements[1] and index.parent(index.root) is None
+
+
+def test_duplicate_ids():
+    index: ElementIndex = index_pyhtml('div:\n    p id="x":\n    p id="x":\n    p id="y":\n')
+    first, second, other = index.elements[1:]
+    assert index.ids == {"x": [first, second], "y": [other]}
+    assert index.select("#x") == [first, second] and index.select("div #x") == [first, second]
+    assert find_element(index, "x") is find_element(index.root, "x") is first
+
+
+def test_select():
+    index: ElementIndex = index_pyhtml(SRC)
+    nav, home, about = index.elements[1:4]
+    assert index.select("#top") == [nav]
+    assert index.select("div.nav.main a") == [home, about] + index.select("p a")
+    assert index.select('a[href="/"]') == [home] + index.select("p a")
+    assert index.select("html #top a.ext") == index.select("[href=/about]") == [about]
+    assert index.select("*") == index.elements
+    assert index.select("span") == index.select("#missing a") == index.select(".ext a") == []
+    assert index.select_one("a") is home and index.select_one("span") is None
+    about._attributes[0]._value = "/info"
+    assert index.select('[href="/about"]') == []
+    for selector in ("", "a > b", "a, b", "a[href", "."):
+        with pytest.raises(ValueError):
+            index.select(selector)
+
+
+def test_parser_index():
+    tokenizer = Tokenizer(SRC, True)
+    tokenizer.parse()
+    parser = IterativeParser(tokenizer.tokens, index=True)
+    parser.parse()
+    assert parser.index.root is parser._block_stack[0]
+    assert [attributes(element) for element in parser.index.select("a")] == [[("href", "/")],
+        [("href", "/about"), ("class", "ext")], [("href", "/")]]
+    assert Compiler(parser.index.root).src == Compiler(parse_pyhtml(SRC)).src
+
+
+def test_index_of_loaded_tree(tmp_path):
+    with open(tmp_path / "page.pyhtmlc", "wb") as fh:
+        write_pyhtmlc(parse_pyhtml(SRC), fh)
+    index = ElementIndex(load_pyhtmlc(tmp_path / "page.pyhtmlc"))
+    assert [element._tag for element in index.select(".nav a")] == ["a", "a", "a"]
+
+
+def matches(element: HTMLElement, tag: str | None, class_name: str | None) -> bool:
+    return ((tag is None or element._tag == tag) and
+            (class_name is None or any(name == "class" and class_name in value.split()
+                                       for name, value in attributes(element))))
+
+
+def test_select_random():
+    rng = random.Random(22)
+    tags: list = ["div", "p", "a", "span"]
+    classes: list = ["x", "y", "z"]
+    for _ in range(30):
+        lines: list = ["html:"]
+        depth: int = 1
+        for i in range(40):
+            depth = rng.randint(1, depth + 1)
+            attribute: str = f' class="{" ".join(rng.sample(classes, rng.randint(1, 2)))}"' if rng.random() < 0.6 else ""
+            lines.append(f'{"    " * depth}{rng.choice(tags)}{attribute} id="e{i}":')
+        index: ElementIndex = index_pyhtml("\n".join(lines) + "\n", "iterative")
+        for _ in range(20):
+            compounds: list = [(rng.choice(tags + [None]), rng.choice(classes + [None])) for _ in range(rng.randint(1, 3))]
+            selector: str = " ".join(f"{tag or '*'}{'.' + class_name if class_name else ''}" for tag, class_name in compounds)
+            expected: list = []
+            for element, ancestors in walk(index.root):
+                if not matches(element, *compounds[-1]):
+                    continue
+                # The compounds before the last one have to match ancestors in their order.
+                pending: list = compounds[:-1]
+                for ancestor in ancestors:
+                    if pending and matches(ancestor, *pending[0]):
+                        pending.pop(0)
+                if not pending:
+                    expected.append(element)
+            assert index.select(selector) == expected, selector
@@ -0,0 +1,80 @@
+import gzip
+import io
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from pyhtml import (Compiler, MinifiedCompiler, MemoryCache, CompileCache, compile_pyhtml, compile_pyhtml_to, compile_file,
+                    compile_many, batch_summary, parse_pyhtml)
+
+
+SRC: str = """html:
+    body:
+        div class="window":
+            << "textline"
+            div class="title":
+                << "multi
+    line text"
+            p:
+            span:
+                text = "attribute text"
+"""
+
+
+def test_minified():
+    html: str = compile_pyhtml(SRC, minify=True)
+    assert html == ("<html><body><div class='window'>\ntextline\n<div class='title'>\nmulti\n    line text\n"
+                    "</div><p><span text='attribute text'></span></p></div></body></html>")
+    # Only the indentation and the newlines between two tags are left out.
+    assert html.replace("\n", "") == "".join(line.strip() if line.lstrip().startswith("<") else line
+                                            for line in compile_pyhtml(SRC).split("\n"))
+    assert MinifiedCompiler(parse_pyhtml("div:\n")).src == "<div></div>"
+
+
+def test_minified_stream():
+    element = parse_pyhtml(SRC)
+    for flush_size in (1, 10, 1 << 16):
+        fp = io.StringIO()
+        MinifiedCompiler(element, fp, flush_size)
+        assert fp.getvalue() == MinifiedCompiler(element).src
+        fp = io.StringIO()
+        Compiler(element, fp, flush_size)
+        assert fp.getvalue() == Compiler(element).src
+    fp = io.StringIO()
+    compile_pyhtml_to(SRC, fp, minify=True)
+    assert fp.getvalue() == compile_pyhtml(SRC, minify=True)
+
+
+def test_minified_cache(tmp_path):
+    for cache in (MemoryCache(), CompileCache(tmp_path)):
+        assert compile_pyhtml(SRC, cache=cache) == compile_pyhtml(SRC)
+        assert compile_pyhtml(SRC, cache=cache, minify=True) == compile_pyhtml(SRC, minify=True)
+        assert compile_pyhtml(SRC, cache=cache, minify=True) == compile_pyhtml(SRC, minify=True)
+        assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_gzip_sidecar(tmp_path):
+    source = tmp_path / "page.pyhtml"
+    source.write_text(SRC)
+    cache = CompileCache(tmp_path / "cache")
+    for minify in (False, True, True):
+        html_file: str = compile_file(source, minify=minify, gzip_level=6, cache=cache, flush_size=10)
+        with open(html_file) as fh:
+            html: str = fh.read()
+        assert html == compile_pyhtml(SRC, minify=minify)
+        with gzip.open(html_file + ".gz", "rt", encoding="utf-8") as fh:
+            assert fh.read() == html
+    assert cache.hits == 1
+    first: bytes = (tmp_path / "page.html.gz").read_bytes()
+    compile_file(source, minify=True, gzip_level=6)
+    assert (tmp_path / "page.html.gz").read_bytes() == first
+
+
+def test_gzip_batch(tmp_path):
+    for i in range(3):
+        (tmp_path / f"page{i}.pyhtml").write_text(SRC)
+    results: list = compile_many([tmp_path], 2, minify=True, gzip_level=9)
+    assert all(result.error is None and 0 < result.gzip_bytes for result in results)
+    assert "MB gzip" in batch_summary(results, 1.0)
+    assert "MB gzip" not in batch_summary(compile_many([tmp_path]), 1.0)
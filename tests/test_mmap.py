@@ -0,0 +1,85 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pyhtml
+from pyhtml import (Tokenizer, BytesTokenizer, BytesTokenArray, CompileCache, map_file, parse_pyhtml, parse_pyhtml_file,
+                    compile_pyhtml, compile_file)
+
+
+SRC: str = """html:
+    div class="fenêtre" id="€":
+        << "ligne de tëxte 𝄞"
+        div class="title":
+            << "another \\"textline\\""
+    p:
+"""
+
+
+def tokens(tokenizer: Tokenizer) -> list:
+    tokenizer.parse()
+    return [(token.token, token.line, token.row, token.token_type) for token in tokenizer.tokens]
+
+
+def test_bytes_tokenizer():
+    for src in (SRC, "div:\n    <<ü\n", 'a = "b" c\n', "x\n  ü:\n€"):
+        assert tokens(BytesTokenizer(src.encode())) == tokens(Tokenizer(src, True)) == tokens(Tokenizer(src))
+
+
+def test_bytes_tokenizer_random():
+    # Both scan with Tokenizer._scan, one on str and one on bytes.
+    rng = random.Random(2)
+    pieces: list = ["div", " ", "    ", "=", ":", "\n", '"', "<", "<<", "\\", "ä", "\n    p:", '\n    << "t"', '\n    a = "b"', ' c="d"']
+    for _ in range(1000):
+        src: str = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 25)))
+        tokenizer, bytes_tokenizer = Tokenizer(src, True), BytesTokenizer(src.encode())
+        for each_tokenizer in (tokenizer, bytes_tokenizer):
+            try:
+                each_tokenizer.parse()
+            except pyhtml.SyntaxError:
+                pass
+        assert [(token.token, token.line, token.row, token.token_type) for token in bytes_tokenizer.tokens] == [
+            (token.token, token.line, token.row, token.token_type) for token in tokenizer.tokens]
+
+
+def test_bytes_tokens_are_decoded_when_used():
+    tokenizer = BytesTokenizer(SRC.encode())
+    tokenizer.parse()
+    assert isinstance(tokenizer.tokens, BytesTokenArray)
+    assert tokenizer.tokens._texts == {}
+    assert [token.token for token in tokenizer.tokens[5:8]] == ["class", "=", "fenêtre"]
+
+
+def test_bytes_syntax_error():
+    src: str = 'html:\n    p ü="€":\n        <<< =\n'
+    for source in (src, src.encode()):
+        with pytest.raises(pyhtml.SyntaxError) as error:
+            parse_pyhtml(source)
+        assert (error.value.token, error.value.line, error.value.row) == ("<<", 3, 8)
+
+
+def test_parse_pyhtml_file(tmp_path):
+    path = tmp_path / "page.pyhtml"
+    path.write_text(SRC, encoding="utf-8")
+    assert repr(parse_pyhtml_file(path)) == repr(parse_pyhtml(SRC))
+    path.write_bytes(b"")
+    with map_file(path) as src:
+        assert src == b""
+
+
+def test_compile_file_mmap(tmp_path):
+    path = tmp_path / "page.pyhtml"
+    path.write_text(SRC, encoding="utf-8")
+    cache = CompileCache(tmp_path / "cache")
+    for _ in range(2):
+        compile_file(path, use_mmap=True, cache=cache)
+        assert (tmp_path / "page.html").read_text() == compile_pyhtml(SRC)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.key(SRC) == cache.key(SRC.encode())
+    path.write_text("html:\n    =\n")
+    with pytest.raises(pyhtml.SyntaxError):
+        compile_file(path, use_mmap=True)
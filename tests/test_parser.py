@@ -0,0 +1,126 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from pyhtml import Tokenizer, Parser, IterativeParser, TokenType, HTMLElement, AddText, CompileStats, compile_pyhtml
+
+
+def parse(src: str) -> Parser:
+    tokenizer = Tokenizer(src)
+    tokenizer.parse()
+    parser = Parser(tokenizer.tokens)
+    parser.parse()
+    return parser
+
+
+def test_grammar_is_compiled_once():
+    assert Parser.grammar() is Parser.grammar()
+    assert parse("div1:\n")._grammar is parse("div2:\n")._grammar
+
+
+def test_grammar_rules():
+    grammar = Parser.grammar()
+    rule_fnc, rule_tokens = grammar["r_html_element_attribute"][0]
+    assert rule_fnc is Parser.r_html_element_attribute1
+    assert rule_tokens == (TokenType.ATTRIBUTE, TokenType.ASSIGMENT, TokenType.VALUE, "r_html_element_attribute")
+    for alternatives in grammar.values():
+        lengths = [len(rule_fnc.__doc__) for rule_fnc, rule_tokens in alternatives]
+        assert lengths == sorted(lengths, reverse=True)
+
+
+def test_grammar_per_subclass():
+    class TextParser(Parser):
+        def r_html_element_body24(self, t):
+            "INDENT VALUE NEWLINE"
+            self.indent(t[0].token, t[1].token)
+
+    assert "r_html_element_body24" not in [rule_fnc.__name__ for rule_fnc, rule_tokens in Parser.grammar()["r_html_element_body"]]
+    assert "r_html_element_body24" in [rule_fnc.__name__ for rule_fnc, rule_tokens in TextParser.grammar()["r_html_element_body"]]
+
+
+SRC: str = """div class="window":
+    << "textline"
+    div class="title":
+        << "another textline"
+    style = "color: red"
+    p class="last":
+"""
+
+
+class CountingParser(Parser):
+    def _match_rule(self, fnc_name, pos):
+        self.evaluations.append((fnc_name, pos))
+        return Parser._match_rule(self, fnc_name, pos)
+
+
+def counting_parser(src: str, **kwargs) -> CountingParser:
+    tokenizer = Tokenizer(src)
+    tokenizer.parse()
+    parser = CountingParser(tokenizer.tokens, **kwargs)
+    parser.evaluations = []
+    parser.parse()
+    return parser
+
+
+def test_memo_evaluates_each_rule_once():
+    parser = counting_parser(SRC)
+    assert len(parser.evaluations) == len(set(parser.evaluations))
+    assert len(counting_parser(SRC, memoize=False).evaluations) > len(parser.evaluations)
+
+
+def test_memo_size():
+    parser = counting_parser(SRC, memo_size=2)
+    assert len(parser._memo) == 2
+
+
+def test_memo_same_tree():
+    assert repr(counting_parser(SRC)._block_stack) == repr(counting_parser(SRC, memoize=False)._block_stack)
+    assert repr(counting_parser(SRC)._block_stack) == repr(counting_parser(SRC, memo_size=1)._block_stack)
+
+
+def test_iterative_parser():
+    tokenizer = Tokenizer(SRC)
+    tokenizer.parse()
+    parser = IterativeParser(tokenizer.tokens)
+    parser.parse()
+    assert repr(parser._block_stack) == repr(counting_parser(SRC)._block_stack)
+    assert compile_pyhtml(SRC, engine="iterative") == compile_pyhtml(SRC)
+
+
+def test_iterative_parser_long_document():
+    src: str = "html:\n" + "    p:\n        << \"text\"\n" * 5000
+    tokenizer = Tokenizer(src)
+    tokenizer.parse()
+    parser = IterativeParser(tokenizer.tokens)
+    parser.parse()
+    assert parser._last_correct_token is tokenizer.tokens[-1]
+
+
+
+def test_iterative_parser_linear_without_memo():
+    unit: str = '    div class="a" id="b":\n        title = "t"\n        << "x"\n    p:\n'
+    for kwargs in ({}, {"memoize": False}, {"memo_size": 50}):
+        attempts: list = []
+        for lines in (500, 1000):
+            tokenizer = Tokenizer("html:\n" + unit * lines)
+            tokenizer.parse()
+            stats = CompileStats()
+            parser = IterativeParser(tokenizer.tokens, stats=stats, **kwargs)
+            parser.parse()
+            assert parser._last_correct_token is tokenizer.tokens[-1]
+            attempts.append(sum(stats.rule_attempts.values()))
+        # Twice the lines are twice the rule attempts, the chain of the following lines is not tried again.
+        assert attempts[1] < 2.01 * attempts[0]
+
+def test_ast_nodes():
+    root = parse(SRC)._block_stack[0]
+    assert [str(attribute) for attribute in root._attributes] == ["class='window'", "style='color: red'"]
+    assert [child.__class__ for child in root._childs] == [AddText, HTMLElement, HTMLElement]
+    title, last = root._childs[1:]
+    assert title._tag == "div" and title._tag is root._tag
+    assert last._attributes[0]._name is title._attributes[0]._name
+    assert last._childs == ()
+    for node in (root, title._attributes[0], root._childs[0]):
+        assert not hasattr(node, "__dict__")
+    assert HTMLElement("", "p")._attributes == ()
@@ -0,0 +1,87 @@
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from pyhtml import (PyhtmlcFile, LazyHTMLElement, HTMLElement, AddText, Compiler, write_pyhtmlc, load_pyhtmlc,
+                    parse_pyhtml, compile_pyhtml, compile_file, PYHTMLC_VERSION)
+
+
+SRC: str = """html:
+    div class="window" id="main":
+        << "textline ü"
+        div class="title":
+            << "another textline"
+    p:
+"""
+
+
+def write(path, element: HTMLElement):
+    with open(path, "wb") as fh:
+        write_pyhtmlc(element, fh)
+
+
+def test_pyhtmlc_round_trip(tmp_path):
+    write(tmp_path / "page.pyhtmlc", parse_pyhtml(SRC))
+    with load_pyhtmlc(tmp_path / "page.pyhtmlc") as root:
+        assert repr(root).replace("LazyHTMLElement", "HTMLElement") == repr(parse_pyhtml(SRC))
+        assert Compiler(root).src == compile_pyhtml(SRC)
+    assert root._file._mmap.closed
+
+
+def test_pyhtmlc_lazy(tmp_path):
+    write(tmp_path / "page.pyhtmlc", parse_pyhtml(SRC))
+    with PyhtmlcFile(tmp_path / "page.pyhtmlc") as pyhtmlc:
+        assert pyhtmlc.node_count == 9
+        root = pyhtmlc.root
+        assert isinstance(root, LazyHTMLElement) and root._tag == "html"
+        assert pyhtmlc._strings.count(None) == len(pyhtmlc._strings) - 2
+        window = root._childs[0]
+        assert window._tag is root._childs[0]._tag
+        p = window._childs[-1]
+        assert [str(attribute) for attribute in window._attributes] == ["class='window'", "id='main'"]
+        assert p._attributes == () and p._childs == ()
+        assert "another textline" not in pyhtmlc._strings
+
+
+def test_pyhtmlc_deep_tree(tmp_path):
+    root = parent = HTMLElement("", "html")
+    for _ in range(10000):
+        child = HTMLElement("", "div")
+        child.append(AddText("text"))
+        parent.append(child)
+        parent = child
+    write(tmp_path / "deep.pyhtmlc", root)
+    assert Compiler(load_pyhtmlc(tmp_path / "deep.pyhtmlc")).src == Compiler(root).src
+
+
+def test_pyhtmlc_invalid(tmp_path):
+    (tmp_path / "page.pyhtmlc").write_bytes(b"<html></html>" * 4)
+    with pytest.raises(ValueError):
+        PyhtmlcFile(tmp_path / "page.pyhtmlc")
+    fp = io.BytesIO()
+    write_pyhtmlc(parse_pyhtml(SRC), fp)
+    (tmp_path / "page.pyhtmlc").write_bytes(fp.getvalue()[:4] + bytes([PYHTMLC_VERSION + 1]) + fp.getvalue()[5:])
+    with pytest.raises(ValueError):
+        PyhtmlcFile(tmp_path / "page.pyhtmlc")
+
+
+def test_pyhtmlc_compile_file(tmp_path, monkeypatch):
+    opened: list = []
+    init = PyhtmlcFile.__init__
+
+    def recorded(self, path):
+        init(self, path)
+        opened.append(self)
+
+    monkeypatch.setattr(PyhtmlcFile, "__init__", recorded)
+    (tmp_path / "page.pyhtml").write_text(SRC)
+    compile_file(tmp_path / "page.pyhtml", emit_pyhtmlc=True)
+    os.remove(tmp_path / "page.html")
+    assert compile_file(tmp_path / "page.pyhtmlc") == str(tmp_path / "page.html")
+    assert (tmp_path / "page.html").read_text() == compile_pyhtml(SRC)
+    # The file is unmapped once the html is written.
+    assert len(opened) == 1 and opened[0]._mmap.closed
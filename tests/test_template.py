@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from pyhtml import Template, compile_template, compile_pyhtml, parse_pyhtml
+
+from conftest import touch
+
+
+SRC: str = """html:
+    p class="{kind}" data = "{count:03d}":
+        << "Hello {name}, {{braces}}"
+"""
+
+
+def test_template_render():
+    template: Template = compile_template(SRC)
+    assert template.names == ("kind", "count", "name")
+    html: str = template.render({"kind": "greeting", "name": "World"}, count=7)
+    assert html == compile_pyhtml(SRC).replace("{kind}", "greeting").replace("{count:03d}", "007").replace(
+        "{name}", "World").replace("{{braces}}", "{braces}")
+
+
+def test_template_constant_strings():
+    template: Template = compile_template(SRC)
+    assert template.source.count("context[") == 3
+    assert "<html>\\n    <p class='" in template.source
+    assert compile_template(SRC) is template
+    src: str = 'div:\n    << "text"\n'
+    static: Template = compile_template(src)
+    assert static.names == ()
+    assert static.source.endswith(f"return {compile_pyhtml(src)!r}\n")
+
+
+def test_template_escape():
+    context: dict = {"kind": "'><script>", "count": 1, "name": "<b>"}
+    html: str = compile_template(SRC).render(context)
+    assert "class='&#x27;&gt;&lt;script&gt;'" in html and "Hello &lt;b&gt;" in html
+    assert "Hello <b>" in compile_template(SRC, escape=False).render(context)
+
+
+def test_template_braces_outside_values():
+    template = Template(parse_pyhtml("x{y}:\n    << \"{z}\"\n"))
+    assert template.names == ("z",)
+    assert template.render(z=1) == "<x{y}>\n1\n</x{y}>"
+
+
+def test_template_errors():
+    with pytest.raises(KeyError):
+        compile_template(SRC).render(kind="a", count=1)
+    for placeholder in ("{0}", "{a.b}", "{a!r}", "{a:{b}}"):
+        with pytest.raises(ValueError):
+            compile_template(f'p:\n    << "{placeholder}"\n')
+
+
+def test_template_include(tmp_path, monkeypatch):
+    src: str = 'div:\n    include "_item.pyhtml"\n'
+    for directory, text in (("a", "{name}"), ("b", "other {name}")):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "_item.pyhtml").write_text(f'p:\n    << "{text}"\n')
+    monkeypatch.chdir(tmp_path / "a")
+    template: Template = compile_template(src)
+    assert template.render(name="x") == "<div>\n    <p>\nx\n    </p>\n</div>"
+    assert compile_template(src) is template
+    # The partial of the current directory is used and a changed partial compiles the source again.
+    monkeypatch.chdir(tmp_path / "b")
+    assert "other x" in compile_template(src).render(name="x")
+    touch(tmp_path / "b" / "_item.pyhtml", 'p:\n    << "new {name}"\n', 1)
+    assert "new x" in compile_template(src).render(name="x")
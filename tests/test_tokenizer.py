@@ -0,0 +1,167 @@
+import io
+import os
+import random
+import sys
+import tracemalloc
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks"))
+
+from bench_tokenizer import CharTokenizer
+from pyhtml import SyntaxError, Tokenizer, IncrementalTokenizer, TokenArray, TokenType, tokenize_stream
+
+
+SRC: str = """div class="window" style="position: absolute; left: 10px; top 10px;":
+    << "textline"
+    div class = "title":
+        << "another textline"
+    style = "color: \\"red\\""
+    << "multi
+line
+text"
+"""
+
+
+def assert_same_tokens(src: str):
+    tokenizer = Tokenizer(src)
+    char_tokenizer = CharTokenizer(src)
+    assert repr(tokenizer.tokens) == repr(char_tokenizer.tokens)
+    for each_tokenizer in (tokenizer, char_tokenizer):
+        try:
+            each_tokenizer.parse()
+        except SyntaxError:
+            # Sources that end with an assignment or start with a colon can not be typed.
+            pass
+    assert repr(tokenizer.tokens) == repr(char_tokenizer.tokens)
+
+
+def test_tokenizer():
+    tokens = Tokenizer(SRC).tokens
+    assert [token.token for token in tokens[:5]] == ["div", "class", "=", "window", "style"]
+    assert (tokens[3].line, tokens[3].row, tokens[3].token_type) == (1, 18, TokenType.VALUE)
+    assert_same_tokens(SRC)
+
+
+def test_tokenizer_quirks():
+    for src in ("a<b:\n", 'ab<<"x"\n', "div:\n\n    p:\n", "div:\n    a == \"b\"\n", 'div: \n  a="b" c="d"\n  <<"t"', 'x\\ ""', "div:\n    p:"):
+        assert_same_tokens(src)
+
+
+def test_tokenizer_random():
+    rng = random.Random(0)
+    pieces: list = ["div", " ", "    ", "=", ":", "\n", '"', "<", "<<", "\\", "ä", "\n    p:", '\n    << "t"', '\n    a = "b"', ' c="d"']
+    for _ in range(2000):
+        assert_same_tokens("".join(rng.choice(pieces) for _ in range(rng.randint(0, 25))))
+
+
+def test_incremental_tokenizer():
+    tokenizer = Tokenizer(SRC)
+    tokenizer.parse()
+    for chunk_size in (1, 2, 3, 7, 64):
+        incremental_tokenizer = IncrementalTokenizer()
+        tokens: list = []
+        for i in range(0, len(SRC), chunk_size):
+            tokens += incremental_tokenizer.feed(SRC[i:i + chunk_size])
+        tokens += incremental_tokenizer.close()
+        assert repr(tokens) == repr(tokenizer.tokens)
+
+
+def test_incremental_tokenizer_bytes():
+    src: str = 'div title="äöü €":\n    << "ä€"\n'
+    tokenizer = Tokenizer(src)
+    tokenizer.parse()
+    data: bytes = src.encode()
+    incremental_tokenizer = IncrementalTokenizer()
+    tokens: list = []
+    for i in range(len(data)):
+        tokens += incremental_tokenizer.feed(data[i:i + 1])
+    tokens += incremental_tokenizer.close()
+    assert repr(tokens) == repr(tokenizer.tokens)
+    assert repr(list(tokenize_stream(io.BytesIO(data), 5))) == repr(tokenizer.tokens)
+
+
+def test_incremental_tokenizer_include():
+    src: str = 'html:\n    include "_nav.pyhtml"\n    div:\n        include = "x"\n'
+    tokenizer = Tokenizer(src)
+    tokenizer.parse()
+    assert [token.token_type for token in tokenizer.tokens].count(TokenType.INCLUDE) == 1
+    for chunk_size in (1, 3, 64):
+        assert repr(list(tokenize_stream(io.StringIO(src), chunk_size))) == repr(tokenizer.tokens)
+
+
+def test_incremental_tokenizer_memory():
+    incremental_tokenizer = IncrementalTokenizer()
+    pending: int = 0
+    count: int = 0
+    incremental_tokenizer.feed("html:\n")
+    for i in range(1000):
+        count += len(incremental_tokenizer.feed('    div class="c%d":\n        << "text"\n' % i))
+        pending = max(pending, len(incremental_tokenizer.tokens))
+    count += len(incremental_tokenizer.close())
+    assert count > 1000 * 10
+    assert pending <= 10
+
+
+def test_incremental_tokenizer_errors():
+    for src in (":\n", "div:\n    a =", ":", 'div:\n    p:\n        a = "b" c ='):
+        with pytest.raises(SyntaxError) as expected:
+            Tokenizer(src).parse()
+        for chunk_size in (1, 2, 5, 64):
+            with pytest.raises(SyntaxError) as err:
+                list(tokenize_stream(io.StringIO(src), chunk_size))
+            assert (err.value.token, err.value.line, err.value.row) == (expected.value.token, expected.value.line, expected.value.row)
+
+
+def assert_same_compact_tokens(src: str):
+    tokenizer = Tokenizer(src)
+    compact_tokenizer = Tokenizer(src, compact=True)
+    assert repr(compact_tokenizer.tokens) == repr(tokenizer.tokens)
+    errors: list = []
+    for each_tokenizer in (tokenizer, compact_tokenizer):
+        try:
+            each_tokenizer.parse()
+            errors.append(None)
+        except SyntaxError as err:
+            errors.append((err.token, err.line, err.row))
+    assert errors[0] == errors[1]
+    assert repr(compact_tokenizer.tokens) == repr(tokenizer.tokens)
+
+
+def test_typing_errors():
+    for compact in (False, True):
+        for src, position in ((":\n", (":", 1, 0)), ("div:\n    a =", ("=", 2, 6))):
+            with pytest.raises(SyntaxError) as err:
+                Tokenizer(src, compact).parse()
+            assert (err.value.token, err.value.line, err.value.row) == position
+
+
+def test_token_array():
+    tokenizer = Tokenizer(SRC, compact=True)
+    assert isinstance(tokenizer.tokens, TokenArray)
+    tokenizer.parse()
+    assert tokenizer.tokens[0].token == "div"
+    assert tokenizer.tokens[0].token_type is TokenType.HTML_ELEMENT
+    assert tokenizer.tokens[-1].token_type is TokenType.NEWLINE
+    assert tokenizer.tokens[1:3][1].token == "="
+    assert_same_compact_tokens(SRC)
+    for src in ("a<b:\n", 'ab<<"x"\n', "div:\n    a == \"b\"\n", 'x\\ ""', "div:\n    p:", "a=", ":"):
+        assert_same_compact_tokens(src)
+    rng = random.Random(1)
+    pieces: list = ["div", " ", "    ", "=", ":", "\n", '"', "<", "<<", "\\", "ä", "\n    p:", '\n    << "t"', '\n    a = "b"', ' c="d"']
+    for _ in range(1000):
+        assert_same_compact_tokens("".join(rng.choice(pieces) for _ in range(rng.randint(0, 25))))
+
+
+def test_token_array_memory():
+    src: str = "html:\n" + '    div class="c":\n        << "text"\n' * 1000
+    sizes: list = []
+    for compact in (False, True):
+        tracemalloc.start()
+        tokenizer = Tokenizer(src, compact)
+        tokenizer.parse()
+        sizes.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+        del tokenizer
+    assert sizes[1] * 3 < sizes[0]
@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pyhtml
+from pyhtml import Watcher, watch, compile_pyhtml
+
+from conftest import touch
+
+
+def test_watcher_changes(tmp_path):
+    touch(tmp_path / "a.pyhtml", "div:\n", 1)
+    touch(tmp_path / "b.pyhtml", "p:\n", 1)
+    watcher = Watcher([tmp_path])
+    assert watcher.changes() == []
+    touch(tmp_path / "a.pyhtml", "div:\n", 2)
+    touch(tmp_path / "c.pyhtml", "p:\n", 1)
+    (tmp_path / "a.html").write_text("")
+    assert watcher.changes() == [tmp_path / "a.pyhtml", tmp_path / "c.pyhtml"]
+    touch(tmp_path / "b.pyhtml", "div:\n", 1)
+    os.remove(tmp_path / "c.pyhtml")
+    assert watcher.changes() == [tmp_path / "b.pyhtml"]
+
+
+def test_watcher_debounce(tmp_path, monkeypatch):
+    source = tmp_path / "a.pyhtml"
+    touch(source, "div:\n", 1)
+    watcher = Watcher([tmp_path], interval=1, debounce=0.5)
+    saves: list = [None, ("p:\n", 2), ("div:\n", 3), None]
+    sleeps: list = []
+
+    def sleep(seconds: float):
+        sleeps.append(seconds)
+        save = saves.pop(0)
+        if save is not None:
+            touch(source, *save)
+
+    monkeypatch.setattr(pyhtml.time, "sleep", sleep)
+    assert watcher.wait() == [source]
+    assert sleeps == [1, 1, 0.5, 0.5]
+
+
+def test_watch(tmp_path, monkeypatch, capsys):
+    source = tmp_path / "a.pyhtml"
+    touch(source, "div:\n", 1)
+
+    def sleep(seconds: float):
+        touch(source, "p:\n", 2)
+
+    monkeypatch.setattr(pyhtml.time, "sleep", sleep)
+    watch([tmp_path], rebuilds=1)
+    assert (tmp_path / "a.html").read_text() == compile_pyhtml("p:\n")
+    assert "after the save" in capsys.readouterr().out